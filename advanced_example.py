@@ -2,178 +2,204 @@
 Ejemplo de uso avanzado del cliente de NiceHash
 Muestra cómo usar el cliente para crear scripts personalizados
 """
+import os
+
 from nicehash_client import NiceHashClient
-from datetime import datetime, timedelta
+from earnings_store import EarningsStore
+from fleet_analytics import FleetAnalysis, analyze, format_hashrate
+from hashrate_history import HashrateHistory
+from models import Fleet
+from response_cache import default_cache
+import config
+
+# Ventanas de rentabilidad (días)
+VENTANAS = (7, 30)
 
 
-def calcular_rentabilidad_promedio(dias: int = 7):
+def obtener_historial_ganancias(client: NiceHashClient = None) -> EarningsStore:
     """
-    Calcula la rentabilidad promedio de los últimos N días
+    Carga el histórico local de ganancias y descarga solo los días nuevos
     
     Args:
-        dias: Número de días a analizar
+        client: Cliente a usar (por defecto se crea uno)
+        
+    Returns:
+        EarningsStore sincronizado hasta ayer
     """
-    client = NiceHashClient()
+    store = EarningsStore()
+    nuevos = store.sync(client or NiceHashClient())
+    print(f"\n💾 Histórico de ganancias: {len(store)} días ({nuevos} nuevos descargados)")
+    return store
+
+
+def obtener_analisis(client: NiceHashClient = None, store: EarningsStore = None,
+                     history_path: str = "hashrate_history.bin") -> FleetAnalysis:
+    """
+    Descarga la flota una sola vez y calcula todos los reportes en una pasada
     
-    to_date = datetime.now()
-    from_date = to_date - timedelta(days=dias)
+    Args:
+        client: Cliente a usar (por defecto se crea uno)
+        store: Histórico de ganancias ya sincronizado (por defecto se sincroniza uno)
+        history_path: Histórico de hashrate del monitor (para el uptime por rig)
+        
+    Returns:
+        FleetAnalysis con rentabilidad, algoritmos y uptime
+    """
+    client = client or NiceHashClient()
+    fleet = Fleet.from_api(client.get_rigs())
+    store = store or obtener_historial_ganancias(client)
+    history = HashrateHistory(history_path) if os.path.exists(history_path) else None
+    return analyze(fleet, store.last_days(max(VENTANAS)), history, VENTANAS)
+
+
+def calcular_rentabilidad_promedio(dias: int = 7, analisis: FleetAnalysis = None):
+    """
+    Muestra la rentabilidad promedio de los últimos N días completos
     
-    earnings_data = client.get_daily_earnings(
-        from_date.strftime('%Y-%m-%d'),
-        to_date.strftime('%Y-%m-%d')
-    )
+    Args:
+        dias: Número de días a analizar (una de las VENTANAS)
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
+    """
+    analisis = analisis or obtener_analisis()
+    ventana = analisis.windows.get(dias)
     
-    if 'data' in earnings_data:
-        daily_earnings = earnings_data['data']
+    if ventana:
+        promedio = ventana['average']
         
-        if daily_earnings:
-            total = sum(float(day.get('profitability', 0)) for day in daily_earnings)
-            promedio = total / len(daily_earnings)
-            
-            print(f"\n📊 Análisis de rentabilidad ({dias} días)")
-            print(f"   Total: {total:.8f} BTC")
-            print(f"   Promedio diario: {promedio:.8f} BTC")
-            print(f"   Proyección mensual (30 días): {promedio * 30:.8f} BTC")
-            print(f"   Proyección anual (365 días): {promedio * 365:.8f} BTC")
-            
-            return promedio
+        print(f"\n📊 Análisis de rentabilidad ({dias} días)")
+        print(f"   Total: {ventana['total']:.8f} BTC")
+        print(f"   Promedio diario: {promedio:.8f} BTC")
+        print(f"   Proyección mensual (30 días): {ventana['monthly']:.8f} BTC")
+        print(f"   Proyección anual (365 días): {ventana['yearly']:.8f} BTC")
+        
+        anterior = ventana['previous_average']
+        if anterior:
+            cambio = (promedio - anterior) / anterior * 100
+            print(f"   Respecto a los {dias} días anteriores: {cambio:+.1f}%")
+        
+        return promedio
     
     return 0
 
 
-def alertar_si_rig_inactivo():
+def alertar_si_rig_inactivo(analisis: FleetAnalysis = None):
     """
     Verifica si hay rigs inactivos y muestra una alerta
     Útil para automatizar notificaciones
+    
+    Args:
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
     """
-    client = NiceHashClient()
-    rigs_data = client.get_rigs()
+    analisis = analisis or obtener_analisis()
     
-    if 'miningRigs' in rigs_data:
-        rigs_inactivos = [
-            rig for rig in rigs_data['miningRigs'] 
-            if rig.get('minerStatus') != 'MINING'
-        ]
-        
-        if rigs_inactivos:
-            print(f"\n⚠️  ALERTA: {len(rigs_inactivos)} rig(s) inactivo(s)!")
-            for rig in rigs_inactivos:
-                print(f"   • {rig.get('name', 'Sin nombre')}: {rig.get('minerStatus', 'UNKNOWN')}")
+    if analisis.total_rigs:
+        if analisis.inactive:
+            print(f"\n⚠️  ALERTA: {len(analisis.inactive)} rig(s) inactivo(s)!")
+            for nombre, estado in analisis.inactive:
+                print(f"   • {nombre or 'Sin nombre'}: {estado}")
             return True
         else:
-            print(f"\n✅ Todos los rigs están activos ({len(rigs_data['miningRigs'])} rigs)")
+            print(f"\n✅ Todos los rigs están activos ({analisis.total_rigs} rigs)")
             return False
     
     return None
 
 
-def comparar_algoritmos():
+def comparar_algoritmos(analisis: FleetAnalysis = None):
     """
     Compara el rendimiento de diferentes algoritmos
+    
+    Args:
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
     """
-    client = NiceHashClient()
-    algo_stats = client.get_algo_stats()
+    analisis = analisis or obtener_analisis()
     
-    if 'algos' in algo_stats:
+    if analisis.algorithms:
         print("\n📊 Comparación de algoritmos")
         print("-" * 70)
-        print(f"{'Algoritmo':<25} {'Hashrate':<15} {'Balance no pagado':<15}")
+        print(f"{'Algoritmo':<25} {'Hashrate':<15} {'Rigs':<8} {'Balance no pagado':<15}")
         print("-" * 70)
         
-        for algo in algo_stats['algos']:
-            algo_name = algo.get('a', 'N/A')
-            speed = float(algo.get('sa', 0))
-            unpaid = float(algo.get('up', 0))
-            
-            # Formatear hashrate
-            if speed >= 1_000_000_000:
-                speed_str = f"{speed/1_000_000_000:.2f} GH/s"
-            elif speed >= 1_000_000:
-                speed_str = f"{speed/1_000_000:.2f} MH/s"
-            elif speed >= 1_000:
-                speed_str = f"{speed/1_000:.2f} KH/s"
-            else:
-                speed_str = f"{speed:.2f} H/s"
-            
-            print(f"{algo_name:<25} {speed_str:<15} {unpaid:.8f} BTC")
+        for algo in analisis.algorithms:
+            rigs = f"{algo.active}/{algo.rigs}"
+            print(f"{algo.algorithm:<25} {format_hashrate(algo.speed_accepted):<15} {rigs:<8} "
+                  f"{algo.unpaid_amount:.8f} BTC")
 
 
-def obtener_mejor_dia():
-    """
-    Encuentra el día con mayor producción en el último mes
+def obtener_mejor_dia(analisis: FleetAnalysis = None):
     """
-    client = NiceHashClient()
+    Muestra el día con mayor y menor producción en el último mes
     
-    to_date = datetime.now()
-    from_date = to_date - timedelta(days=30)
-    
-    earnings_data = client.get_daily_earnings(
-        from_date.strftime('%Y-%m-%d'),
-        to_date.strftime('%Y-%m-%d')
-    )
+    Args:
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
+    """
+    analisis = analisis or obtener_analisis()
     
-    if 'data' in earnings_data:
-        daily_earnings = earnings_data['data']
+    if analisis.best_day:
+        mejor_fecha, mejor = analisis.best_day
+        peor_fecha, peor = analisis.worst_day
         
-        if daily_earnings:
-            mejor_dia = max(daily_earnings, key=lambda x: float(x.get('profitability', 0)))
-            peor_dia = min(daily_earnings, key=lambda x: float(x.get('profitability', 0)))
-            
-            print(f"\n🏆 Mejor día del mes:")
-            print(f"   Fecha: {mejor_dia.get('date', 'N/A')}")
-            print(f"   Producción: {float(mejor_dia.get('profitability', 0)):.8f} BTC")
-            
-            print(f"\n📉 Día con menor producción:")
-            print(f"   Fecha: {peor_dia.get('date', 'N/A')}")
-            print(f"   Producción: {float(peor_dia.get('profitability', 0)):.8f} BTC")
-            
-            diferencia = float(mejor_dia.get('profitability', 0)) - float(peor_dia.get('profitability', 0))
-            porcentaje = (diferencia / float(peor_dia.get('profitability', 0.001)) * 100)
-            
-            print(f"\n📊 Variación: {diferencia:.8f} BTC ({porcentaje:.1f}%)")
+        print(f"\n🏆 Mejor día del mes:")
+        print(f"   Fecha: {mejor_fecha or 'N/A'}")
+        print(f"   Producción: {mejor:.8f} BTC")
+        
+        print(f"\n📉 Día con menor producción:")
+        print(f"   Fecha: {peor_fecha or 'N/A'}")
+        print(f"   Producción: {peor:.8f} BTC")
+        
+        diferencia = mejor - peor
+        porcentaje = diferencia / (peor or 0.001) * 100
+        
+        print(f"\n📊 Variación: {diferencia:.8f} BTC ({porcentaje:.1f}%)")
 
 
-def monitorear_hashrate():
+def monitorear_hashrate(analisis: FleetAnalysis = None):
     """
-    Monitorea el hashrate actual y lo compara con el esperado
+    Monitorea el hashrate actual y la tasa de rechazo por algoritmo
+    
+    Args:
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
     """
-    client = NiceHashClient()
-    algo_stats = client.get_algo_stats()
+    analisis = analisis or obtener_analisis()
     
     print("\n⚡ Monitoreo de Hashrate")
     print("-" * 60)
     
-    if 'algos' in algo_stats:
-        total_devices = 0
-        
-        for algo in algo_stats['algos']:
-            algo_name = algo.get('a', 'N/A')
-            speed_accepted = float(algo.get('sa', 0))
-            speed_rejected = float(algo.get('sr', 0))
+    for algo in analisis.algorithms:
+        if algo.speed_accepted > 0:
+            rejection_rate = algo.rejection_rate
             
-            if speed_accepted > 0:
-                rejection_rate = (speed_rejected / (speed_accepted + speed_rejected)) * 100
-                
-                print(f"\n{algo_name}:")
-                
-                # Formatear velocidad
-                if speed_accepted >= 1_000_000_000:
-                    speed_str = f"{speed_accepted/1_000_000_000:.2f} GH/s"
-                elif speed_accepted >= 1_000_000:
-                    speed_str = f"{speed_accepted/1_000_000:.2f} MH/s"
-                else:
-                    speed_str = f"{speed_accepted/1_000:.2f} KH/s"
-                
-                print(f"  ✓ Hashrate: {speed_str}")
-                print(f"  ✓ Tasa de rechazo: {rejection_rate:.2f}%")
-                
-                # Alertas
-                if rejection_rate > 5:
-                    print(f"  ⚠️  ALERTA: Tasa de rechazo alta!")
-                elif rejection_rate > 2:
-                    print(f"  ⚠️  Advertencia: Tasa de rechazo moderada")
-                else:
-                    print(f"  ✅ Tasa de rechazo normal")
+            print(f"\n{algo.algorithm}:")
+            print(f"  ✓ Hashrate: {format_hashrate(algo.speed_accepted)}")
+            print(f"  ✓ Tasa de rechazo: {rejection_rate:.2f}%")
+            
+            # Alertas (mismos umbrales que las reglas del monitor, ver alert_rules.py)
+            if rejection_rate > config.ALERT_REJECTION_RATE:
+                print(f"  ⚠️  ALERTA: Tasa de rechazo alta!")
+            elif rejection_rate > config.ALERT_REJECTION_WARNING:
+                print(f"  ⚠️  Advertencia: Tasa de rechazo moderada")
+            else:
+                print(f"  ✅ Tasa de rechazo normal")
+
+
+def mostrar_uptime(analisis: FleetAnalysis = None, limite: int = 5):
+    """
+    Muestra el uptime de la flota según el histórico de hashrate del monitor
+    
+    Args:
+        analisis: Resultado de obtener_analisis() (por defecto se calcula uno)
+        limite: Cantidad de rigs con menor uptime a listar
+    """
+    analisis = analisis or obtener_analisis()
+    promedio = analisis.average_uptime
+    
+    if promedio is None:
+        print("\nℹ️  Sin histórico de hashrate para calcular el uptime (ejecuta el monitor)")
+        return
+    
+    print(f"\n⏱️  Uptime promedio: {promedio * 100:.1f}% ({len(analisis.uptime)} rigs con histórico)")
+    for nombre, uptime in analisis.lowest_uptime(limite):
+        print(f"   • {nombre or 'Sin nombre'}: {uptime * 100:.1f}%")
 
 
 def main():
@@ -183,21 +209,31 @@ def main():
     print("╚" + "═" * 58 + "╝")
     
     try:
+        # Una sola descarga de la flota y una sola pasada para todos los análisis
+        analisis = obtener_analisis()
+        
         # Verificar rigs inactivos
-        alertar_si_rig_inactivo()
+        alertar_si_rig_inactivo(analisis)
         
         # Calcular rentabilidad promedio
-        calcular_rentabilidad_promedio(7)
-        calcular_rentabilidad_promedio(30)
+        for dias in VENTANAS:
+            calcular_rentabilidad_promedio(dias, analisis)
         
         # Comparar algoritmos
-        comparar_algoritmos()
+        comparar_algoritmos(analisis)
         
         # Encontrar mejor día
-        obtener_mejor_dia()
+        obtener_mejor_dia(analisis)
         
         # Monitorear hashrate
-        monitorear_hashrate()
+        monitorear_hashrate(analisis)
+        
+        # Uptime por rig
+        mostrar_uptime(analisis)
+        
+        cache = default_cache()
+        if cache is not None:
+            print(f"\n💾 Caché de respuestas: {cache.summary()}")
         
         print("\n" + "=" * 60)
         print("✓ Análisis completado")
@@ -0,0 +1,463 @@
+"""
+Motor de reglas de alerta sobre los snapshots de rigs
+Las reglas se compilan una sola vez (agrupadas por tipo) y se evalúan en una
+pasada por columna de la flota; las alertas que coinciden se deduplican y se
+vuelven a notificar solo tras un tiempo de enfriamiento
+"""
+import html
+import json
+import os
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fleet_index import FleetIndex, location_label
+from models import Fleet, STATUS_MINING, STATUSES
+from rig_state import ChangeSet, RigStateEngine
+import config
+
+# Orden de gravedad (para escalar una alerta ya activa)
+SEVERITIES = ('warning', 'critical')
+
+SEVERITY_ICONS = {'warning': '⚠️', 'critical': '🔴'}
+
+# Líneas por sección del mensaje; el resto se resume en "y N más"
+MAX_LINES = 25
+
+
+@dataclass
+class Alert:
+    """Alerta que coincide en el snapshot actual"""
+    key: str
+    rule: str
+    severity: str
+    text: str
+    rig: Optional[str] = None
+
+
+def default_rules() -> List[Dict]:
+    """Reglas por defecto a partir de config (ALERT_*)"""
+    rules = [
+        {'type': 'offline', 'checks': config.ALERT_OFFLINE_CHECKS, 'severity': 'critical'},
+        {'type': 'rejection_rate', 'threshold': config.ALERT_REJECTION_RATE, 'severity': 'warning'},
+        {'type': 'fleet_drop', 'points': config.ALERT_FLEET_DROP, 'severity': 'critical'},
+    ]
+    if config.ALERT_SUBNET_OFFLINE > 0:
+        rules.append({'type': 'subnet_offline', 'rigs': config.ALERT_SUBNET_OFFLINE, 'severity': 'critical'})
+    if config.ALERT_SUPPRESS_FLAPPING:
+        rules.append({'type': 'flapping', 'severity': 'warning'})
+    return rules
+
+
+def load_rules(path: Optional[str] = None) -> List[Dict]:
+    """
+    Lee las reglas de un archivo JSON (lista de reglas) o usa las de config
+
+    Tipos de regla:
+        {"type": "offline", "checks": 3, "severity": "critical"}
+            rig sin minar durante al menos N checks seguidos
+        {"type": "rejection_rate", "threshold": 5, "algorithm": "DAGGERHASHIMOTO", "per_rig": false}
+            tasa de rechazo (%) del algoritmo ("*" o sin algorithm = todos), de la
+            flota o, con per_rig, de cada rig
+        {"type": "fleet_drop", "points": 10}
+            el % de rigs activos cae N puntos respecto de la última lectura sana
+        {"type": "subnet_offline", "rigs": 10, "percent": 50}
+            una subred (nombre sin el último segmento, ver fleet_index.py) tiene al
+            menos N rigs sin minar o, con percent, al menos ese % de sus rigs
+        {"type": "flapping"}
+            los rigs que oscilan no generan alertas de offline, solo una de oscilación
+
+    Args:
+        path: Archivo de reglas (por defecto config.ALERT_RULES_FILE)
+
+    Returns:
+        Lista de reglas
+    """
+    path = path if path is not None else config.ALERT_RULES_FILE
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return default_rules()
+
+
+class CompiledRules:
+    """
+    Reglas agrupadas para evaluarlas en una sola pasada
+
+    - offline: umbrales ordenados; cada rig parado se ubica con bisect en el
+      umbral más alto que supera
+    - rejection_rate: umbrales ordenados por algoritmo (y comodín), separados
+      en reglas de flota y por rig
+    - fleet_drop: umbrales ordenados; la caída se calcula una sola vez
+    - subnet_offline: umbrales (rigs, %) leídos de los contadores del índice
+      de la flota, sin recorrer los rigs
+    """
+
+    def __init__(self, rules: Iterable[Dict]):
+        offline = []
+        fleet_rejection: Dict[str, List[Tuple[float, str]]] = {}
+        rig_rejection: Dict[str, List[Tuple[float, str]]] = {}
+        drops = []
+        self.subnet_offline: List[Tuple[int, float, str]] = []
+        self.suppress_flapping = False
+        self.flapping_severity = 'warning'
+
+        for rule in rules:
+            kind = rule.get('type')
+            severity = rule.get('severity', 'warning')
+            if severity not in SEVERITIES:
+                raise ValueError(f"Gravedad desconocida en la regla {rule}: {severity}")
+            if kind == 'offline':
+                offline.append((int(rule['checks']), severity))
+            elif kind == 'rejection_rate':
+                target = rig_rejection if rule.get('per_rig') else fleet_rejection
+                algorithm = (rule.get('algorithm') or '*').upper()
+                target.setdefault(algorithm, []).append((float(rule['threshold']), severity))
+            elif kind == 'fleet_drop':
+                drops.append((float(rule['points']), severity))
+            elif kind == 'subnet_offline':
+                self.subnet_offline.append((int(rule.get('rigs', 0)), float(rule.get('percent', 0)), severity))
+            elif kind == 'flapping':
+                self.suppress_flapping = True
+                self.flapping_severity = severity
+            else:
+                raise ValueError(f"Tipo de regla desconocido: {kind}")
+
+        offline.sort()
+        self.offline_checks = [checks for checks, _ in offline]
+        self.offline_severity = [severity for _, severity in offline]
+        self.fleet_rejection = {algo: sorted(levels) for algo, levels in fleet_rejection.items()}
+        self.rig_rejection = {algo: sorted(levels) for algo, levels in rig_rejection.items()}
+        drops.sort()
+        self.fleet_drop = drops
+
+    @staticmethod
+    def match_level(levels: List[Tuple[float, str]], value: float) -> Optional[Tuple[float, str]]:
+        """Umbral más alto superado por value (o None)"""
+        matched = None
+        for threshold, severity in levels:
+            if value > threshold:
+                matched = (threshold, severity)
+            else:
+                break
+        return matched
+
+    def rejection_levels(self, table: Dict, algorithm: str) -> List[Tuple[float, str]]:
+        """Umbrales aplicables a un algoritmo (los propios más los del comodín)"""
+        levels = table.get(algorithm, []) + table.get('*', [])
+        return sorted(levels) if algorithm in table and '*' in table else levels
+
+
+class AlertEngine:
+    """
+    Evalúa las reglas en cada snapshot y decide qué notificar
+
+    Una alerta se notifica cuando aparece, cuando sube de gravedad o, si sigue
+    activa, cada `cooldown` segundos. Cuando deja de coincidir se notifica como
+    resuelta. Las alertas activas y las lecturas sanas de la flota se guardan
+    en `state_file` para que la deduplicación sobreviva entre ejecuciones.
+
+    La línea base de fleet_drop es el máximo % de rigs activos de las lecturas
+    sanas de los últimos `drop_window` segundos (se conserva siempre la última),
+    así una caída gradual se compara contra el nivel previo y no contra la
+    lectura anterior.
+    """
+
+    def __init__(self, rules: Optional[Iterable[Dict]] = None, state_file: Optional[str] = None,
+                 cooldown: Optional[float] = None, drop_window: Optional[float] = None):
+        """
+        Args:
+            rules: Reglas sin compilar (por defecto load_rules())
+            state_file: Archivo JSON de alertas activas (None = solo en memoria)
+            cooldown: Segundos antes de repetir una alerta activa (por defecto config.ALERT_COOLDOWN)
+            drop_window: Segundos de lecturas sanas que forman la línea base de
+                fleet_drop (por defecto config.ALERT_FLEET_DROP_WINDOW)
+        """
+        self.rules = CompiledRules(rules if rules is not None else load_rules())
+        self.state_file = state_file
+        self.cooldown = config.ALERT_COOLDOWN if cooldown is None else cooldown
+        self.drop_window = config.ALERT_FLEET_DROP_WINDOW if drop_window is None else drop_window
+        self.active: Dict[str, Dict] = {}
+        # [instante, % de rigs activos] de las lecturas sin caída, en orden
+        self.readings: List[List[float]] = []
+        self._readings_changed = False
+        self.load()
+
+    def load(self):
+        """Carga las alertas activas de la ejecución anterior"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.active = data.get('active', {})
+            self.readings = data.get('readings', [])
+            if not self.readings and data.get('baseline') is not None:
+                # Formato anterior: una sola línea base
+                self.readings = [[time.time(), data['baseline']]]
+        except Exception as e:
+            print(f"⚠️  Error al cargar alertas activas: {e}")
+
+    def save(self):
+        """Guarda las alertas activas (reemplazo atómico)"""
+        if not self.state_file:
+            return
+        try:
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'active': self.active, 'readings': self.readings}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+            self._readings_changed = False
+        except Exception as e:
+            print(f"⚠️  Error al guardar alertas activas: {e}")
+
+    @property
+    def baseline(self) -> Optional[float]:
+        """Línea base de fleet_drop: máximo % de rigs activos de las lecturas sanas"""
+        return max(ratio for _, ratio in self.readings) if self.readings else None
+
+    def _expire_readings(self, now: float):
+        """Descarta las lecturas fuera de la ventana, conservando siempre la última"""
+        limit = now - self.drop_window
+        expired = 0
+        while expired < len(self.readings) - 1 and self.readings[expired][0] < limit:
+            expired += 1
+        if expired:
+            del self.readings[:expired]
+            self._readings_changed = True
+
+    def _flapping(self, changes: Optional[ChangeSet], states: Optional[RigStateEngine]) -> Set[str]:
+        """Rigs que oscilan en este check"""
+        flapping = set(changes.flapping) if changes is not None else set()
+        if states is not None:
+            flapping.update(name for name in states.transitions if states.is_flapping(name))
+        return flapping
+
+    def evaluate(self, fleet: Fleet, changes: Optional[ChangeSet] = None,
+                 states: Optional[RigStateEngine] = None,
+                 fleet_index: Optional[FleetIndex] = None) -> List[Alert]:
+        """
+        Evalúa todas las reglas sobre un snapshot
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de este check (para la supresión de oscilaciones)
+            states: Motor de estados (checks que cada rig lleva en su estado)
+            fleet_index: Índice de la flota ya actualizado (para las reglas por subred)
+
+        Returns:
+            Alertas que coinciden ahora (activas), sin deduplicar
+        """
+        rules = self.rules
+        columns = fleet.columns
+        alerts: List[Alert] = []
+        flapping = self._flapping(changes, states) if rules.suppress_flapping else set()
+
+        # Rigs parados: una pasada por la columna de estados
+        if rules.offline_checks and states is not None:
+            names = columns.names
+            for index, code in enumerate(columns.status):
+                if code == STATUS_MINING:
+                    continue
+                name = names[index]
+                if name in flapping:
+                    continue
+                checks = states.checks_in_state(name) + 1
+                level = bisect_right(rules.offline_checks, checks)
+                if level:
+                    threshold = rules.offline_checks[level - 1]
+                    alerts.append(Alert(
+                        f"offline:{name}", f"offline>={threshold}", rules.offline_severity[level - 1],
+                        f"{name}: {STATUSES.name(code)} desde hace {checks} checks", name
+                    ))
+
+        for name in sorted(flapping):
+            alerts.append(Alert(
+                f"flapping:{name}", 'flapping', rules.flapping_severity,
+                f"{name}: oscilando (alertas de offline suprimidas)", name
+            ))
+
+        # Tasa de rechazo: un slice contiguo por algoritmo
+        if rules.fleet_rejection or rules.rig_rejection:
+            for algorithm, (start, end) in columns.algo_slices.items():
+                fleet_levels = rules.rejection_levels(rules.fleet_rejection, algorithm)
+                if fleet_levels:
+                    accepted = sum(columns.speed_accepted[start:end])
+                    rejected = sum(columns.speed_rejected[start:end])
+                    total = accepted + rejected
+                    rate = rejected / total * 100 if total > 0 else 0.0
+                    level = rules.match_level(fleet_levels, rate)
+                    if level:
+                        alerts.append(Alert(
+                            f"rejection:{algorithm}", f"rejection>{level[0]:g}%", level[1],
+                            f"{algorithm}: tasa de rechazo {rate:.2f}% (umbral {level[0]:g}%)"
+                        ))
+
+                rig_levels = rules.rejection_levels(rules.rig_rejection, algorithm)
+                if rig_levels:
+                    lowest = rig_levels[0][0]
+                    names = columns.names
+                    for rig_index, accepted, rejected in zip(
+                        columns.stat_rig[start:end],
+                        columns.speed_accepted[start:end],
+                        columns.speed_rejected[start:end]
+                    ):
+                        total = accepted + rejected
+                        if total <= 0:
+                            continue
+                        rate = rejected / total * 100
+                        if rate <= lowest:
+                            continue
+                        threshold, severity = rules.match_level(rig_levels, rate)
+                        name = names[rig_index]
+                        alerts.append(Alert(
+                            f"rejection:{algorithm}:{name}", f"rejection>{threshold:g}%", severity,
+                            f"{name} ({algorithm}): tasa de rechazo {rate:.2f}% (umbral {threshold:g}%)", name
+                        ))
+
+        # Subredes con muchos rigs parados: contadores del índice, O(subredes)
+        if rules.subnet_offline and fleet_index is not None:
+            for (group, subnet), node in fleet_index.subnets.items():
+                offline = node.offline
+                if not offline or not subnet:
+                    continue
+                percent = offline / node.total * 100
+                matched = None
+                for rigs, min_percent, severity in rules.subnet_offline:
+                    if (rigs and offline >= rigs) or (min_percent and percent >= min_percent):
+                        if matched is None or SEVERITIES.index(severity) > SEVERITIES.index(matched):
+                            matched = severity
+                if matched:
+                    label = location_label(group, subnet)
+                    alerts.append(Alert(
+                        f"subnet:{label}", 'subnet_offline', matched,
+                        f"Subred {label}: {offline} de {node.total} rigs sin minar"
+                    ))
+
+        # Caída del % de rigs activos respecto del máximo de las lecturas sanas recientes
+        if rules.fleet_drop and len(fleet) and not fleet.partial:
+            now = time.time()
+            ratio = columns.active_count() / len(fleet) * 100
+            self._expire_readings(now)
+            baseline = self.baseline
+            matched = None
+            if baseline is not None:
+                drop = baseline - ratio
+                for points, severity in rules.fleet_drop:
+                    if drop >= points:
+                        matched = (points, severity)
+            if matched:
+                alerts.append(Alert(
+                    'fleet_drop', f"fleet_drop>={matched[0]:g}", matched[1],
+                    f"Rigs activos: {ratio:.1f}% (antes {baseline:.1f}%, caída de "
+                    f"{baseline - ratio:.1f} puntos)"
+                ))
+            else:
+                # Las lecturas durante una caída no entran en la línea base
+                self.readings.append([now, ratio])
+                self._readings_changed = True
+
+        return alerts
+
+    def dispatch(self, alerts: List[Alert], now: Optional[float] = None) -> Tuple[List[Alert], List[Dict]]:
+        """
+        Deduplica las alertas contra las activas
+
+        Args:
+            alerts: Resultado de evaluate()
+            now: Instante actual (por defecto time.time())
+
+        Returns:
+            Tupla (alertas a notificar, alertas resueltas)
+        """
+        now = time.time() if now is None else now
+        fired = []
+        current = {}
+        for alert in alerts:
+            current[alert.key] = alert
+            previous = self.active.get(alert.key)
+            escalated = (previous is not None and
+                         SEVERITIES.index(alert.severity) > SEVERITIES.index(previous['severity']))
+            if previous is None or escalated or now - previous['sent'] >= self.cooldown:
+                fired.append(alert)
+                self.active[alert.key] = {
+                    'since': previous['since'] if previous else now,
+                    'sent': now,
+                    'severity': alert.severity,
+                    'text': alert.text,
+                }
+
+        resolved = []
+        for key in [key for key in self.active if key not in current]:
+            resolved.append(dict(self.active.pop(key), key=key))
+
+        # Sin cambios en las alertas activas ni en las lecturas no hace falta reescribir el archivo
+        if fired or resolved or self._readings_changed:
+            self.save()
+        return fired, resolved
+
+    @staticmethod
+    def shown(fired: List[Alert]) -> List[Alert]:
+        """Alertas nuevas que entran en el mensaje, por severidad (las más graves primero)"""
+        ordered = sorted(fired, key=lambda alert: (-SEVERITIES.index(alert.severity), alert.key))
+        return ordered[:MAX_LINES]
+
+    @staticmethod
+    def format_message(account_name: str, fired: List[Alert], resolved: List[Dict]) -> Optional[str]:
+        """
+        Mensaje de Telegram con las alertas nuevas y las resueltas
+
+        Se envía con parse_mode HTML: los textos (nombres de rigs y estados de
+        la API) se escapan y solo el marcado propio queda sin escapar.
+
+        Args:
+            account_name: Nombre de la cuenta
+            fired: Alertas a notificar
+            resolved: Alertas resueltas
+
+        Returns:
+            Texto del mensaje, o None si no hay nada que notificar
+        """
+        if not fired and not resolved:
+            return None
+
+        message = f"🚨 <b>Alertas - {account_name}</b>\n"
+        if fired:
+            message += "\n"
+            for alert in AlertEngine.shown(fired):
+                message += f"{SEVERITY_ICONS[alert.severity]} {html.escape(alert.text)}\n"
+            if len(fired) > MAX_LINES:
+                message += f"… y {len(fired) - MAX_LINES} más\n"
+        if resolved:
+            message += f"\n✅ <b>Resueltas:</b>\n"
+            for entry in resolved[:MAX_LINES]:
+                message += f"• {html.escape(entry['text'])}\n"
+            if len(resolved) > MAX_LINES:
+                message += f"… y {len(resolved) - MAX_LINES} más\n"
+        return message
+
+    @staticmethod
+    def format_details(account_name: str, fired: List[Alert], details: Dict[str, str]) -> Optional[str]:
+        """
+        Mensaje de seguimiento con el detalle de los rigs de las alertas nuevas
+
+        Se envía después del de las alertas, para que la descarga del detalle
+        no retrase la alerta.
+
+        Args:
+            account_name: Nombre de la cuenta
+            fired: Alertas notificadas
+            details: Resumen del detalle por nombre de rig (ver rig_details.py)
+
+        Returns:
+            Texto del mensaje, o None si ninguna alerta tiene detalle
+        """
+        lines = []
+        for alert in AlertEngine.shown(fired):
+            if alert.rig in details:
+                lines.append(f"{SEVERITY_ICONS[alert.severity]} <b>{html.escape(alert.rig)}</b>: "
+                             f"{html.escape(details[alert.rig])}")
+        if not lines:
+            return None
+        return f"🔎 <b>Detalle de rigs - {account_name}</b>\n\n" + "\n".join(lines) + "\n"
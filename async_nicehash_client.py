@@ -0,0 +1,190 @@
+"""
+Cliente asíncrono (asyncio) para la API de NiceHash
+Expone los mismos endpoints que NiceHashClient y permite lanzar varias
+peticiones a la vez compartiendo la firma HMAC y el pool de conexiones
+"""
+import asyncio
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Sequence
+
+from nicehash_client import NiceHashClient, RIGS_ENDPOINT
+import config
+
+# Rigs que iter_rigs() saca del iterador síncrono por cada salto al executor
+ITER_BATCH_SIZE = 100
+
+
+class AsyncNiceHashClient:
+    """
+    Versión asyncio de NiceHashClient
+    
+    Las peticiones usan la sesión (pool keep-alive) y la firma del cliente
+    síncrono, y se ejecutan en un executor acotado al tamaño del pool, de
+    modo que nunca hay más peticiones en vuelo que conexiones disponibles.
+    """
+    
+    def __init__(self, client: Optional[NiceHashClient] = None,
+                 max_concurrency: Optional[int] = None, close_client: bool = True):
+        """
+        Inicializa el cliente asíncrono
+        
+        Args:
+            client: Cliente síncrono a reutilizar (por defecto se crea uno nuevo)
+            max_concurrency: Peticiones simultáneas (por defecto el tamaño del pool)
+            close_client: Si es True, close() también cierra el cliente síncrono
+        """
+        self.client = client or NiceHashClient()
+        self.max_concurrency = max_concurrency or self.client.pool_size
+        self._close_client = close_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix='nicehash'
+        )
+    
+    async def _run(self, func, *args, **kwargs):
+        """Ejecuta una llamada bloqueante del cliente síncrono en el executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+    
+    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Dict:
+        """Versión asíncrona de NiceHashClient._make_request"""
+        return await self._run(self.client._make_request, method, endpoint, params)
+    
+    async def close(self):
+        """Libera el executor y, si corresponde, el pool de conexiones"""
+        # shutdown(wait=True) bloquea hasta que terminan las peticiones en
+        # vuelo: se espera en un hilo aparte para no frenar el event loop
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        if self._close_client:
+            self.client.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+    
+    async def get_rigs(self, get_all_pages: bool = True, page_size: Optional[int] = None,
+                       allow_partial: bool = True) -> Dict:
+        """
+        Obtiene información de todos los rigs; las páginas 1..N se piden a la vez
+        
+        Args:
+            get_all_pages: Si es True, obtiene todos los rigs de todas las páginas
+            page_size: Rigs por página (por defecto config.RIGS_PAGE_SIZE)
+            allow_partial: Si una página falla, devuelve el resto marcado como parcial
+            
+        Returns:
+            Diccionario con información de los rigs (mismo formato que NiceHashClient.get_rigs)
+        """
+        size = page_size or config.RIGS_PAGE_SIZE
+        result = await self._make_request('GET', RIGS_ENDPOINT, {'page': 0, 'size': size})
+        
+        if not get_all_pages or 'pagination' not in result:
+            return result
+        
+        total_pages = result['pagination'].get('totalPageCount', 1)
+        if total_pages <= 1:
+            return result
+        
+        pages = range(1, total_pages)
+        page_results = await asyncio.gather(*(
+            self._run(self.client._fetch_rigs_page, page, size, allow_partial)
+            for page in pages
+        ))
+        
+        return self.client._merge_rig_pages(result, pages, list(page_results))
+    
+    async def iter_rigs(self, fields: Optional[Sequence[str]] = ('rigId', 'name', 'minerStatus'),
+                        page_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """
+        Versión asíncrona de NiceHashClient.iter_rigs (parseo en streaming)
+        
+        Las páginas se leen en el executor y los rigs se entregan en tandas
+        de ITER_BATCH_SIZE, así el event loop no se bloquea con la descarga.
+        
+        Args:
+            fields: Campos de cada rig a conservar (None = rig completo)
+            page_size: Rigs por página (por defecto config.RIGS_PAGE_SIZE)
+            
+        Yields:
+            Un diccionario por rig con los campos pedidos
+        """
+        rigs = self.client.iter_rigs(fields, page_size)
+        try:
+            while True:
+                batch = await self._run(lambda: list(itertools.islice(rigs, ITER_BATCH_SIZE)))
+                if not batch:
+                    break
+                for rig in batch:
+                    yield rig
+        finally:
+            # Cierra la respuesta en streaming aunque se abandone la iteración
+            # (el generador está detenido: cerrarlo no hace E/S bloqueante)
+            rigs.close()
+    
+    async def get_rig_details(self, rig_id: str) -> Dict:
+        """Obtiene el detalle de un rig (dispositivos, temperaturas, velocidades)"""
+        return await self._run(self.client.get_rig_details, rig_id)
+    
+    async def get_active_workers(self) -> Dict:
+        """Obtiene información de los workers activos"""
+        return await self._run(self.client.get_active_workers)
+    
+    async def get_rig_stats_algo(self) -> Dict:
+        """Obtiene estadísticas por algoritmo de los rigs"""
+        return await self._run(self.client.get_rig_stats_algo)
+    
+    async def get_daily_earnings(self, from_date: Optional[str] = None, to_date: Optional[str] = None) -> Dict:
+        """Obtiene ganancias diarias en un rango de fechas (YYYY-MM-DD)"""
+        return await self._run(self.client.get_daily_earnings, from_date, to_date)
+    
+    async def get_algo_stats(self) -> Dict:
+        """Obtiene estadísticas generales por algoritmo"""
+        return await self._run(self.client.get_algo_stats)
+    
+    async def get_payouts(self) -> Dict:
+        """Obtiene información de pagos realizados"""
+        return await self._run(self.client.get_payouts)
+    
+    async def get_mining_address(self) -> Dict:
+        """Obtiene la dirección de minería configurada"""
+        return await self._run(self.client.get_mining_address)
+    
+    async def get_unpaid_stats(self) -> Dict:
+        """Obtiene estadísticas de balance no pagado"""
+        return await self._run(self.client.get_unpaid_stats)
+    
+    async def get_account_info(self) -> Dict:
+        """Obtiene información de la cuenta"""
+        return await self._run(self.client.get_account_info)
+    
+    async def get_snapshot(self) -> Dict:
+        """
+        Obtiene una foto completa de la cuenta con peticiones concurrentes
+        
+        Un endpoint que falla no invalida al resto: su clave contiene
+        {"error": "..."} igual que en export_stats.py.
+        
+        Returns:
+            Diccionario con las claves 'rigs', 'algo_stats', 'unpaid' y 'payouts'
+        """
+        keys = ('rigs', 'algo_stats', 'unpaid', 'payouts')
+        results = await asyncio.gather(
+            self.get_rigs(),
+            self.get_algo_stats(),
+            self.get_unpaid_stats(),
+            self.get_payouts(),
+            return_exceptions=True
+        )
+        
+        snapshot = {}
+        for key, value in zip(keys, results):
+            if isinstance(value, Exception):
+                print(f"⚠️  Error al obtener {key}: {value}")
+                snapshot[key] = {"error": str(value)}
+            else:
+                snapshot[key] = value
+        return snapshot
@@ -0,0 +1,6 @@
+"""
+Benchmarks del cliente de NiceHash contra servidores locales (sin credenciales reales)
+
+Ejecutar desde la raíz del proyecto, por ejemplo:
+    python -m benchmarks.bench_http_pool
+"""
@@ -0,0 +1,90 @@
+"""
+Benchmark: dataset en columnas vs. exportaciones JSON para el resumen de un mes
+
+Agrega N snapshots horarios de una flota sintética (con cambios de estado
+entre snapshots) al dataset de columnar_export.py y mide el tiempo de append,
+el espacio ocupado y el resumen del rango completo. Como referencia escribe
+una muestra de exportaciones JSON (indent=2, como export_stats.py) y mide el
+resumen en streaming de generate_summary_report, extrapolado a N snapshots.
+
+Uso:
+    python -m benchmarks.bench_columnar [num_rigs] [snapshots] [muestra_json]
+"""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.mock_server import MockNiceHashServer
+from columnar_export import ColumnarDataset
+from export_stats import generate_summary_report
+
+HOUR = 3600
+
+
+def main():
+    num_rigs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    snapshots = int(sys.argv[2]) if len(sys.argv) > 2 else 720
+    sample = int(sys.argv[3]) if len(sys.argv) > 3 else 24
+
+    server = MockNiceHashServer(num_rigs=num_rigs)
+    workdir = tempfile.mkdtemp(prefix='nicehash-columnar-')
+    try:
+        dataset = ColumnarDataset(os.path.join(workdir, 'columnar'))
+        start_ts = int(time.time()) - snapshots * HOUR
+        query = {'page': ['0'], 'size': [str(num_rigs)]}
+
+        print(f"\n{snapshots} snapshots horarios de {num_rigs} rigs\n")
+
+        append_seconds = 0.0
+        json_seconds = 0.0
+        json_bytes = 0
+        json_files = []
+        for i in range(snapshots):
+            server.churn(0.02)
+            payload = server.rigs_page(query)
+            ts = start_ts + i * HOUR
+
+            started = time.perf_counter()
+            dataset.append(payload, ts)
+            append_seconds += time.perf_counter() - started
+
+            if i < sample:
+                path = os.path.join(workdir, f"nicehash_stats_{i:04d}.json")
+                started = time.perf_counter()
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump({"timestamp": str(ts), "rigs": payload}, f, indent=2, ensure_ascii=False)
+                json_seconds += time.perf_counter() - started
+                json_bytes += os.path.getsize(path)
+                json_files.append(path)
+
+        info = dataset.info()
+        started = time.perf_counter()
+        summary = dataset.summary()
+        summary_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for path in json_files:
+                generate_summary_report(path)
+        json_summary_seconds = (time.perf_counter() - started) / len(json_files) * snapshots
+
+        factor = snapshots / len(json_files)
+        print(f"  {'formato':<22} {'append/snapshot':>16} {'espacio':>10} {'resumen del rango':>18}")
+        print(f"  {'columnas':<22} {append_seconds / snapshots * 1000:13.1f} ms "
+              f"{info['bytes'] / 1_000_000:7.1f} MB {summary_seconds:15.2f} s")
+        print(f"  {'JSON (extrapolado)':<22} {json_seconds / len(json_files) * 1000:13.1f} ms "
+              f"{json_bytes * factor / 1_000_000:7.1f} MB {json_summary_seconds:15.2f} s")
+        print(f"\n  Filas: {info['rows']}  Snapshots resumidos: {summary['snapshots']}  "
+              f"Activos en el último: {summary['series'][-1][2]}")
+    finally:
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: conexiones por petición vs. sesión con pool keep-alive
+
+Mide handshakes (conexiones TCP aceptadas por el servidor) y tiempo total de un
+get_rigs completo multi-página contra el servidor local de benchmarks/stub_server.py.
+
+Uso:
+    python -m benchmarks.bench_http_pool [num_rigs] [repeticiones] [tamaño_página]
+"""
+import os
+import sys
+import time
+
+import requests
+
+from benchmarks.stub_server import StubNiceHashServer
+
+# Credenciales ficticias: el servidor local no valida la firma
+os.environ.setdefault('NICEHASH_API_KEY', 'bench-key')
+os.environ.setdefault('NICEHASH_API_SECRET', 'bench-secret')
+os.environ.setdefault('NICEHASH_ORG_ID', 'bench-org')
+
+from nicehash_client import NiceHashClient  # noqa: E402
+
+
+class _UnpooledSession:
+    """Reproduce el comportamiento anterior: una conexión nueva por petición"""
+    
+    def request(self, method, url, **kwargs):
+        return requests.request(method, url, **kwargs)
+    
+    def close(self):
+        pass
+
+
+def run_case(label: str, server: StubNiceHashServer, client: NiceHashClient,
+             repeats: int, page_size: int) -> None:
+    server.reset_counters()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = client.get_rigs(page_size=page_size)
+    elapsed = time.perf_counter() - start
+    
+    print(f"{label:<22} rigs={len(result['miningRigs']):<6} "
+          f"peticiones={server.requests:<5} handshakes={server.connections:<5} "
+          f"tiempo={elapsed * 1000 / repeats:.1f} ms/get_rigs")
+
+
+def main():
+    num_rigs = int(sys.argv[1]) if len(sys.argv) > 1 else 372
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    page_size = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+    
+    server = StubNiceHashServer(num_rigs=num_rigs).start()
+    try:
+        print(f"\nget_rigs completo sobre {num_rigs} rigs, {repeats} repeticiones, "
+              f"páginas de {page_size}\n")
+        
+        unpooled = NiceHashClient()
+        unpooled.base_url = server.url
+        unpooled.session = _UnpooledSession()
+        run_case("sin pool (antes)", server, unpooled, repeats, page_size)
+        
+        with NiceHashClient() as pooled:
+            pooled.base_url = server.url
+            run_case("sesión con pool", server, pooled, repeats, page_size)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
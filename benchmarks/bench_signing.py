@@ -0,0 +1,108 @@
+"""
+Benchmark: firma HMAC por petición vs. contexto de firma precalculado
+
+Antes de medir comprueba que RequestSigner produce exactamente las mismas
+firmas que la implementación anterior con los vectores de test_signing.py
+(la prueba que falla si cambia la firma). Después mide firmas por segundo
+y headers completos por segundo de ambas versiones.
+
+Uso:
+    python -m benchmarks.bench_signing [iteraciones]
+"""
+import hashlib
+import hmac
+import sys
+import time
+import uuid
+
+from nicehash_client import RequestSigner
+from test_signing import GOLDEN_VECTORS
+
+
+def legacy_signature(api_key: str, api_secret: str, org_id: str, timestamp: str, nonce: str,
+                     method: str, path: str, query: str = "", body: str = "") -> str:
+    """Firma como la calculaba NiceHashClient._generate_signature antes de RequestSigner"""
+    message = api_key.encode('latin-1')
+    message += b'\x00' + timestamp.encode('latin-1')
+    message += b'\x00' + nonce.encode('latin-1')
+    message += b'\x00'
+    message += b'\x00' + org_id.encode('latin-1')
+    message += b'\x00'
+    message += b'\x00' + method.encode('latin-1')
+    message += b'\x00' + path.encode('latin-1')
+    message += b'\x00' + query.encode('latin-1')
+    if body:
+        message += b'\x00' + body.encode('utf-8')
+    return hmac.new(api_secret.encode('latin-1'), message, hashlib.sha256).hexdigest()
+
+
+def legacy_headers(api_key: str, api_secret: str, org_id: str, method: str, path: str, query: str) -> dict:
+    """Headers como los armaba _make_request antes de la plantilla"""
+    timestamp = str(int(time.time() * 1000))
+    nonce = str(uuid.uuid4())
+    signature = legacy_signature(api_key, api_secret, org_id, timestamp, nonce, method, path, query)
+    return {
+        'X-Time': timestamp,
+        'X-Nonce': nonce,
+        'X-Organization-Id': org_id,
+        'X-Request-Id': str(uuid.uuid4()),
+        'X-Auth': f"{api_key}:{signature}",
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+    }
+
+
+def check_golden_vectors() -> bool:
+    """Compara ambas implementaciones con las firmas esperadas"""
+    ok = True
+    for api_key, secret, org_id, timestamp, nonce, method, path, query, body, expected in GOLDEN_VECTORS:
+        signer = RequestSigner(api_key, secret, org_id)
+        _, _, signature = signer.sign(method, path, query, body, timestamp=timestamp, nonce=nonce)
+        legacy = legacy_signature(api_key, secret, org_id, timestamp, nonce, method, path, query, body)
+        matches = signature == expected and legacy == expected
+        ok = ok and matches
+        print(f"  {'✅' if matches else '❌'} {method} {path}")
+    return ok
+
+
+def rate(func, iterations: int) -> float:
+    """Llamadas por segundo"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    print("\nVectores de referencia")
+    if not check_golden_vectors():
+        print("\n❌ Las firmas no coinciden con la implementación anterior")
+        sys.exit(1)
+
+    api_key, secret, org_id = 'bench-key', 'bench-secret-' + 'x' * 60, 'bench-org'
+    signer = RequestSigner(api_key, secret, org_id)
+    method, path, query = 'GET', '/main/api/v2/mining/rigs', 'page=3&size=25'
+    timestamp, nonce = '1700000000000', str(uuid.uuid4())
+
+    cases = (
+        ('firma (anterior)', lambda: legacy_signature(api_key, secret, org_id, timestamp, nonce, method, path, query)),
+        ('firma (precalculada)', lambda: signer.sign(method, path, query, timestamp=timestamp, nonce=nonce)),
+        ('headers (anterior)', lambda: legacy_headers(api_key, secret, org_id, method, path, query)),
+        ('headers (plantilla)', lambda: signer.headers(method, path, query)),
+    )
+
+    print(f"\n{iterations} iteraciones\n")
+    results = {}
+    for label, func in cases:
+        rate(func, iterations // 10)  # calentamiento
+        results[label] = rate(func, iterations)
+        print(f"  {label:<22} {results[label]:>12,.0f} /s")
+
+    print(f"\n  Firma:   {results['firma (precalculada)'] / results['firma (anterior)']:.2f}x")
+    print(f"  Headers: {results['headers (plantilla)'] / results['headers (anterior)']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: response.json() completo vs. parseo en streaming (RigStream)
+
+Sobre payloads sintéticos de miningRigs (1k y 10k rigs con la forma de
+nicehash_stats.json) mide tiempo total, tiempo hasta el primer rig y pico de
+memoria al quedarse solo con name y minerStatus.
+
+Uso:
+    python -m benchmarks.bench_streaming [num_rigs ...]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.stub_server import build_fleet, load_rig_template
+from rig_stream import RigStream
+
+CHUNK_SIZE = 1 << 16
+FIELDS = ('name', 'minerStatus')
+
+
+def make_payload(num_rigs: int) -> bytes:
+    rigs = build_fleet(num_rigs, load_rig_template())
+    return json.dumps({
+        "totalRigs": num_rigs,
+        "miningRigs": rigs,
+        "pagination": {"size": num_rigs, "page": 0, "totalPageCount": 1}
+    }).encode('utf-8')
+
+
+def chunks(payload: bytes):
+    for start in range(0, len(payload), CHUNK_SIZE):
+        yield payload[start:start + CHUNK_SIZE]
+
+
+def full_parse(payload: bytes):
+    """Equivalente a response.json(): une el cuerpo y parsea todo el documento"""
+    first = None
+    data = json.loads(b''.join(chunks(payload)))
+    rigs = []
+    for rig in data['miningRigs']:
+        rigs.append({field: rig.get(field) for field in FIELDS})
+        if first is None:
+            first = time.perf_counter()
+    return rigs, first
+
+
+def stream_parse(payload: bytes):
+    first = None
+    rigs = []
+    for rig in RigStream(chunks(payload), FIELDS):
+        rigs.append(rig)
+        if first is None:
+            first = time.perf_counter()
+    return rigs, first
+
+
+def measure(label: str, func, payload: bytes):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rigs, first = func(payload)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    print(f"  {label:<18} rigs={len(rigs):<6} total={elapsed * 1000:8.1f} ms  "
+          f"primer rig={(first - start) * 1000:8.2f} ms  pico={peak / 1_000_000:7.2f} MB")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    
+    for num_rigs in sizes:
+        payload = make_payload(num_rigs)
+        print(f"\n{num_rigs} rigs, payload de {len(payload) / 1_000_000:.1f} MB")
+        measure("response.json()", full_parse, payload)
+        measure("streaming", stream_parse, payload)
+
+
+if __name__ == "__main__":
+    main()
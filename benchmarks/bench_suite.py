@@ -0,0 +1,221 @@
+"""
+Benchmark: get_rigs, check_rigs, export_statistics y reporte diario contra la
+API simulada de benchmarks/mock_server.py
+
+Para cada tamaño de flota mide p50/p99 de latencia, pico de memoria (una
+repetición extra bajo tracemalloc) y peticiones por operación a NiceHash y a
+Telegram. Con --json los resultados se agregan a un archivo JSONL y con
+--compare se muestran las diferencias de p50 frente a una ejecución anterior.
+
+Uso:
+    python -m benchmarks.bench_suite [tamaños...] [--repeats N] [--latency MS]
+        [--rate-limit-every N] [--json archivo.jsonl] [--compare archivo.jsonl]
+"""
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.mock_server import MockNiceHashServer
+
+# Credenciales ficticias: el servidor local solo comprueba que haya cabeceras de firma
+os.environ.setdefault('NICEHASH_API_KEY', 'bench-key')
+os.environ.setdefault('NICEHASH_API_SECRET', 'bench-secret')
+os.environ.setdefault('NICEHASH_ORG_ID', 'bench-org')
+
+import config  # noqa: E402
+import metrics  # noqa: E402
+from export_stats import export_statistics  # noqa: E402
+from nicehash_client import NiceHashClient  # noqa: E402
+from telegram_bot import RigMonitor, TelegramNotifier, get_paraguay_time  # noqa: E402
+
+DEFAULT_SIZES = (100, 1000, 10000)
+
+# Fracción de rigs que cambia de estado entre dos verificaciones
+CHURN = 0.02
+
+
+def _option(args: List[str], name: str, default: Optional[str] = None) -> Optional[str]:
+    """Lee `--nombre valor` de la línea de comandos y lo quita de args"""
+    if name not in args:
+        return default
+    index = args.index(name)
+    value = args[index + 1] if index + 1 < len(args) else default
+    del args[index:index + 2]
+    return value
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(server: MockNiceHashServer, func: Callable[[], None], repeats: int,
+            before: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Ejecuta func `repeats` veces (más una bajo tracemalloc) y resume los tiempos
+
+    Args:
+        server: Servidor simulado (para contar peticiones)
+        func: Operación a medir
+        repeats: Repeticiones cronometradas
+        before: Preparación antes de cada repetición (no se cronometra)
+
+    Returns:
+        Diccionario con p50/p99/max en ms, pico de memoria en MB y peticiones por repetición
+    """
+    samples = []
+    server.reset_counters()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeats):
+            if before:
+                before()
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        counters = server.counters()
+
+        if before:
+            before()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    samples.sort()
+    telegram = sum(count for path, count in counters['paths'].items() if path.startswith('/bot'))
+    return {
+        'p50_ms': round(_percentile(samples, 50) * 1000, 2),
+        'p99_ms': round(_percentile(samples, 99) * 1000, 2),
+        'max_ms': round(samples[-1] * 1000, 2),
+        'peak_mb': round(peak / 1_000_000, 2),
+        'api_requests': round((counters['requests'] - telegram) / repeats, 1),
+        'telegram_requests': round(telegram / repeats, 1),
+        'rate_limited': counters['rate_limited'],
+    }
+
+
+def seed_daily_stats(monitor: RigMonitor, num_rigs: int):
+    """Escribe un día de lecturas (una cada 10 minutos) para el reporte de ayer"""
+    yesterday = get_paraguay_time() - timedelta(days=1)
+    date = yesterday.strftime('%Y-%m-%d')
+    start = int(yesterday.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+    for i in range(144):
+        active = num_rigs * 2 // 3 - (i % 7)
+        monitor.stats_store.append(date, start + i * 600, num_rigs, active, num_rigs - active)
+
+
+def run_size(num_rigs: int, repeats: int, latency: float, rate_limit_every: int) -> Dict:
+    """Mide los cuatro casos sobre una flota de num_rigs rigs"""
+    server = MockNiceHashServer(num_rigs=num_rigs, latency=latency,
+                                rate_limit_every=rate_limit_every).start()
+    config.API_URL = server.url
+    config.TELEGRAM_API_URL = server.url
+    results = {}
+    workdir = tempfile.mkdtemp(prefix='nicehash-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    notifier = None
+    try:
+        client = NiceHashClient()
+        notifier = TelegramNotifier('bench-token', 'bench-chat', outbox_file="", min_interval=0)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            monitor = RigMonitor(notifier, client=client, account_name='BENCH')
+            seed_daily_stats(monitor, num_rigs)
+
+        def flushed(func):
+            # Incluye la entrega a Telegram en la medición
+            def run():
+                func()
+                notifier.flush(config.TELEGRAM_FLUSH_TIMEOUT)
+            return run
+
+        def daily_report():
+            seed_daily_stats(monitor, num_rigs)
+            monitor.send_daily_report()
+
+        results['get_rigs'] = measure(server, client.get_rigs, repeats)
+        results['check_rigs'] = measure(server, flushed(monitor.check_rigs), repeats,
+                                        before=lambda: server.churn(CHURN))
+        results['export_statistics'] = measure(
+            server, lambda: export_statistics(os.path.join(workdir, 'nicehash_stats.json')), repeats)
+        results['daily_report'] = measure(server, flushed(daily_report), repeats)
+        client.close()
+    finally:
+        if notifier is not None:
+            notifier.close(1)
+        os.chdir(cwd)
+        server.stop()
+    return results
+
+
+def print_results(num_rigs: int, results: Dict, previous: Optional[Dict] = None):
+    print(f"\n{num_rigs} rigs")
+    print(f"  {'caso':<18} {'p50 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'pico MB':>8} "
+          f"{'API/op':>7} {'TG/op':>6} {'429':>4}")
+    for name, result in results.items():
+        line = (f"  {name:<18} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} {result['max_ms']:9.1f} "
+                f"{result['peak_mb']:8.2f} {result['api_requests']:7.1f} {result['telegram_requests']:6.1f} "
+                f"{result['rate_limited']:4d}")
+        before = (previous or {}).get(name)
+        if before and before.get('p50_ms'):
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+            marker = " ⚠️" if change > 10 else ""
+            line += f"   p50 {change:+.0f}%{marker}"
+        print(line)
+
+
+def load_previous(path: str) -> Dict[int, Dict]:
+    """Última medición de cada tamaño de flota guardada con --json"""
+    previous = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                previous[entry['rigs']] = entry['results']
+    return previous
+
+
+def main():
+    args = sys.argv[1:]
+    repeats = int(_option(args, '--repeats', '10'))
+    latency = float(_option(args, '--latency', '0')) / 1000
+    rate_limit_every = int(_option(args, '--rate-limit-every', '0'))
+    json_file = _option(args, '--json')
+    compare_file = _option(args, '--compare')
+    sizes = [int(arg) for arg in args] or list(DEFAULT_SIZES)
+
+    # Sin límite de peticiones por segundo: se mide el código, no la espera del limitador
+    config.API_RATE_LIMIT = 1000.0
+    config.API_RATE_BURST = 1000
+    config.CACHE_ENABLED = False
+    metrics.enabled = False
+
+    previous = load_previous(compare_file) if compare_file else {}
+
+    print(f"\n{repeats} repeticiones por caso, latencia simulada {latency * 1000:.0f} ms, "
+          f"429 cada {rate_limit_every or '∞'} peticiones")
+    for num_rigs in sizes:
+        results = run_size(num_rigs, repeats, latency, rate_limit_every)
+        print_results(num_rigs, results, previous.get(num_rigs))
+        if json_file:
+            with open(json_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'ts': int(time.time()), 'rigs': num_rigs, 'repeats': repeats,
+                                    'latency_ms': latency * 1000, 'results': results}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
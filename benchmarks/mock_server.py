@@ -0,0 +1,450 @@
+"""
+Servidor local que reemplaza a la API de NiceHash (y a sendMessage de Telegram)
+para medir el rendimiento sin credenciales reales
+
+Implementa los endpoints que usa NiceHashClient con paginación, latencia
+inyectada y respuestas 429 cada N peticiones, sobre flotas sintéticas generadas
+con la forma de nicehash_stats.json.
+
+Uso (servidor independiente para apuntar el bot a él):
+    python -m benchmarks.mock_server [num_rigs] [puerto]
+"""
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.stub_server import (
+    DEFAULT_PAGE_SIZE, StubNiceHashServer, _RigsHandler, build_fleet, load_rig_template
+)
+
+# Algoritmos de la flota sintética: (enumName, descripción, hashrate típico por rig, sufijo, peso)
+ALGORITHMS = (
+    ('SHA256ASICBOOST', 'SHA256AsicBoost', 1.1e14, 'TH', 70),
+    ('SCRYPT', 'Scrypt', 9.5e9, 'GH', 10),
+    ('KHEAVYHASH', 'kHeavyHash', 2.1e13, 'TH', 10),
+    ('ETCHASH', 'Etchash', 5.0e8, 'MH', 10),
+)
+
+# Detalle por rig: /main/api/v2/mining/rig2/{rigId} (se cuenta como un solo endpoint)
+RIG_DETAILS_PATH = '/main/api/v2/mining/rig2/'
+
+MINING_ADDRESS = "NHbXPYZmsoPvkcb87Qdb44TSEAnDxAuCgDYr"
+SATOSHI = 100_000_000
+
+
+def synthetic_fleet(num_rigs: int, template: Optional[dict] = None, seed: int = 0) -> List[dict]:
+    """
+    Genera una flota sintética con algoritmos, hashrate y balance variados
+
+    Parte de build_fleet (nombres 10x1xAxB, un tercio OFFLINE) y reparte los
+    rigs entre ALGORITHMS con hashrate y rechazo aleatorios pero reproducibles.
+
+    Args:
+        num_rigs: Cantidad de rigs (100, 1000, 10000...)
+        template: Rig de ejemplo (por defecto el primero de nicehash_stats.json)
+        seed: Semilla del generador aleatorio
+
+    Returns:
+        Lista de rigs con la forma de miningRigs
+    """
+    rng = random.Random(seed)
+    rigs = build_fleet(num_rigs, template or load_rig_template())
+    weights = [algo[4] for algo in ALGORITHMS]
+    now_ms = int(time.time() * 1000)
+    for rig in rigs:
+        algo = rng.choices(ALGORITHMS, weights)[0]
+        stat = rig['stats'][0]
+        stat['algorithm'] = {'enumName': algo[0], 'description': algo[1]}
+        stat['statsTime'] = now_ms
+        rig['statusTime'] = now_ms
+        _set_speeds(rig, algo[2], rng)
+    return rigs
+
+
+def _set_speeds(rig: dict, typical_speed: float, rng: random.Random):
+    """Ajusta hashrate, rechazo y balance de un rig según su minerStatus"""
+    stat = rig['stats'][0]
+    mining = rig['minerStatus'] == 'MINING'
+    accepted = typical_speed * rng.uniform(0.8, 1.2) if mining else 0.0
+    rejected = accepted * rng.uniform(0.0, 0.04)
+    unpaid = f"{rng.randint(0, 50_000) / SATOSHI:.8f}"
+    stat['speedAccepted'] = accepted
+    stat['speedRejectedR1Target'] = rejected
+    stat['speedRejectedTotal'] = rejected
+    stat['unpaidAmount'] = unpaid
+    rig['unpaidAmount'] = unpaid
+    profitability = accepted / typical_speed * 6e-6 if typical_speed else 0.0
+    stat['profitability'] = profitability
+    rig['profitability'] = profitability
+    rig['localProfitability'] = profitability
+
+
+class MockNiceHashServer(StubNiceHashServer):
+    """
+    Servidor HTTP/1.1 keep-alive que imita la API de NiceHash y la de Telegram
+
+    Además de los contadores de StubNiceHashServer lleva las peticiones por
+    endpoint, los 429 devueltos y los mensajes recibidos por el bot falso.
+    """
+
+    def __init__(self, num_rigs: int = 1000, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 1.0,
+                 telegram_rate_limit_every: int = 0, seed: int = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            num_rigs: Tamaño de la flota sintética
+            latency: Segundos de espera antes de cada respuesta
+            jitter: Segundos aleatorios (0..jitter) sumados a la latencia
+            rate_limit_every: Responder 429 a una de cada N peticiones a NiceHash (0 = nunca)
+            retry_after: Valor de Retry-After (segundos) de los 429
+            telegram_rate_limit_every: Igual que rate_limit_every para sendMessage
+            seed: Semilla de la flota y de los cambios de estado
+        """
+        self.seed = seed
+        self.rng = random.Random(seed)
+        super().__init__(num_rigs, host, port)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.telegram_rate_limit_every = telegram_rate_limit_every
+        self.paths = Counter()
+        self.rate_limited = 0
+        self.telegram_messages: List[str] = []
+        self._api_requests = 0
+        self._telegram_requests = 0
+        self._summary = None
+        self._rigs_by_id = None
+
+    def build_rigs(self, num_rigs: int) -> list:
+        return synthetic_fleet(num_rigs, seed=self.seed)
+
+    def reset_counters(self):
+        super().reset_counters()
+        with self._lock:
+            self.paths.clear()
+            self.rate_limited = 0
+            self.telegram_messages = []
+
+    def counters(self) -> Dict:
+        """Copia de los contadores (peticiones por endpoint, 429, mensajes de Telegram)"""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'paths': dict(self.paths),
+                'rate_limited': self.rate_limited,
+                'telegram_messages': len(self.telegram_messages),
+            }
+
+    def churn(self, fraction: float = 0.02) -> int:
+        """
+        Cambia el estado (MINING ↔ OFFLINE) de una fracción de los rigs
+
+        Simula la evolución de la flota entre verificaciones para que
+        check_rigs tenga transiciones que procesar.
+
+        Returns:
+            Cantidad de rigs modificados
+        """
+        speeds = {algo[0]: algo[2] for algo in ALGORITHMS}
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            count = min(len(self.rigs), max(1, int(len(self.rigs) * fraction))) if self.rigs else 0
+            for rig in self.rng.sample(self.rigs, count):
+                rig['minerStatus'] = 'OFFLINE' if rig['minerStatus'] == 'MINING' else 'MINING'
+                rig['statusTime'] = now_ms
+                algorithm = rig['stats'][0]['algorithm']['enumName']
+                _set_speeds(rig, speeds.get(algorithm, 0.0), self.rng)
+            self._summary = None
+        return count
+
+    # --- Respuestas de cada endpoint -------------------------------------
+
+    def _fleet_summary(self) -> Dict:
+        """Totales de la flota (se recalculan solo después de churn)"""
+        with self._lock:
+            if self._summary is None:
+                statuses = Counter(rig['minerStatus'] for rig in self.rigs)
+                unpaid = sum(round(float(rig['unpaidAmount']) * SATOSHI) for rig in self.rigs)
+                algorithms = {}
+                for rig in self.rigs:
+                    stat = rig['stats'][0]
+                    algo = algorithms.setdefault(stat['algorithm']['enumName'], [0.0, 0.0, 0, 0.0])
+                    algo[0] += stat['speedAccepted']
+                    algo[1] += stat['speedRejectedTotal']
+                    algo[2] += round(float(stat['unpaidAmount']) * SATOSHI)
+                    algo[3] += stat['profitability']
+                self._summary = {
+                    'statuses': dict(statuses),
+                    'unpaid': unpaid,
+                    'profitability': sum(rig['profitability'] for rig in self.rigs),
+                    'algorithms': algorithms,
+                }
+            return self._summary
+
+    def rigs_page(self, query: Dict) -> Dict:
+        page = int(query.get('page', ['0'])[0])
+        size = int(query.get('size', [str(DEFAULT_PAGE_SIZE)])[0])
+        summary = self._fleet_summary()
+        total_pages = max(1, -(-len(self.rigs) // size))
+        return {
+            "minerStatuses": summary['statuses'],
+            "rigTypes": {"UNMANAGED": len(self.rigs)},
+            "totalRigs": len(self.rigs),
+            "totalProfitability": summary['profitability'],
+            "totalDevices": len(self.rigs),
+            "devicesStatuses": summary['statuses'],
+            "unpaidAmount": f"{summary['unpaid'] / SATOSHI:.8f}",
+            "btcAddress": MINING_ADDRESS,
+            "nextPayoutTimestamp": (datetime.now(timezone.utc) + timedelta(hours=4)).isoformat(),
+            "miningRigs": self.rigs[page * size:(page + 1) * size],
+            "pagination": {"size": size, "page": page, "totalPageCount": total_pages}
+        }
+
+    def active_workers(self, query: Dict) -> Dict:
+        page = int(query.get('page', ['0'])[0])
+        size = int(query.get('size', ['100'])[0])
+        workers = [
+            dict(rig['stats'][0], rigName=rig['name'])
+            for rig in self.rigs if rig['minerStatus'] == 'MINING'
+        ]
+        return {
+            "pagination": {"size": size, "page": page, "totalPageCount": max(1, -(-len(workers) // size))},
+            "workers": workers[page * size:(page + 1) * size]
+        }
+
+    def rig_stats_algo(self, query: Dict) -> Dict:
+        suffixes = {algo[0]: algo[3] for algo in ALGORITHMS}
+        return {"algorithms": {
+            name: {
+                "unpaid": f"{unpaid / SATOSHI:.8f}",
+                "profitability": profitability,
+                "speedAccepted": accepted,
+                "speedRejected": rejected,
+                "displaySuffix": suffixes.get(name, 'H'),
+                "isActive": accepted > 0,
+            }
+            for name, (accepted, rejected, unpaid, profitability)
+            in self._fleet_summary()['algorithms'].items()
+        }}
+
+    def algo_stats(self, query: Dict) -> Dict:
+        return {"algos": [
+            {"a": name, "sa": accepted, "sr": rejected, "up": f"{unpaid / SATOSHI:.8f}"}
+            for name, (accepted, rejected, unpaid, _) in self._fleet_summary()['algorithms'].items()
+        ]}
+
+    def daily_earnings(self, query: Dict) -> Dict:
+        to_date = datetime.strptime(query.get('toDate', [datetime.now().strftime('%Y-%m-%d')])[0], '%Y-%m-%d')
+        from_date = datetime.strptime(
+            query.get('fromDate', [(to_date - timedelta(days=30)).strftime('%Y-%m-%d')])[0], '%Y-%m-%d')
+        rng = random.Random(self.seed)
+        per_day = self._fleet_summary()['profitability']
+        data = []
+        day = to_date
+        while day >= from_date:
+            data.append({
+                "date": day.strftime('%Y-%m-%dT00:00:00Z'),
+                "algos": [35],
+                "profitability": round(per_day * rng.uniform(0.8, 1.2), 8)
+            })
+            day -= timedelta(days=1)
+        return {"data": data}
+
+    def payouts(self, query: Dict) -> Dict:
+        now_ms = int(time.time() * 1000)
+        payouts = [
+            {
+                "id": f"payout-{i}",
+                "created": now_ms - i * 4 * 3600 * 1000,
+                "currency": {"enumName": "BTC", "description": "BTC"},
+                "amount": "0.00100000",
+                "feeAmount": "0.00002000",
+                "accountType": {"enumName": "USER", "description": "User"},
+            }
+            for i in range(20)
+        ]
+        return {"list": payouts, "pagination": {"size": len(payouts), "page": 0, "totalPageCount": 1}}
+
+    def mining_address(self, query: Dict) -> Dict:
+        return {"address": MINING_ADDRESS, "type": {"code": "NHM", "description": "NiceHash wallet"}}
+
+    def unpaid_stats(self, query: Dict) -> Dict:
+        unpaid = self._fleet_summary()['unpaid'] / SATOSHI
+        return {
+            "columns": ["time", "totalUnpaid"],
+            "data": [[int(time.time() * 1000), f"{unpaid:.8f}"]]
+        }
+
+    def rig_details(self, query: Dict) -> Optional[Dict]:
+        """Detalle de un rig (rig2): el rig de la lista, sin dispositivos (ASIC no administrado)"""
+        with self._lock:
+            if self._rigs_by_id is None:
+                self._rigs_by_id = {rig['rigId']: rig for rig in self.rigs}
+            rig = self._rigs_by_id.get(query['rigId'][0])
+        if rig is None:
+            return None
+        return dict(rig, devices=[], softwareVersions="", rigPowerMode="UNKNOWN")
+
+    def account_info(self, query: Dict) -> Dict:
+        balance = f"{self._fleet_summary()['unpaid'] / SATOSHI:.8f}"
+        return {
+            "total": {"currency": "BTC", "totalBalance": balance, "available": balance, "pending": "0"},
+            "currencies": [{"currency": "BTC", "totalBalance": balance, "available": balance,
+                            "pending": "0", "active": True, "enabled": True}]
+        }
+
+
+class _MockHandler(_RigsHandler):
+    # Endpoint de NiceHash → método de MockNiceHashServer que genera la respuesta
+    ROUTES = {
+        '/main/api/v2/mining/rigs': MockNiceHashServer.rigs_page,
+        '/main/api/v2/mining/rigs/activeWorkers': MockNiceHashServer.active_workers,
+        '/main/api/v2/mining/rigs/stats/algo': MockNiceHashServer.rig_stats_algo,
+        '/main/api/v2/mining/rigs/stats/data': MockNiceHashServer.daily_earnings,
+        '/main/api/v2/mining/algo/stats': MockNiceHashServer.algo_stats,
+        '/main/api/v2/mining/rigs/payouts': MockNiceHashServer.payouts,
+        '/main/api/v2/mining/miningAddress': MockNiceHashServer.mining_address,
+        '/main/api/v2/mining/rig/stats/unpaid': MockNiceHashServer.unpaid_stats,
+        '/main/api/v2/accounting/accounts2': MockNiceHashServer.account_info,
+    }
+
+    # Cabeceras que NiceHashClient debe enviar en cada petición firmada
+    AUTH_HEADERS = ('X-Time', 'X-Nonce', 'X-Organization-Id', 'X-Request-Id', 'X-Auth')
+
+    def _count(self, path: str, telegram: bool) -> int:
+        """Registra la petición y devuelve su número de orden dentro de su API"""
+        server = self.server
+        with server._lock:
+            server.requests += 1
+            server.paths[path] += 1
+            if telegram:
+                server._telegram_requests += 1
+                return server._telegram_requests
+            server._api_requests += 1
+            return server._api_requests
+
+    def _delay(self):
+        server = self.server
+        delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith('/bot'):
+            self._count(parsed.path, telegram=True)
+            self._send_json(200, {"ok": True, "result": {"id": 1, "is_bot": True, "username": "mock_bot"}})
+            return
+
+        is_rig_details = parsed.path.startswith(RIG_DETAILS_PATH)
+        number = self._count(RIG_DETAILS_PATH + '{rigId}' if is_rig_details else parsed.path, telegram=False)
+        self._delay()
+        server = self.server
+
+        query = parse_qs(parsed.query)
+        route = self.ROUTES.get(parsed.path)
+        if is_rig_details:
+            route = MockNiceHashServer.rig_details
+            query['rigId'] = [parsed.path[len(RIG_DETAILS_PATH):]]
+        if route is None:
+            self._send_json(404, {"error_id": "mock", "errors": [{"code": 404, "message": "Not found"}]})
+            return
+        if any(not self.headers.get(name) for name in self.AUTH_HEADERS):
+            self._send_json(403, {"error_id": "mock", "errors": [{"code": 403, "message": "Missing auth headers"}]})
+            return
+        if server.rate_limit_every and number % server.rate_limit_every == 0:
+            with server._lock:
+                server.rate_limited += 1
+            self._send_json(429, {"error_id": "mock", "errors": [{"code": 429, "message": "Too many requests"}]},
+                            {'Retry-After': f"{server.retry_after:g}"})
+            return
+
+        payload = route(server, query)
+        if payload is None:
+            self._send_json(404, {"error_id": "mock", "errors": [{"code": 404, "message": "Not found"}]})
+            return
+        self._send_json(200, payload)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if not (parsed.path.startswith('/bot') and parsed.path.endswith('/sendMessage')):
+            self._count(parsed.path, telegram=False)
+            self._send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+
+        number = self._count(parsed.path, telegram=True)
+        self._delay()
+        server = self.server
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+        text = payload.get('text') or ''
+
+        if server.telegram_rate_limit_every and number % server.telegram_rate_limit_every == 0:
+            with server._lock:
+                server.rate_limited += 1
+            retry_after = max(1, int(server.retry_after))
+            self._send_json(429, {"ok": False, "error_code": 429,
+                                  "description": f"Too Many Requests: retry after {retry_after}",
+                                  "parameters": {"retry_after": retry_after}})
+            return
+        if not text or len(text) > 4096:
+            self._send_json(400, {"ok": False, "error_code": 400,
+                                  "description": "Bad Request: message text is empty or too long"})
+            return
+
+        with server._lock:
+            server.telegram_messages.append(text)
+            message_id = len(server.telegram_messages)
+        self._send_json(200, {"ok": True, "result": {
+            "message_id": message_id,
+            "chat": {"id": payload.get('chat_id')},
+            "date": int(time.time()),
+            "text": text,
+        }})
+
+    def _send_json(self, status: int, payload: dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+MockNiceHashServer.handler_class = _MockHandler
+
+
+def main():
+    num_rigs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+
+    server = MockNiceHashServer(num_rigs=num_rigs, port=port)
+    print(f"🧪 API simulada de NiceHash con {num_rigs} rigs en {server.url}")
+    print("\nPara apuntar el bot a este servidor:")
+    print(f"   NICEHASH_API_URL={server.url}")
+    print(f"   TELEGRAM_API_URL={server.url}")
+    print("   (cualquier valor sirve para las claves, el token y el chat)\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Servidor detenido")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
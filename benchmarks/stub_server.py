@@ -0,0 +1,134 @@
+"""
+Servidor HTTP local que imita el endpoint de rigs de NiceHash
+Cuenta las conexiones TCP abiertas para medir cuántos handshakes hace el cliente
+"""
+import copy
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TEMPLATE_FILE = "nicehash_stats.json"
+DEFAULT_PAGE_SIZE = 25
+
+
+def load_rig_template(path: str = TEMPLATE_FILE) -> dict:
+    """
+    Carga un rig de ejemplo desde una exportación real para generar flotas sintéticas
+    
+    Args:
+        path: Archivo JSON exportado con export_stats.py
+        
+    Returns:
+        Diccionario con la forma de un elemento de miningRigs
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['rigs']['miningRigs'][0]
+
+
+def build_fleet(num_rigs: int, template: dict) -> list:
+    """
+    Genera una flota sintética de rigs con nombres estilo IP (10x1xAxB)
+    
+    Args:
+        num_rigs: Cantidad de rigs a generar
+        template: Rig de ejemplo a copiar
+        
+    Returns:
+        Lista de rigs
+    """
+    rigs = []
+    for i in range(num_rigs):
+        rig = copy.deepcopy(template)
+        name = f"10x1x{i // 250}x{i % 250 + 1}"
+        rig['rigId'] = name
+        rig['name'] = name
+        rig['minerStatus'] = 'MINING' if i % 3 else 'OFFLINE'
+        rigs.append(rig)
+    return rigs
+
+
+class StubNiceHashServer(ThreadingHTTPServer):
+    """Servidor HTTP/1.1 keep-alive con contadores de conexiones y peticiones"""
+    
+    daemon_threads = True
+    
+    def __init__(self, num_rigs: int = 372, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), self.handler_class)
+        self.rigs = self.build_rigs(num_rigs)
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def build_rigs(self, num_rigs: int) -> list:
+        """Flota servida por el endpoint de rigs (las subclases pueden variarla)"""
+        return build_fleet(num_rigs, load_rig_template())
+    
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+    
+    def start(self):
+        """Arranca el servidor en un hilo en segundo plano"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _RigsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    
+    def setup(self):
+        super().setup()
+        # Una llamada a setup() por conexión TCP aceptada
+        with self.server._lock:
+            self.server.connections += 1
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_GET(self):
+        with self.server._lock:
+            self.server.requests += 1
+        
+        parsed = urlparse(self.path)
+        if parsed.path != '/main/api/v2/mining/rigs':
+            self._send_json(404, {"error": "not found"})
+            return
+        
+        query = parse_qs(parsed.query)
+        page = int(query.get('page', ['0'])[0])
+        size = int(query.get('size', [str(DEFAULT_PAGE_SIZE)])[0])
+        rigs = self.server.rigs
+        total_pages = max(1, -(-len(rigs) // size))
+        
+        self._send_json(200, {
+            "totalRigs": len(rigs),
+            "miningRigs": rigs[page * size:(page + 1) * size],
+            "pagination": {"size": size, "page": page, "totalPageCount": total_pages}
+        })
+    
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# Manejador de peticiones del servidor (benchmarks/mock_server.py lo reemplaza)
+StubNiceHashServer.handler_class = _RigsHandler
@@ -0,0 +1,387 @@
+"""
+Exportación en columnas de los snapshots de rigs para análisis de la flota
+Una fila por rig × algoritmo, un archivo por columna (arrays binarios de
+ancho fijo, textos codificados con diccionario) y un índice de snapshots:
+agregar un snapshot es un append por columna y los resúmenes leen solo las
+columnas que necesitan, y de ellas solo el rango de fechas pedido
+"""
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config
+from models import Fleet, STATUS_MINING
+
+# (nombre, typecode de array). Las velocidades van en precisión simple como
+# en hashrate_history.py; unpaidAmount en satoshis (entero, sin redondeo)
+COLUMNS = (
+    ('rigId', 'I'),                      # código del diccionario rigId
+    ('rigStatus', 'B'),                  # código de minerStatus + 1 en la primera fila de cada rig, 0 en las demás
+    ('algorithm', 'H'),                  # código del diccionario algorithm
+    ('statsTime', 'q'),                  # milisegundos epoch
+    ('speedAccepted', 'f'),
+    ('speedRejectedR1Target', 'f'),
+    ('speedRejectedR2Stale', 'f'),
+    ('speedRejectedR3Duplicate', 'f'),
+    ('speedRejectedR4NTime', 'f'),
+    ('speedRejectedR5Other', 'f'),
+    ('speedRejectedTotal', 'f'),
+    ('unpaidAmount', 'q'),               # satoshis
+    ('profitability', 'd'),
+)
+TYPECODES = dict(COLUMNS)
+
+# Columnas codificadas con diccionario (código → texto en <columna>.dict)
+DICTIONARY_COLUMNS = ('rigId', 'algorithm')
+
+# Atributo de models.AlgoStat para cada columna de velocidad
+SPEED_ATTRS = (
+    ('speedAccepted', 'speed_accepted'),
+    ('speedRejectedR1Target', 'speed_rejected_r1'),
+    ('speedRejectedR2Stale', 'speed_rejected_r2'),
+    ('speedRejectedR3Duplicate', 'speed_rejected_r3'),
+    ('speedRejectedR4NTime', 'speed_rejected_r4'),
+    ('speedRejectedR5Other', 'speed_rejected_r5'),
+    ('speedRejectedTotal', 'speed_rejected_total'),
+)
+
+# Algoritmo de las filas de rigs sin estadísticas (offline sin stats[])
+NO_ALGORITHM = ''
+
+# timestamp (segundos epoch), primera fila, cantidad de filas
+ROW_GROUP = struct.Struct('<qQI')
+
+SATOSHI = Decimal(100_000_000)
+
+
+def _satoshis(amount: Decimal) -> int:
+    return int(amount * SATOSHI)
+
+
+class ColumnarDataset:
+    """
+    Dataset en <directorio>/<columna>.col + <columna>.dict + rowgroups.idx
+
+    Cada snapshot es un grupo de filas contiguo; dentro del grupo las filas
+    van ordenadas por código de algoritmo, así el total de un algoritmo en un
+    snapshot es un slice. El índice se escribe después de las columnas: si
+    una escritura se interrumpe, las filas sobrantes se descartan en el
+    siguiente append.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Inicializa el dataset (se crea la carpeta si no existe)
+
+        Args:
+            directory: Carpeta del dataset
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.dictionaries = {name: self._load_dictionary(name) for name in DICTIONARY_COLUMNS}
+        self._codes = {name: {value: code for code, value in enumerate(values)}
+                       for name, values in self.dictionaries.items()}
+        self._checked = False
+
+    def _path(self, name: str, suffix: str = '.col') -> str:
+        return os.path.join(self.directory, f"{name}{suffix}")
+
+    def _load_dictionary(self, name: str) -> List[str]:
+        try:
+            with open(self._path(name, '.dict'), 'r', encoding='utf-8') as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def row_groups(self) -> List[Tuple[int, int, int]]:
+        """Snapshots guardados: lista de (timestamp, primera fila, cantidad de filas)"""
+        try:
+            with open(self._path('rowgroups', '.idx'), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        raw = raw[:len(raw) - len(raw) % ROW_GROUP.size]
+        return list(ROW_GROUP.iter_unpack(raw))
+
+    def _code(self, name: str, value: str, new_values: Dict[str, List[str]]) -> int:
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.dictionaries[name])
+            self.dictionaries[name].append(value)
+            new_values[name].append(value)
+        return code
+
+    def _truncate_to(self, rows: int):
+        """Descarta filas escritas por un append interrumpido (sin entrada en el índice)"""
+        for name, typecode in COLUMNS:
+            path = self._path(name)
+            expected = rows * array(typecode).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > expected:
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+
+    # --- Escritura --------------------------------------------------------
+
+    def append(self, payload: Dict, timestamp: Optional[float] = None) -> int:
+        """
+        Agrega un snapshot de get_rigs como un grupo de filas
+
+        Args:
+            payload: Respuesta de get_rigs (con miningRigs)
+            timestamp: Segundos epoch del snapshot (por defecto ahora)
+
+        Returns:
+            Cantidad de filas agregadas
+        """
+        ts = int(timestamp if timestamp is not None else datetime.now().timestamp())
+        groups = self.row_groups()
+        if groups and ts < groups[-1][0]:
+            raise ValueError(f"El snapshot {ts} es anterior al último del dataset")
+        first_row = groups[-1][1] + groups[-1][2] if groups else 0
+        if not self._checked:
+            self._truncate_to(first_row)
+            self._checked = True
+
+        fleet = Fleet.from_api(payload)
+        new_values = {name: [] for name in DICTIONARY_COLUMNS}
+
+        # Filas agrupadas por algoritmo: (código de rig, estado o 0, rig, stat)
+        rows_by_algo: Dict[int, list] = {}
+        for rig in fleet:
+            rig_code = self._code('rigId', rig.rig_id, new_values)
+            status = rig.status_code + 1
+            for stat in rig.stats or (None,):
+                algo = self._code('algorithm', stat.algorithm if stat else NO_ALGORITHM, new_values)
+                rows_by_algo.setdefault(algo, []).append((rig_code, status, rig, stat))
+                status = 0
+
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        for algo in sorted(rows_by_algo):
+            rows = rows_by_algo[algo]
+            columns['rigId'].extend(row[0] for row in rows)
+            columns['rigStatus'].extend(row[1] for row in rows)
+            columns['algorithm'].extend(algo for _ in rows)
+            columns['statsTime'].extend(stat.stats_time if stat else rig.status_time for _, _, rig, stat in rows)
+            for name, attr in SPEED_ATTRS:
+                columns[name].extend(getattr(stat, attr) if stat else 0.0 for _, _, _, stat in rows)
+            columns['unpaidAmount'].extend(
+                _satoshis(stat.unpaid_amount if stat else rig.unpaid_amount) for _, _, rig, stat in rows)
+            columns['profitability'].extend(
+                stat.profitability if stat else rig.profitability for _, _, rig, stat in rows)
+
+        # Diccionarios y columnas primero, el índice al final
+        for name, values in new_values.items():
+            if values:
+                with open(self._path(name, '.dict'), 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(value, ensure_ascii=False) + "\n" for value in values)
+        for name, column in columns.items():
+            if sys.byteorder == 'big':
+                column.byteswap()
+            with open(self._path(name), 'ab') as f:
+                f.write(column.tobytes())
+        rows = len(columns['rigId'])
+        with open(self._path('rowgroups', '.idx'), 'ab') as f:
+            f.write(ROW_GROUP.pack(ts, first_row, rows))
+        return rows
+
+    # --- Lectura ----------------------------------------------------------
+
+    def select(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Tuple[int, int, int]]:
+        """Grupos de filas con timestamp entre start y end (inclusive)"""
+        groups = self.row_groups()
+        timestamps = [group[0] for group in groups]
+        lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+        hi = bisect.bisect_right(timestamps, end) if end is not None else len(groups)
+        return groups[lo:hi]
+
+    def read_column(self, name: str, first_row: int = 0, rows: Optional[int] = None) -> array:
+        """
+        Lee un rango de filas de una sola columna
+
+        Args:
+            name: Nombre de la columna (ver COLUMNS)
+            first_row: Primera fila
+            rows: Cantidad de filas (None = hasta el final del índice)
+        """
+        typecode = TYPECODES[name]
+        values = array(typecode)
+        if rows is None:
+            groups = self.row_groups()
+            rows = (groups[-1][1] + groups[-1][2] - first_row) if groups else 0
+        if rows <= 0:
+            return values
+        with open(self._path(name), 'rb') as f:
+            f.seek(first_row * values.itemsize)
+            values.frombytes(f.read(rows * values.itemsize))
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return values
+
+    def scan(self, columns: Sequence[str], start: Optional[float] = None,
+             end: Optional[float] = None) -> Tuple[List[Tuple[int, int, int]], Dict[str, array]]:
+        """
+        Lee solo las columnas pedidas de los snapshots entre start y end
+
+        Returns:
+            Tupla (grupos con la primera fila relativa al resultado, {columna: array})
+        """
+        groups = self.select(start, end)
+        if not groups:
+            return [], {name: array(TYPECODES[name]) for name in columns}
+        first_row = groups[0][1]
+        rows = groups[-1][1] + groups[-1][2] - first_row
+        data = {name: self.read_column(name, first_row, rows) for name in columns}
+        return [(ts, row - first_row, count) for ts, row, count in groups], data
+
+    def summary(self, start: Optional[float] = None, end: Optional[float] = None) -> Optional[Dict]:
+        """
+        Resumen de la flota entre dos instantes leyendo tres columnas
+
+        Returns:
+            Diccionario con snapshots, from/to, series de rigs y activos por
+            snapshot y hashrate aceptado promedio por algoritmo; None si no hay datos
+        """
+        groups, data = self.scan(('rigStatus', 'algorithm', 'speedAccepted'), start, end)
+        if not groups:
+            return None
+        status = data['rigStatus']
+        algorithm = data['algorithm']
+        speed = data['speedAccepted']
+        mining = STATUS_MINING + 1
+
+        series = []
+        speed_totals: Dict[int, float] = {}
+        for ts, row, count in groups:
+            end_row = row + count
+            group_status = status[row:end_row]
+            rigs = count - group_status.count(0)
+            series.append((ts, rigs, group_status.count(mining)))
+            # Las filas del grupo están ordenadas por algoritmo: un slice por algoritmo
+            codes = algorithm[row:end_row]
+            lo = 0
+            while lo < count:
+                code = codes[lo]
+                hi = bisect.bisect_right(codes, code, lo)
+                speed_totals[code] = speed_totals.get(code, 0.0) + sum(speed[row + lo:row + hi])
+                lo = hi
+
+        names = self.dictionaries['algorithm']
+        return {
+            'snapshots': len(groups),
+            'from': groups[0][0],
+            'to': groups[-1][0],
+            'series': series,
+            'algorithms': {
+                names[code]: total / len(groups)
+                for code, total in sorted(speed_totals.items()) if names[code] != NO_ALGORITHM
+            },
+        }
+
+    def info(self) -> Dict:
+        """Snapshots, filas y bytes ocupados del dataset"""
+        groups = self.row_groups()
+        size = sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory)
+        )
+        return {
+            'snapshots': len(groups),
+            'rows': groups[-1][1] + groups[-1][2] if groups else 0,
+            'rigs': len(self.dictionaries['rigId']),
+            'bytes': size,
+            'first': groups[0][0] if groups else None,
+            'last': groups[-1][0] if groups else None,
+        }
+
+
+def import_snapshots(dataset: ColumnarDataset, snapshots: Iterable[Tuple[int, Dict]]) -> int:
+    """
+    Agrega snapshots (timestamp, payload) posteriores al último del dataset
+
+    Returns:
+        Cantidad de snapshots agregados
+    """
+    groups = dataset.row_groups()
+    last = groups[-1][0] if groups else None
+    imported = 0
+    for ts, payload in snapshots:
+        if last is not None and ts <= last:
+            continue
+        dataset.append(payload, ts)
+        last = ts
+        imported += 1
+    return imported
+
+
+def print_summary(dataset: ColumnarDataset, start: Optional[float] = None, end: Optional[float] = None):
+    """Imprime el resumen del dataset entre dos instantes"""
+    summary = dataset.summary(start, end)
+    print("\n" + "="*60)
+    print("REPORTE RESUMIDO (COLUMNAR)")
+    print("="*60)
+    if summary is None:
+        print("\n⚠️  No hay snapshots en el rango pedido")
+        print("\n" + "="*60)
+        return
+
+    rigs = [total for _, total, _ in summary['series']]
+    active = [count for _, _, count in summary['series']]
+    print(f"\n📅 Desde {datetime.fromtimestamp(summary['from']):%Y-%m-%d %H:%M} "
+          f"hasta {datetime.fromtimestamp(summary['to']):%Y-%m-%d %H:%M} ({summary['snapshots']} snapshots)")
+    print(f"\n🖥️  Rigs: {rigs[-1]} total, {active[-1]} activos (último snapshot)")
+    print(f"   Activos promedio: {sum(active) / len(active):.0f}  mín/máx: {min(active)} / {max(active)}")
+    if summary['algorithms']:
+        print("\n⚡ Hashrate aceptado promedio por algoritmo:")
+        for name, speed in summary['algorithms'].items():
+            print(f"   • {name}: {speed:,.0f} H/s")
+    print("\n" + "="*60)
+
+
+def main():
+    from snapshot_archive import SnapshotArchive, parse_timestamp
+
+    args = sys.argv[1:]
+    directory = config.COLUMNAR_DATASET_DIR
+    if '--dataset' in args:
+        index = args.index('--dataset')
+        directory = args[index + 1] if index + 1 < len(args) else directory
+        del args[index:index + 2]
+
+    command = args[0] if args else 'info'
+    dataset = ColumnarDataset(directory)
+
+    if command == 'import':
+        # Desde el archivo histórico comprimido o desde exportaciones JSON
+        imported = 0
+        for path in args[1:] or [config.SNAPSHOT_ARCHIVE_DIR]:
+            if os.path.isdir(path):
+                archive = SnapshotArchive(path)
+                for date in archive.days():
+                    imported += import_snapshots(dataset, archive.iter_day(date))
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if 'miningRigs' in (data.get('rigs') or {}):
+                    imported += import_snapshots(
+                        dataset, [(parse_timestamp(data['timestamp']), data['rigs'])])
+        print(f"✅ Snapshots importados: {imported}")
+    elif command == 'summary':
+        start = parse_timestamp(args[1]) if len(args) > 1 else None
+        end = parse_timestamp(args[2]) if len(args) > 2 else None
+        print_summary(dataset, start, end)
+    else:
+        info = dataset.info()
+        print(f"\n📊 Dataset {directory}/")
+        print(f"   Snapshots: {info['snapshots']}  Filas: {info['rows']}  Rigs: {info['rigs']}")
+        print(f"   Espacio utilizado: {info['bytes'] / 1_000_000:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
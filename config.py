@@ -13,12 +13,122 @@ API_SECRET = os.getenv('NICEHASH_API_SECRET')
 ORG_ID = os.getenv('NICEHASH_ORG_ID')
 API_URL = os.getenv('NICEHASH_API_URL', 'https://api2.nicehash.com')
 
+# Configuración de conexiones HTTP (pool keep-alive y timeouts en segundos)
+HTTP_POOL_SIZE = int(os.getenv('NICEHASH_POOL_SIZE', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('NICEHASH_CONNECT_TIMEOUT', '5'))
+HTTP_READ_TIMEOUT = float(os.getenv('NICEHASH_READ_TIMEOUT', '30'))
+
+# Paginación de rigs: tamaño de página y páginas descargadas en paralelo
+RIGS_PAGE_SIZE = int(os.getenv('NICEHASH_PAGE_SIZE', '100'))
+RIGS_PAGE_WORKERS = int(os.getenv('NICEHASH_PAGE_WORKERS', '4'))
+
+# Limitador de peticiones (token bucket) y reintentos con backoff exponencial
+API_RATE_LIMIT = float(os.getenv('NICEHASH_RATE_LIMIT', '10'))
+API_RATE_BURST = int(os.getenv('NICEHASH_RATE_BURST', '10'))
+API_MAX_RETRIES = int(os.getenv('NICEHASH_MAX_RETRIES', '3'))
+API_BACKOFF_BASE = float(os.getenv('NICEHASH_BACKOFF_BASE', '0.5'))
+API_BACKOFF_MAX = float(os.getenv('NICEHASH_BACKOFF_MAX', '30'))
+API_RETRY_BUDGET_RATIO = float(os.getenv('NICEHASH_RETRY_BUDGET_RATIO', '0.2'))
+
+# Caché de respuestas para endpoints que cambian poco (TTL en segundos, 0 = sin caché)
+CACHE_ENABLED = os.getenv('NICEHASH_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CACHE_FILE = os.getenv('NICEHASH_CACHE_FILE', 'api_cache.json')
+CACHE_MAX_ENTRIES = int(os.getenv('NICEHASH_CACHE_MAX_ENTRIES', '256'))
+CACHE_TTLS = {
+    '/main/api/v2/mining/miningAddress': float(os.getenv('NICEHASH_CACHE_TTL_ADDRESS', '86400')),
+    '/main/api/v2/accounting/accounts2': float(os.getenv('NICEHASH_CACHE_TTL_ACCOUNT', '900')),
+    '/main/api/v2/mining/algo/stats': float(os.getenv('NICEHASH_CACHE_TTL_ALGO_STATS', '300')),
+    '/main/api/v2/mining/rigs/stats/data': float(os.getenv('NICEHASH_CACHE_TTL_EARNINGS', '3600')),
+}
+
+# Detalle por rig (/mining/rig2/{rigId}) para los rigs que cambian de estado o
+# cuyo hashrate se desvía (%) de su promedio reciente: descargas en paralelo,
+# segundos de validez en caché, máximo por check y espera máxima (segundos)
+RIG_DETAILS_ENABLED = os.getenv('NICEHASH_RIG_DETAILS', 'true').lower() in ('1', 'true', 'yes')
+RIG_DETAILS_WORKERS = int(os.getenv('NICEHASH_RIG_DETAILS_WORKERS', '4'))
+RIG_DETAILS_TTL = float(os.getenv('NICEHASH_RIG_DETAILS_TTL', '900'))
+RIG_DETAILS_MAX_PER_CHECK = int(os.getenv('NICEHASH_RIG_DETAILS_MAX', '25'))
+RIG_DETAILS_DEVIATION = float(os.getenv('NICEHASH_RIG_DETAILS_DEVIATION', '30'))
+RIG_DETAILS_TIMEOUT = float(os.getenv('NICEHASH_RIG_DETAILS_TIMEOUT', '15'))
+
+# Histórico local de ganancias diarias (días a descargar la primera vez)
+EARNINGS_STORE_FILE = os.getenv('NICEHASH_EARNINGS_FILE', 'earnings_history.jsonl')
+EARNINGS_BACKFILL_DAYS = int(os.getenv('NICEHASH_EARNINGS_BACKFILL_DAYS', '30'))
+
+# Archivo histórico comprimido de snapshots de rigs (export_stats.py --archive):
+# carpeta y snapshots como máximo entre dos snapshots completos (keyframes)
+SNAPSHOT_ARCHIVE_DIR = os.getenv('NICEHASH_ARCHIVE_DIR', os.path.join('reportes', 'archivo'))
+SNAPSHOT_KEYFRAME_INTERVAL = int(os.getenv('NICEHASH_ARCHIVE_KEYFRAME_INTERVAL', '24'))
+
+# Dataset en columnas (una fila por rig × algoritmo) para análisis de la flota
+COLUMNAR_DATASET_DIR = os.getenv('NICEHASH_COLUMNAR_DIR', os.path.join('reportes', 'columnar'))
+
+# Instrumentación (desactivada por defecto): archivo JSONL donde agregar una
+# línea de métricas por ejecución, y puerto e interfaz del endpoint Prometheus
+# /metrics (por defecto solo local: expone datos de la flota y la cuenta)
+METRICS_ENABLED = os.getenv('NICEHASH_METRICS', 'false').lower() in ('1', 'true', 'yes')
+METRICS_FILE = os.getenv('NICEHASH_METRICS_FILE', '')
+METRICS_PORT = int(os.getenv('NICEHASH_METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('NICEHASH_METRICS_HOST', '127.0.0.1')
+
 # Nombre de la cuenta (para identificar en notificaciones)
 ACCOUNT_NAME = os.getenv('ACCOUNT_NAME', 'NICEHASH')
 
+# Modo multi-cuenta: archivo JSON con varias cuentas (vacío = una sola cuenta
+# con las credenciales de arriba) y carpeta base de los datos de cada cuenta
+ACCOUNTS_FILE = os.getenv('NICEHASH_ACCOUNTS_FILE', '')
+ACCOUNTS_DATA_DIR = os.getenv('NICEHASH_ACCOUNTS_DATA_DIR', 'accounts')
+
 # Configuración de Telegram
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+# Cola de salida de Telegram: separación mínima entre mensajes al chat,
+# timeout de lectura, fichero de pendientes y espera máxima al terminar (segundos)
+TELEGRAM_MIN_INTERVAL = float(os.getenv('TELEGRAM_MIN_INTERVAL', '1'))
+TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', '15'))
+TELEGRAM_OUTBOX_FILE = os.getenv('TELEGRAM_OUTBOX_FILE', 'telegram_outbox.jsonl')
+TELEGRAM_OUTBOX_MAX_AGE = float(os.getenv('TELEGRAM_OUTBOX_MAX_AGE', '86400'))
+TELEGRAM_FLUSH_TIMEOUT = float(os.getenv('TELEGRAM_FLUSH_TIMEOUT', '30'))
+
+# Reglas de alerta: checks seguidos sin minar, tasa de rechazo (%) por
+# algoritmo, caída del % de rigs activos (puntos) y segundos antes de repetir
+# una alerta activa. ALERT_RULES_FILE (JSON) reemplaza las reglas por defecto
+ALERT_RULES_FILE = os.getenv('ALERT_RULES_FILE', 'alert_rules.json')
+ALERT_OFFLINE_CHECKS = int(os.getenv('ALERT_OFFLINE_CHECKS', '3'))
+ALERT_REJECTION_RATE = float(os.getenv('ALERT_REJECTION_RATE', '5'))
+ALERT_REJECTION_WARNING = float(os.getenv('ALERT_REJECTION_WARNING', '2'))
+ALERT_FLEET_DROP = float(os.getenv('ALERT_FLEET_DROP', '10'))
+# Segundos de lecturas sanas cuyo máximo es la línea base de la caída de la flota
+ALERT_FLEET_DROP_WINDOW = float(os.getenv('ALERT_FLEET_DROP_WINDOW', '3600'))
+# Rigs sin minar en una misma subred (10x1x0x*) para alertar por la subred (0 = desactivado)
+ALERT_SUBNET_OFFLINE = int(os.getenv('ALERT_SUBNET_OFFLINE', '10'))
+ALERT_COOLDOWN = float(os.getenv('ALERT_COOLDOWN', '21600'))
+ALERT_SUPPRESS_FLAPPING = os.getenv('ALERT_SUPPRESS_FLAPPING', 'true').lower() in ('1', 'true', 'yes')
+
+# Cortes: caídas simultáneas (dentro de ALERT_OUTAGE_WINDOW segundos) de al menos
+# ALERT_OUTAGE_MIN_RIGS rigs y ALERT_OUTAGE_PERCENT % de una subred, un grupo o
+# la flota se informan como un solo corte. Hashrate: caída del aceptado por
+# algoritmo de al menos ALERT_HASHRATE_MIN_DROP % y ALERT_HASHRATE_Z desvíos
+# respecto de su media exponencial (peso ALERT_HASHRATE_ALPHA por lectura)
+ALERT_OUTAGES = os.getenv('ALERT_OUTAGES', 'true').lower() in ('1', 'true', 'yes')
+ALERT_OUTAGE_WINDOW = float(os.getenv('ALERT_OUTAGE_WINDOW', '300'))
+ALERT_OUTAGE_MIN_RIGS = int(os.getenv('ALERT_OUTAGE_MIN_RIGS', '5'))
+ALERT_OUTAGE_PERCENT = float(os.getenv('ALERT_OUTAGE_PERCENT', '30'))
+ALERT_HASHRATE_ALPHA = float(os.getenv('ALERT_HASHRATE_ALPHA', '0.1'))
+ALERT_HASHRATE_Z = float(os.getenv('ALERT_HASHRATE_Z', '3'))
+ALERT_HASHRATE_MIN_DROP = float(os.getenv('ALERT_HASHRATE_MIN_DROP', '10'))
+ALERT_HASHRATE_WARMUP = int(os.getenv('ALERT_HASHRATE_WARMUP', '10'))
+
+# Días de intervalos de estado por rig que conserva el registro de uptime
+UPTIME_LEDGER_DAYS = float(os.getenv('NICEHASH_UPTIME_DAYS', '180'))
+
+# Modo continuo (telegram_bot.py sin argumentos): intervalos en segundos y
+# hora local (Paraguay) del resumen diario; vacío para no enviarlo
+MONITOR_CHECK_INTERVAL = float(os.getenv('MONITOR_CHECK_INTERVAL', '60'))
+MONITOR_REPORT_INTERVAL = float(os.getenv('MONITOR_REPORT_INTERVAL', '3600'))
+MONITOR_DAILY_REPORT_TIME = os.getenv('MONITOR_DAILY_REPORT_TIME', '00:00')
 
 def validate_config():
     """Valida que todas las configuraciones necesarias estén presentes"""
@@ -0,0 +1,140 @@
+"""
+Histórico local de ganancias diarias (append-only, una línea JSON por día)
+Solo se piden a la API los días posteriores al último guardado; cualquier
+ventana (7, 30 días...) se responde localmente
+"""
+import bisect
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import config
+
+
+def _record_date(record: Dict) -> Optional[str]:
+    """
+    Obtiene la fecha (YYYY-MM-DD) de un registro de /mining/rigs/stats/data
+    
+    Acepta 'date' como texto o como timestamp en milisegundos.
+    """
+    value = record.get('date')
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+class EarningsStore:
+    """Almacén de ganancias por fecha con consultas por rango en memoria"""
+    
+    def __init__(self, path: Optional[str] = None):
+        """
+        Inicializa el almacén y carga el archivo si existe
+        
+        Args:
+            path: Archivo JSON Lines (por defecto config.EARNINGS_STORE_FILE)
+        """
+        self.path = path or config.EARNINGS_STORE_FILE
+        self._records = {}
+        self._dates = []
+        self._load()
+    
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self._records[record['date']] = record
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️  Error al cargar histórico de ganancias: {e}")
+        self._dates = sorted(self._records)
+    
+    @property
+    def last_date(self) -> Optional[str]:
+        return self._dates[-1] if self._dates else None
+    
+    def __len__(self) -> int:
+        return len(self._dates)
+    
+    def append(self, records: List[Dict]) -> int:
+        """
+        Agrega días nuevos al final del archivo
+        
+        Args:
+            records: Registros con campo 'date'; se ignoran los ya guardados
+            
+        Returns:
+            Cantidad de días agregados
+        """
+        new_records = []
+        for record in records:
+            date = _record_date(record)
+            if date and date not in self._records:
+                new_records.append(dict(record, date=date))
+        
+        if not new_records:
+            return 0
+        
+        new_records.sort(key=lambda r: r['date'])
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in new_records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._records[record['date']] = record
+        
+        self._dates = sorted(self._records)
+        return len(new_records)
+    
+    def sync(self, client, until: Optional[str] = None) -> int:
+        """
+        Descarga solo los días posteriores al último guardado
+        
+        Solo se guardan días completos (hasta ayer), así un día no queda
+        guardado a medias.
+        
+        Args:
+            client: NiceHashClient
+            until: Último día a sincronizar (por defecto ayer)
+            
+        Returns:
+            Cantidad de días agregados
+        """
+        until = until or (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        if self.last_date:
+            from_date = (datetime.strptime(self.last_date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        else:
+            from_date = (datetime.strptime(until, '%Y-%m-%d')
+                         - timedelta(days=config.EARNINGS_BACKFILL_DAYS - 1)).strftime('%Y-%m-%d')
+        
+        if from_date > until:
+            return 0
+        
+        earnings_data = client.get_daily_earnings(from_date, until)
+        records = [
+            record for record in earnings_data.get('data', [])
+            if from_date <= (_record_date(record) or '') <= until
+        ]
+        return self.append(records)
+    
+    def range(self, from_date: str, to_date: str) -> List[Dict]:
+        """
+        Devuelve los días guardados entre dos fechas (inclusive), en orden
+        
+        Args:
+            from_date: Fecha inicial (YYYY-MM-DD)
+            to_date: Fecha final (YYYY-MM-DD)
+        """
+        start = bisect.bisect_left(self._dates, from_date)
+        end = bisect.bisect_right(self._dates, to_date)
+        return [self._records[date] for date in self._dates[start:end]]
+    
+    def last_days(self, days: int) -> List[Dict]:
+        """Devuelve los últimos N días guardados hasta ayer"""
+        to_date = datetime.now() - timedelta(days=1)
+        from_date = to_date - timedelta(days=days - 1)
+        return self.range(from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d'))
@@ -4,23 +4,34 @@ Script para exportar estadísticas de NiceHash a formato JSON
 """
 import json
 from datetime import datetime, timedelta
+from typing import List, Optional
+import config
+from columnar_export import ColumnarDataset, print_summary
 from nicehash_client import NiceHashClient
+from rig_stream import iter_file_rigs
+from snapshot_archive import SnapshotArchive
 
 
-def export_statistics(output_file: str = "nicehash_stats.json"):
+def export_statistics(output_file: Optional[str] = "nicehash_stats.json", archive_dir: Optional[str] = None,
+                      columnar_dir: Optional[str] = None):
     """
     Exporta todas las estadísticas a un archivo JSON
     
     Args:
-        output_file: Nombre del archivo de salida
+        output_file: Nombre del archivo de salida (None = no escribir JSON)
+        archive_dir: Carpeta del archivo histórico comprimido donde agregar
+            el snapshot (None = no archivar)
+        columnar_dir: Carpeta del dataset en columnas donde agregar el
+            snapshot (None = no agregar)
     """
     try:
         print(f"🔄 Obteniendo datos de NiceHash...")
         client = NiceHashClient()
         
         # Obtener todas las estadísticas
+        now = datetime.now()
         data = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "rigs": {}
         }
         
@@ -33,11 +44,23 @@ def export_statistics(output_file: str = "nicehash_stats.json"):
             data["rigs"] = {"error": str(e)}
         
         # Guardar a archivo
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            
+            print(f"\n✅ Datos exportados exitosamente a: {output_file}")
+            print(f"📊 Tamaño del archivo: {len(json.dumps(data))} bytes")
         
-        print(f"\n✅ Datos exportados exitosamente a: {output_file}")
-        print(f"📊 Tamaño del archivo: {len(json.dumps(data))} bytes")
+        # Agregar al archivo histórico (solo lo que cambió desde el snapshot anterior)
+        if archive_dir and 'miningRigs' in data['rigs']:
+            archived = SnapshotArchive(archive_dir).append(data['rigs'], now.timestamp())
+            kind = "completo" if archived['keyframe'] else f"{archived['changed']} rigs con cambios"
+            print(f"\n🗜️  Snapshot archivado en {archive_dir}/ ({kind}): {archived['bytes']} bytes comprimidos")
+        
+        # Agregar al dataset en columnas (una fila por rig × algoritmo)
+        if columnar_dir and 'miningRigs' in data['rigs']:
+            rows = ColumnarDataset(columnar_dir).append(data['rigs'], now.timestamp())
+            print(f"\n📊 Dataset en columnas {columnar_dir}/: {rows} filas agregadas")
         
         # Mostrar resumen
         print("\n" + "="*60)
@@ -70,21 +93,25 @@ def generate_summary_report(json_file: str = "nicehash_stats.json"):
         json_file: Archivo JSON con las estadísticas
     """
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Leer en streaming: solo se necesita minerStatus de cada rig
+        rigs = iter_file_rigs(json_file, fields=('minerStatus',))
+        total = 0
+        active = 0
+        for rig in rigs:
+            total += 1
+            if rig['minerStatus'] == 'MINING':
+                active += 1
         
         print("\n" + "="*60)
         print("REPORTE RESUMIDO")
         print("="*60)
         
-        timestamp = data.get('timestamp', 'N/A')
+        timestamp = rigs.meta.get('timestamp', 'N/A')
         print(f"\n📅 Fecha del reporte: {timestamp}")
         
         # Resumen de rigs
-        if 'miningRigs' in data.get('rigs', {}):
-            rigs = data['rigs']['miningRigs']
-            active = sum(1 for r in rigs if r.get('minerStatus') == 'MINING')
-            print(f"\n🖥️  Rigs: {len(rigs)} total, {active} activos")
+        if rigs.found:
+            print(f"\n🖥️  Rigs: {total} total, {active} activos")
         
         print("\n" + "="*60)
         
@@ -95,6 +122,26 @@ def generate_summary_report(json_file: str = "nicehash_stats.json"):
         print(f"❌ Error al leer el reporte: {e}")
 
 
+def _pop_dir_option(args: List[str], flag: str, default: str) -> Optional[str]:
+    """
+    Quita `--opción` y `--opción-dir carpeta` de los argumentos
+    
+    Returns:
+        La carpeta de `--opción-dir` (o `default` si solo está `--opción`), o
+        None si no está ninguna de las dos
+    """
+    directory = None
+    if flag in args:
+        args.remove(flag)
+        directory = default
+    option = f"{flag}-dir"
+    if option in args:
+        index = args.index(option)
+        directory = args[index + 1] if index + 1 < len(args) else default
+        del args[index:index + 2]
+    return directory
+
+
 if __name__ == "__main__":
     import sys
     
@@ -102,14 +149,24 @@ if __name__ == "__main__":
     print("║" + " " * 8 + "NICEHASH STATS EXPORT TOOL" + " " * 24 + "║")
     print("╚" + "═" * 58 + "╝\n")
     
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "summary":
+    args = sys.argv[1:]
+    # Archivo histórico comprimido y dataset en columnas (sin JSON salvo que se indique un nombre)
+    archive_dir = _pop_dir_option(args, '--archive', config.SNAPSHOT_ARCHIVE_DIR)
+    columnar_dir = _pop_dir_option(args, '--columnar', config.COLUMNAR_DATASET_DIR)
+    
+    if args and args[0] == "summary":
+        if columnar_dir:
+            # Resumen desde el dataset en columnas (lee solo las columnas necesarias)
+            print_summary(ColumnarDataset(columnar_dir))
+        else:
             # Generar resumen desde archivo existente
-            json_file = sys.argv[2] if len(sys.argv) > 2 else "nicehash_stats.json"
+            json_file = args[1] if len(args) > 1 else "nicehash_stats.json"
             generate_summary_report(json_file)
-        else:
-            # Exportar con nombre personalizado
-            export_statistics(sys.argv[1])
+    elif archive_dir or columnar_dir:
+        export_statistics(args[0] if args else None, archive_dir, columnar_dir)
+    elif args:
+        # Exportar con nombre personalizado
+        export_statistics(args[0])
     else:
         # Exportar con nombre por defecto
         data = export_statistics()
@@ -1,5 +1,6 @@
 # Script para automatizar la exportación diaria de estadísticas
-# Guarda los reportes en una carpeta "reportes" con la fecha
+# Agrega cada snapshot al archivo histórico comprimido "reportes\archivo"
+# (un archivo por día, solo se guardan los rigs que cambiaron)
 #
 # Para programar con el Programador de Tareas de Windows:
 # 1. Abre el Programador de tareas (taskschd.msc)
@@ -22,8 +23,16 @@ if (-not (Test-Path $carpetaReportes)) {
     Write-Host "✓ Carpeta 'reportes' creada" -ForegroundColor Green
 }
 
-# Nombre del archivo
-$nombreArchivo = "$carpetaReportes\nicehash_stats_$fecha`_$hora.json"
+# Archivo histórico comprimido y dataset en columnas para análisis
+$carpetaArchivo = "$carpetaReportes\archivo"
+$carpetaColumnas = "$carpetaReportes\columnar"
+
+# Convertir una sola vez los reportes JSON de versiones anteriores
+$reportesJson = Get-ChildItem $carpetaReportes -Filter "nicehash_stats_*.json"
+if (($reportesJson.Count -gt 0) -and -not (Test-Path $carpetaArchivo)) {
+    Write-Host "🗜️  Importando $($reportesJson.Count) reporte(s) JSON al archivo..." -ForegroundColor Yellow
+    python snapshot_archive.py import $carpetaReportes --archive $carpetaArchivo
+}
 
 # Ejecutar exportación
 Write-Host ""
@@ -32,12 +41,12 @@ Write-Host "  EXPORTACION AUTOMATICA - NICEHASH STATS" -ForegroundColor Cyan
 Write-Host "═══════════════════════════════════════════════" -ForegroundColor Cyan
 Write-Host ""
 Write-Host "📅 Fecha: $fecha $hora" -ForegroundColor Yellow
-Write-Host "📁 Archivo: $nombreArchivo" -ForegroundColor Yellow
+Write-Host "📁 Archivo: $carpetaArchivo" -ForegroundColor Yellow
 Write-Host ""
 
 try {
     # Ejecutar script de exportación
-    python export_stats.py $nombreArchivo
+    python export_stats.py --archive-dir $carpetaArchivo --columnar-dir $carpetaColumnas
     
     if ($LASTEXITCODE -eq 0) {
         Write-Host ""
@@ -50,6 +59,8 @@ try {
         Write-Host ""
         Write-Host "🧹 Limpiando reportes antiguos (>$diasAMantener días)..." -ForegroundColor Yellow
         
+        python snapshot_archive.py prune $diasAMantener --archive $carpetaArchivo
+        
         $archivosAntiguos = Get-ChildItem $carpetaReportes -Filter "nicehash_stats_*.json" | 
             Where-Object { $_.LastWriteTime -lt $fechaLimite }
         
@@ -64,14 +75,9 @@ try {
         }
         
         # Mostrar estadísticas de almacenamiento
-        $totalArchivos = (Get-ChildItem $carpetaReportes -Filter "nicehash_stats_*.json").Count
-        $tamañoTotal = (Get-ChildItem $carpetaReportes -Filter "nicehash_stats_*.json" | 
-            Measure-Object -Property Length -Sum).Sum / 1MB
-        
         Write-Host ""
         Write-Host "📊 Estadísticas de reportes:" -ForegroundColor Cyan
-        Write-Host "   Total de reportes: $totalArchivos" -ForegroundColor White
-        Write-Host "   Espacio utilizado: $([math]::Round($tamañoTotal, 2)) MB" -ForegroundColor White
+        python snapshot_archive.py info --archive $carpetaArchivo
         
     } else {
         Write-Host ""
@@ -91,7 +97,7 @@ Write-Host ""
 
 # Log de ejecución (opcional)
 $logFile = "reportes\exportacion.log"
-$logEntry = "$(Get-Date -Format 'yyyy-MM-dd HH:mm:ss') - Exportación completada: $nombreArchivo"
+$logEntry = "$(Get-Date -Format 'yyyy-MM-dd HH:mm:ss') - Exportación completada: $carpetaArchivo"
 Add-Content -Path $logFile -Value $logEntry
 
 exit 0
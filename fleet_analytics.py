@@ -0,0 +1,275 @@
+"""
+Análisis de la flota a partir de un snapshot decodificado y del histórico
+Todos los reportes salen de una sola descarga y una sola pasada: ganancias
+diarias en columnas (ventanas móviles con sumas acumuladas), totales y
+rechazo por algoritmo sobre los slices de FleetColumns, y uptime por rig
+desde el histórico de hashrate
+"""
+from array import array
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from hashrate_history import HashrateHistory
+from models import Fleet, STATUS_MINING, STATUSES, to_float
+
+# Ventanas de rentabilidad por defecto (días)
+DEFAULT_WINDOWS = (7, 30)
+
+# Unidades de hashrate de mayor a menor
+HASHRATE_UNITS = (
+    ('EH/s', 1e18),
+    ('PH/s', 1e15),
+    ('TH/s', 1e12),
+    ('GH/s', 1e9),
+    ('MH/s', 1e6),
+    ('KH/s', 1e3),
+)
+
+
+def format_hashrate(hashrate: float, unit: str = 'H/s') -> str:
+    """
+    Formatea el hashrate a una unidad legible
+
+    Args:
+        hashrate: Valor del hashrate
+        unit: Unidad del hashrate
+
+    Returns:
+        String formateado
+    """
+    for suffix, scale in HASHRATE_UNITS:
+        if hashrate >= scale:
+            return f"{hashrate / scale:.2f} {suffix}"
+    return f"{hashrate:.2f} {unit}"
+
+
+def earning_value(record: Dict) -> float:
+    """Ganancia en BTC de un registro de /mining/rigs/stats/data (campo profitability)"""
+    return to_float(record.get('profitability'))
+
+
+class EarningsColumns:
+    """
+    Ganancias diarias como columnas (fechas + array de BTC) con sumas acumuladas
+
+    Con el prefijo de sumas, el total de cualquier ventana es una resta y la
+    serie móvil completa se calcula en una sola pasada.
+    """
+
+    def __init__(self, records: Sequence[Dict]):
+        """
+        Args:
+            records: Días en orden cronológico (p. ej. EarningsStore.last_days(30))
+        """
+        self.dates = [str(record.get('date', ''))[:10] for record in records]
+        self.values = array('d', (earning_value(record) for record in records))
+        self.prefix = array('d', accumulate(self.values, initial=0.0))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def window_total(self, days: int, end: Optional[int] = None) -> float:
+        """Suma de los `days` días que terminan en la posición `end` (por defecto el último)"""
+        end = len(self.values) if end is None else end
+        start = max(0, end - days)
+        return self.prefix[end] - self.prefix[start]
+
+    def rolling_average(self, days: int) -> array:
+        """Promedio móvil de `days` días (un valor por cada día con ventana completa)"""
+        prefix = self.prefix
+        return array('d', (
+            (prefix[end] - prefix[end - days]) / days
+            for end in range(days, len(prefix))
+        ))
+
+    def extremes(self) -> Optional[Tuple[int, int]]:
+        """Posiciones del mejor y del peor día, o None si no hay datos"""
+        if not self.values:
+            return None
+        values = self.values
+        best = max(range(len(values)), key=values.__getitem__)
+        worst = min(range(len(values)), key=values.__getitem__)
+        return best, worst
+
+
+@dataclass
+class AlgoSummary:
+    """Totales de un algoritmo en la flota"""
+
+    __slots__ = ('algorithm', 'rigs', 'active', 'speed_accepted', 'speed_rejected', 'unpaid_amount')
+
+    algorithm: str
+    rigs: int
+    active: int
+    speed_accepted: float
+    speed_rejected: float
+    unpaid_amount: Decimal
+
+    @property
+    def rejection_rate(self) -> float:
+        """Porcentaje de rechazo sobre el total enviado"""
+        total = self.speed_accepted + self.speed_rejected
+        return self.speed_rejected / total * 100 if total > 0 else 0.0
+
+
+@dataclass
+class FleetAnalysis:
+    """Resultado de analyze(): todo lo que muestran los reportes avanzados"""
+
+    total_rigs: int
+    active_rigs: int
+    inactive: List[Tuple[str, str]]
+    algorithms: List[AlgoSummary]
+    windows: Dict[int, Dict] = field(default_factory=dict)
+    best_day: Optional[Tuple[str, float]] = None
+    worst_day: Optional[Tuple[str, float]] = None
+    uptime: Dict[str, float] = field(default_factory=dict)
+    rig_names: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def average_uptime(self) -> Optional[float]:
+        """Uptime promedio de los rigs con histórico"""
+        return sum(self.uptime.values()) / len(self.uptime) if self.uptime else None
+
+    def lowest_uptime(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """Rigs con menor uptime como (nombre, uptime)"""
+        ranked = sorted(self.uptime.items(), key=lambda item: item[1])[:limit]
+        return [(self.rig_names.get(rig_id, rig_id), uptime) for rig_id, uptime in ranked]
+
+
+def algorithm_totals(fleet: Fleet) -> List[AlgoSummary]:
+    """
+    Totales por algoritmo de un snapshot
+
+    Las velocidades se suman sobre los slices de FleetColumns; rigs
+    activos y balance no pagado se acumulan en la misma pasada por algoritmo.
+
+    Returns:
+        Lista ordenada por hashrate aceptado (mayor primero)
+    """
+    columns = fleet.columns
+    status = columns.status
+    stat_rig = columns.stat_rig
+    unpaid: Dict[str, Decimal] = {}
+    for rig in fleet.rigs:
+        for stat in rig.stats:
+            unpaid[stat.algorithm] = unpaid.get(stat.algorithm, Decimal(0)) + stat.unpaid_amount
+
+    summaries = []
+    for algorithm, (start, end) in columns.algo_slices.items():
+        rig_indexes = stat_rig[start:end]
+        summaries.append(AlgoSummary(
+            algorithm,
+            end - start,
+            sum(1 for index in rig_indexes if status[index] == STATUS_MINING),
+            sum(columns.speed_accepted[start:end]),
+            sum(columns.speed_rejected[start:end]),
+            unpaid.get(algorithm, Decimal(0)),
+        ))
+    summaries.sort(key=lambda algo: algo.speed_accepted, reverse=True)
+    return summaries
+
+
+def profitability_windows(earnings: EarningsColumns, windows: Iterable[int] = DEFAULT_WINDOWS) -> Dict[int, Dict]:
+    """
+    Rentabilidad de las últimas ventanas de N días
+
+    Returns:
+        {días: {'days', 'total', 'average', 'monthly', 'yearly', 'previous_average',
+        'rolling'}}. 'days' son los días con datos y 'previous_average' el
+        promedio de la ventana anterior (None si no hay datos suficientes)
+    """
+    result = {}
+    count = len(earnings)
+    for days in windows:
+        available = min(days, count)
+        if not available:
+            continue
+        total = earnings.window_total(days)
+        average = total / available
+        previous = None
+        if count >= 2 * days:
+            previous = earnings.window_total(days, count - days) / days
+        result[days] = {
+            'days': available,
+            'total': total,
+            'average': average,
+            'monthly': average * 30,
+            'yearly': average * 365,
+            'previous_average': previous,
+            'rolling': earnings.rolling_average(days),
+        }
+    return result
+
+
+def rig_uptime(history: HashrateHistory, start: Optional[float] = None,
+               end: Optional[float] = None) -> Dict[str, float]:
+    """
+    Fracción de muestras con hashrate aceptado > 0 por rig
+
+    Un instante cuenta como activo si cualquiera de los algoritmos del rig
+    tenía hashrate en esa muestra.
+
+    Args:
+        history: Histórico de hashrate del monitor
+        start: Desde (segundos epoch)
+        end: Hasta (segundos epoch)
+
+    Returns:
+        {rigId: uptime entre 0 y 1}
+    """
+    samples: Dict[str, Dict[float, bool]] = {}
+    for rig_id, algorithm in history.keys():
+        columns = history.query(rig_id, algorithm, start, end)
+        seen = samples.setdefault(rig_id, {})
+        for timestamp, speed in zip(columns['timestamp'], columns['speedAccepted']):
+            if speed > 0:
+                seen[timestamp] = True
+            else:
+                seen.setdefault(timestamp, False)
+    return {
+        rig_id: sum(seen.values()) / len(seen)
+        for rig_id, seen in samples.items() if seen
+    }
+
+
+def analyze(fleet: Fleet, earnings: Optional[Sequence[Dict]] = None,
+            history: Optional[HashrateHistory] = None, windows: Iterable[int] = DEFAULT_WINDOWS,
+            uptime_since: Optional[float] = None) -> FleetAnalysis:
+    """
+    Calcula todos los reportes sobre un snapshot y el histórico
+
+    Args:
+        fleet: Snapshot decodificado de get_rigs
+        earnings: Ganancias diarias en orden cronológico (EarningsStore.last_days)
+        history: Histórico de hashrate para el uptime por rig (opcional)
+        windows: Ventanas de rentabilidad en días
+        uptime_since: Inicio del rango de uptime (segundos epoch; None = todo el histórico)
+
+    Returns:
+        FleetAnalysis
+    """
+    columns = fleet.columns
+    active = columns.active_count()
+    inactive = [
+        (name, STATUSES.name(code))
+        for name, code in zip(columns.names, columns.status) if code != STATUS_MINING
+    ]
+    analysis = FleetAnalysis(len(fleet), active, inactive, algorithm_totals(fleet))
+
+    if earnings:
+        days = EarningsColumns(earnings)
+        analysis.windows = profitability_windows(days, windows)
+        extremes = days.extremes()
+        if extremes:
+            best, worst = extremes
+            analysis.best_day = (days.dates[best], days.values[best])
+            analysis.worst_day = (days.dates[worst], days.values[worst])
+
+    if history is not None:
+        analysis.rig_names = {rig.rig_id: rig.name for rig in fleet}
+        uptime = rig_uptime(history, uptime_since)
+        analysis.uptime = {rig_id: uptime[rig_id] for rig_id in analysis.rig_names if rig_id in uptime}
+    return analysis
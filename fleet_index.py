@@ -0,0 +1,280 @@
+"""
+Índice jerárquico de la flota: grupo → subred → rig
+La subred sale del nombre del rig sin su último segmento ("10x1x0x107" →
+"10x1x0") y el grupo de miningRigGroups. Cada nodo mantiene rigs totales,
+activos y hashrate aceptado por algoritmo, de modo que las consultas por grupo
+o subred son O(1) y el índice se actualiza con los cambios de cada check en
+lugar de recorrer toda la flota
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Fleet, Rig, STATUS_MINING
+from rig_state import ChangeSet, MINING
+
+# Grupo de los rigs que no pertenecen a ningún grupo de miningRigGroups
+UNGROUPED = ''
+
+# Separador de los segmentos del nombre (estilo IP: 10x1x0x107)
+SUBNET_SEPARATOR = 'x'
+
+
+def subnet_of(name: str) -> str:
+    """Subred de un rig: su nombre sin el último segmento ('' si no tiene segmentos)"""
+    head, separator, _ = name.rpartition(SUBNET_SEPARATOR)
+    return head if separator and head else ''
+
+
+def group_map(groups: Optional[Iterable[Dict]]) -> Dict[str, str]:
+    """
+    rigId → nombre del grupo a partir de miningRigGroups (incluye subgrupos)
+
+    Los rigs de cada grupo pueden venir como IDs o como objetos con rigId.
+    """
+    result = {}
+    pending = list(groups or ())
+    while pending:
+        group = pending.pop()
+        if not isinstance(group, dict):
+            continue
+        name = group.get('name') or group.get('id') or UNGROUPED
+        for rig in group.get('rigs') or ():
+            rig_id = rig if isinstance(rig, str) else (rig or {}).get('rigId')
+            if rig_id:
+                result[rig_id] = name
+        subgroups = group.get('groups') or ()
+        pending.extend(subgroups.values() if isinstance(subgroups, dict) else subgroups)
+    return result
+
+
+def location_label(group: str, subnet: str) -> str:
+    """Texto de una subred para reportes ('Grupo / 10x1x0' o '10x1x0')"""
+    subnet = subnet or 'sin subred'
+    return f"{group} / {subnet}" if group else subnet
+
+
+class NodeStats:
+    """Totales de un nodo del índice (flota, grupo o subred)"""
+
+    __slots__ = ('total', 'active', 'speed')
+
+    def __init__(self):
+        self.total = 0
+        self.active = 0
+        self.speed: Dict[str, float] = {}
+
+    @property
+    def offline(self) -> int:
+        return self.total - self.active
+
+    def _add_speeds(self, speeds: Tuple[Tuple[str, float], ...], sign: int):
+        speed = self.speed
+        for algorithm, value in speeds:
+            speed[algorithm] = speed.get(algorithm, 0.0) + sign * value
+
+
+@dataclass
+class SubnetChange:
+    """Variación de rigs activos de una subred en un check"""
+
+    __slots__ = ('group', 'subnet', 'delta', 'active', 'total')
+
+    group: str
+    subnet: str
+    delta: int
+    active: int
+    total: int
+
+    @property
+    def label(self) -> str:
+        return location_label(self.group, self.subnet)
+
+
+class FleetIndex:
+    """
+    Índice grupo → subred → rig con contadores por nodo
+
+    build() lo arma desde un snapshot; update() aplica el ChangeSet de cada
+    check (estados en O(cambios)) y refresca el hashrate con una pasada por
+    las estadísticas del snapshot.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # nombre → (grupo, subred, activo, ((algoritmo, hashrate), ...))
+        self.rigs: Dict[str, Tuple[str, str, bool, Tuple[Tuple[str, float], ...]]] = {}
+        self.fleet = NodeStats()
+        self.groups: Dict[str, NodeStats] = {}
+        self.subnets: Dict[Tuple[str, str], NodeStats] = {}
+        self.subnet_totals: Dict[str, NodeStats] = {}
+        self.members: Dict[Tuple[str, str], set] = {}
+
+    def __len__(self) -> int:
+        return len(self.rigs)
+
+    def _nodes(self, group: str, subnet: str) -> Tuple[NodeStats, ...]:
+        node_group = self.groups.get(group)
+        if node_group is None:
+            node_group = self.groups[group] = NodeStats()
+        node_subnet = self.subnets.get((group, subnet))
+        if node_subnet is None:
+            node_subnet = self.subnets[(group, subnet)] = NodeStats()
+            self.members[(group, subnet)] = set()
+        node_total = self.subnet_totals.get(subnet)
+        if node_total is None:
+            node_total = self.subnet_totals[subnet] = NodeStats()
+        return self.fleet, node_group, node_subnet, node_total
+
+    @staticmethod
+    def _speeds(rig: Rig) -> Tuple[Tuple[str, float], ...]:
+        return tuple((stat.algorithm, stat.speed_accepted) for stat in rig.stats)
+
+    def _add(self, name: str, group: str, subnet: str, active: bool,
+             speeds: Tuple[Tuple[str, float], ...]):
+        self.rigs[name] = (group, subnet, active, speeds)
+        for node in self._nodes(group, subnet):
+            node.total += 1
+            node.active += active
+            node._add_speeds(speeds, 1)
+        self.members[(group, subnet)].add(name)
+
+    def _remove(self, name: str):
+        entry = self.rigs.pop(name, None)
+        if entry is None:
+            return
+        group, subnet, active, speeds = entry
+        for node in self._nodes(group, subnet):
+            node.total -= 1
+            node.active -= active
+            node._add_speeds(speeds, -1)
+        self.members[(group, subnet)].discard(name)
+        if not self.subnets[(group, subnet)].total:
+            del self.subnets[(group, subnet)]
+            del self.members[(group, subnet)]
+        if not self.groups[group].total:
+            del self.groups[group]
+        if not self.subnet_totals[subnet].total:
+            del self.subnet_totals[subnet]
+
+    def _set_active(self, name: str, active: bool):
+        entry = self.rigs.get(name)
+        if entry is None or entry[2] == active:
+            return
+        group, subnet, _, speeds = entry
+        self.rigs[name] = (group, subnet, active, speeds)
+        step = 1 if active else -1
+        for node in self._nodes(group, subnet):
+            node.active += step
+
+    def build(self, fleet: Fleet):
+        """Arma el índice desde cero a partir de un snapshot"""
+        self.clear()
+        groups = group_map(fleet.groups)
+        for rig in fleet:
+            self._add(rig.name, groups.get(rig.rig_id, UNGROUPED), subnet_of(rig.name),
+                      rig.status_code == STATUS_MINING, self._speeds(rig))
+
+    def refresh(self, fleet: Fleet):
+        """
+        Actualiza hashrate, altas y cambios de grupo con una pasada por el snapshot
+
+        Los estados no se tocan aquí: llegan por el ChangeSet en update().
+        """
+        groups = group_map(fleet.groups)
+        for rig in fleet:
+            entry = self.rigs.get(rig.name)
+            group = groups.get(rig.rig_id, UNGROUPED)
+            speeds = self._speeds(rig)
+            if entry is None or entry[0] != group:
+                self._remove(rig.name)
+                self._add(rig.name, group, subnet_of(rig.name), rig.status_code == STATUS_MINING, speeds)
+            elif entry[3] != speeds:
+                entry_group, subnet, active, previous = entry
+                self.rigs[rig.name] = (entry_group, subnet, active, speeds)
+                for node in self._nodes(entry_group, subnet):
+                    node._add_speeds(previous, -1)
+                    node._add_speeds(speeds, 1)
+
+    def _location(self, name: str, groups: Dict[str, str]) -> Tuple[str, str]:
+        """(grupo, subred) del índice o, si el rig aún no está indexado, del payload"""
+        entry = self.rigs.get(name)
+        if entry is not None:
+            return entry[0], entry[1]
+        return groups.get(name, UNGROUPED), subnet_of(name)
+
+    def update(self, fleet: Fleet, changes: Optional[ChangeSet] = None) -> List[SubnetChange]:
+        """
+        Aplica un check al índice (lo arma en el primero)
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de estado de este check
+
+        Returns:
+            Subredes cuya cantidad de rigs activos cambió, de la mayor pérdida a
+            la mayor recuperación
+        """
+        deltas: Dict[Tuple[str, str], int] = {}
+        if changes is not None:
+            # Con el índice vacío (primer check del proceso) el grupo sale del payload
+            by_id = group_map(fleet.groups)
+            groups = {rig.name: by_id[rig.rig_id] for rig in fleet if rig.rig_id in by_id} if by_id else {}
+            for name, _, _ in changes.down:
+                location = self._location(name, groups)
+                deltas[location] = deltas.get(location, 0) - 1
+            for name, _, _ in changes.recovered:
+                location = self._location(name, groups)
+                deltas[location] = deltas.get(location, 0) + 1
+            for name, previous in changes.removed:
+                if previous == MINING:
+                    location = self._location(name, groups)
+                    deltas[location] = deltas.get(location, 0) - 1
+
+        if not self.rigs:
+            self.build(fleet)
+        else:
+            if changes is not None:
+                for name, _, status in changes.down + changes.recovered + changes.changed:
+                    self._set_active(name, status == MINING)
+                for name, _ in changes.removed:
+                    self._remove(name)
+            self.refresh(fleet)
+
+        result = []
+        for (group, subnet), delta in deltas.items():
+            if not delta:
+                continue
+            node = self.subnets.get((group, subnet))
+            result.append(SubnetChange(group, subnet, delta, node.active if node else 0,
+                                       node.total if node else 0))
+        result.sort(key=lambda change: (change.delta, change.label))
+        return result
+
+    def group(self, group: str) -> Optional[NodeStats]:
+        """Totales de un grupo (UNGROUPED = rigs sin grupo)"""
+        return self.groups.get(group)
+
+    def subnet(self, subnet: str, group: Optional[str] = None) -> Optional[NodeStats]:
+        """Totales de una subred, dentro de un grupo o sumando todos los grupos"""
+        if group is None:
+            return self.subnet_totals.get(subnet)
+        return self.subnets.get((group, subnet))
+
+    def rigs_in(self, subnet: str, group: str = UNGROUPED) -> List[str]:
+        """Nombres de los rigs de una subred dentro de un grupo"""
+        return sorted(self.members.get((group, subnet), ()))
+
+    def location(self, name: str) -> Optional[Tuple[str, str]]:
+        """(grupo, subred) de un rig indexado"""
+        entry = self.rigs.get(name)
+        return (entry[0], entry[1]) if entry is not None else None
+
+    def worst_subnets(self, limit: int = 10) -> List[Tuple[str, str, NodeStats]]:
+        """Subredes con más rigs sin minar como (grupo, subred, totales)"""
+        ranked = sorted(
+            ((group, subnet, node) for (group, subnet), node in self.subnets.items() if node.offline),
+            key=lambda item: (-item[2].offline, location_label(item[0], item[1]))
+        )
+        return ranked[:limit]
@@ -0,0 +1,536 @@
+"""
+Histórico de hashrate por rig y algoritmo con niveles de resolución
+Cada poll guarda las métricas de miningRigs[].stats[] en buffers circulares
+(array) y se resume automáticamente en niveles raw → 5 min → 1 h → 1 día,
+con memoria y disco acotados por la capacidad de cada nivel. En disco cada
+poll se agrega a un segmento (<archivo>.seg) y el archivo completo solo se
+reescribe cuando cierra un bucket del nivel de compactación
+"""
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Rig
+
+# Métricas guardadas por muestra (mismos nombres que el payload de la API)
+METRICS = (
+    'speedAccepted',
+    'speedRejectedR1Target',
+    'speedRejectedR2Stale',
+    'speedRejectedR3Duplicate',
+    'speedRejectedR4NTime',
+    'speedRejectedR5Other',
+    'difficulty',
+    'timeConnected',
+)
+
+# Métricas que al resumir conservan el último valor en lugar del promedio
+LAST_VALUE_METRICS = ('difficulty', 'timeConnected')
+
+# Atributo de models.AlgoStat para cada métrica
+METRIC_ATTRS = (
+    'speed_accepted',
+    'speed_rejected_r1',
+    'speed_rejected_r2',
+    'speed_rejected_r3',
+    'speed_rejected_r4',
+    'speed_rejected_r5',
+    'difficulty',
+    'time_connected',
+)
+
+# Precisión simple para velocidades; timeConnected (ms epoch) necesita double
+METRIC_TYPECODES = {name: ('d' if name == 'timeConnected' else 'f') for name in METRICS}
+
+# (nombre, segundos por bucket, capacidad): 0 = una muestra por poll
+DEFAULT_TIERS = (
+    ('raw', 0, 120),
+    ('5m', 300, 288),
+    ('1h', 3600, 168),
+    ('1d', 86400, 365),
+)
+
+# Nivel cuyo cierre de bucket dispara la reescritura completa del archivo
+DEFAULT_COMPACT_TIER = '1h'
+
+_HEADER_SIZE = struct.Struct('<I')
+
+
+class RingBuffer:
+    """Buffer circular de muestras (timestamp + métricas) en columnas array"""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.head = 0
+        self.timestamps = array('d')
+        self.columns = {name: array(METRIC_TYPECODES[name]) for name in METRICS}
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    def push(self, timestamp: float, values: Tuple[float, ...]):
+        """Agrega una muestra; al llenarse sobrescribe la más antigua"""
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(timestamp)
+            for name, value in zip(METRICS, values):
+                self.columns[name].append(value)
+        else:
+            self.timestamps[self.head] = timestamp
+            for name, value in zip(METRICS, values):
+                self.columns[name][self.head] = value
+            self.head = (self.head + 1) % self.capacity
+    
+    def ordered(self, start: Optional[float] = None, end: Optional[float] = None,
+                metrics: Iterable[str] = METRICS) -> Dict[str, array]:
+        """
+        Devuelve las muestras en orden cronológico, opcionalmente filtradas
+        
+        Args:
+            start: Desde (segundos epoch)
+            end: Hasta (segundos epoch)
+            metrics: Métricas a incluir
+        
+        Returns:
+            Diccionario {'timestamp': array, métrica: array, ...}
+        """
+        head = self.head
+        result = {'timestamp': self.timestamps[head:] + self.timestamps[:head]}
+        for name in metrics:
+            column = self.columns[name]
+            result[name] = column[head:] + column[:head]
+        
+        if start is None and end is None:
+            return result
+        
+        timestamps = result['timestamp']
+        lo = bisect.bisect_left(timestamps, start) if start is not None else 0
+        hi = bisect.bisect_right(timestamps, end) if end is not None else len(timestamps)
+        return {name: column[lo:hi] for name, column in result.items()}
+
+
+class _Bucket:
+    """Acumulador del bucket en curso de un nivel resumido"""
+    
+    __slots__ = ('start', 'count', 'sums', 'last')
+    
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.sums = [0.0] * len(METRICS)
+        self.last = [0.0] * len(METRICS)
+    
+    def add(self, values: Tuple[float, ...]):
+        self.count += 1
+        for i, value in enumerate(values):
+            self.sums[i] += value
+        self.last = list(values)
+    
+    def value(self) -> Tuple[float, ...]:
+        return tuple(
+            self.last[i] if name in LAST_VALUE_METRICS else self.sums[i] / self.count
+            for i, name in enumerate(METRICS)
+        )
+
+
+class _Series:
+    """Todos los niveles de una combinación rig + algoritmo"""
+    
+    def __init__(self, tiers):
+        self.buffers = {name: RingBuffer(capacity) for name, _, capacity in tiers}
+        self.buckets = {}
+
+
+class HashrateHistory:
+    """
+    Histórico por (rigId, algoritmo) con resumen automático por niveles
+    
+    save() no reescribe todo el archivo en cada poll: agrega las muestras
+    nuevas al segmento y compacta (archivo completo + segmento vacío) solo al
+    cerrar un bucket de `compact_tier`, al olvidar rigs o si el segmento ya
+    pesa tanto como el archivo. load() aplica el segmento sobre el archivo.
+    """
+    
+    def __init__(self, path: Optional[str] = None, tiers=DEFAULT_TIERS,
+                 compact_tier: str = DEFAULT_COMPACT_TIER):
+        """
+        Inicializa el histórico y lo carga desde disco si existe
+        
+        Args:
+            path: Archivo binario donde persistir (None para solo memoria)
+            tiers: Niveles (nombre, segundos por bucket, capacidad)
+            compact_tier: Nivel cuyo cierre de bucket dispara la compactación
+                (si no existe, el último nivel)
+        """
+        self.path = path
+        self.segment_path = f"{path}.seg" if path else None
+        self.tiers = tiers
+        names = [name for name, _, _ in tiers]
+        self.compact_tier = compact_tier if compact_tier in names else names[-1]
+        self.series = {}
+        # Muestras aún no escritas: (rigId, algoritmo, timestamp, valores)
+        self._pending = []
+        self._needs_compaction = False
+        # Generación del archivo completo: los bloques del segmento la llevan
+        # para descartar los que ya quedaron dentro de una compactación
+        self._generation = 0
+        self._snapshot_size = 0
+        if path:
+            self.load()
+    
+    def add_sample(self, rig_id: str, algorithm: str, timestamp: float, values: Tuple[float, ...]):
+        """
+        Agrega una muestra y actualiza los niveles resumidos
+        
+        Args:
+            rig_id: ID del rig
+            algorithm: enumName del algoritmo
+            timestamp: Segundos epoch del poll
+            values: Valores en el orden de METRICS
+        """
+        self._pending.append((rig_id, algorithm, timestamp, values))
+        self._add(rig_id, algorithm, timestamp, values)
+    
+    def _add(self, rig_id: str, algorithm: str, timestamp: float, values: Tuple[float, ...]):
+        key = (rig_id, algorithm)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _Series(self.tiers)
+        
+        for name, seconds, _ in self.tiers:
+            if seconds == 0:
+                series.buffers[name].push(timestamp, values)
+                continue
+            
+            bucket_start = timestamp - timestamp % seconds
+            bucket = series.buckets.get(name)
+            if bucket is not None and bucket.start != bucket_start:
+                # El bucket anterior se cerró: pasa al buffer del nivel
+                series.buffers[name].push(bucket.start, bucket.value())
+                bucket = None
+                if name == self.compact_tier:
+                    self._needs_compaction = True
+            if bucket is None:
+                bucket = series.buckets[name] = _Bucket(bucket_start)
+            bucket.add(values)
+    
+    def record(self, rigs: Iterable[Rig], timestamp: float) -> int:
+        """
+        Registra las estadísticas de un snapshot decodificado
+        
+        Las series de rigs que ya no están en el snapshot se olvidan, así el
+        archivo no crece con rigs que dejaron la flota. Si el snapshot es
+        parcial (falló alguna página) no se olvida nada.
+        
+        Args:
+            rigs: Rigs del snapshot (models.Fleet o lista de models.Rig)
+            timestamp: Segundos epoch del poll
+            
+        Returns:
+            Cantidad de muestras registradas
+        """
+        samples = 0
+        present = set()
+        for rig in rigs:
+            present.add(rig.rig_id)
+            for stat in rig.stats:
+                values = tuple(getattr(stat, attr) for attr in METRIC_ATTRS)
+                self.add_sample(rig.rig_id, stat.algorithm, timestamp, values)
+                samples += 1
+        if present and not getattr(rigs, 'partial', False):
+            self.evict(key for key in self.series if key[0] not in present)
+        return samples
+    
+    def evict(self, keys: Iterable[Tuple[str, str]]) -> int:
+        """
+        Olvida series (rigId, algoritmo); el archivo se compacta en el próximo save()
+        
+        Returns:
+            Cantidad de series eliminadas
+        """
+        removed = 0
+        for key in list(keys):
+            if self.series.pop(key, None) is not None:
+                removed += 1
+        if removed:
+            self._needs_compaction = True
+        return removed
+    
+    def _pick_tier(self, series: _Series, start: Optional[float]) -> str:
+        """Nivel más fino que cubre el rango pedido (raw si aún conserva el inicio)"""
+        raw_name = self.tiers[0][0]
+        raw = series.buffers[raw_name].timestamps
+        if start is None or not raw or min(raw) <= start:
+            return raw_name
+        span = max(raw) - start
+        for name, seconds, capacity in self.tiers[1:]:
+            if seconds * capacity >= span:
+                return name
+        return self.tiers[-1][0]
+    
+    def query(self, rig_id: str, algorithm: str, start: Optional[float] = None,
+              end: Optional[float] = None, tier: Optional[str] = None) -> Dict[str, array]:
+        """
+        Serie de un rig y algoritmo
+        
+        Args:
+            rig_id: ID del rig
+            algorithm: enumName del algoritmo
+            start: Desde (segundos epoch)
+            end: Hasta (segundos epoch)
+            tier: Nivel a usar (por defecto el más fino que cubre el rango)
+            
+        Returns:
+            Columnas {'timestamp': array, métrica: array}; vacías si no hay datos
+        """
+        series = self.series.get((rig_id, algorithm))
+        if series is None:
+            return {'timestamp': array('d'), **{name: array(METRIC_TYPECODES[name]) for name in METRICS}}
+        
+        return series.buffers[tier or self._pick_tier(series, start)].ordered(start, end)
+    
+    def aggregate(self, metric: str = 'speedAccepted', algorithm: Optional[str] = None,
+                  rig_ids: Optional[Iterable[str]] = None, start: Optional[float] = None,
+                  end: Optional[float] = None, tier: Optional[str] = None) -> Tuple[array, array]:
+        """
+        Suma una métrica sobre varios rigs por timestamp
+        
+        Los niveles resumidos comparten los límites de bucket y el nivel raw
+        comparte el timestamp del poll, así que las series se alinean.
+        
+        Args:
+            metric: Métrica a sumar
+            algorithm: Filtrar por algoritmo (None = todos)
+            rig_ids: Filtrar por rigs (None = todos)
+            start: Desde (segundos epoch)
+            end: Hasta (segundos epoch)
+            tier: Nivel a usar (por defecto el más fino que cubre el rango
+                para la primera serie; se usa el mismo en todas)
+            
+        Returns:
+            Tupla (timestamps, sumas) como arrays de double
+        """
+        wanted = set(rig_ids) if rig_ids is not None else None
+        totals = {}
+        
+        for (rig_id, algo), series in self.series.items():
+            if algorithm is not None and algo != algorithm:
+                continue
+            if wanted is not None and rig_id not in wanted:
+                continue
+            if tier is None:
+                tier = self._pick_tier(series, start)
+            columns = series.buffers[tier].ordered(start, end, (metric,))
+            for timestamp, value in zip(columns['timestamp'], columns[metric]):
+                totals[timestamp] = totals.get(timestamp, 0.0) + value
+        
+        timestamps = sorted(totals)
+        return array('d', timestamps), array('d', (totals[t] for t in timestamps))
+    
+    def recent_mean(self, rig_id: str, algorithm: str, samples: int = 12,
+                    metric: str = 'speedAccepted') -> Optional[float]:
+        """
+        Promedio de las últimas muestras sin procesar de una serie
+        
+        Lee el buffer circular en su lugar (sin ordenar toda la serie), así
+        se puede consultar por cada rig en cada check.
+        
+        Args:
+            rig_id: ID del rig
+            algorithm: enumName del algoritmo
+            samples: Muestras a promediar (las más recientes)
+            metric: Métrica a promediar
+        
+        Returns:
+            Promedio, o None si la serie no tiene muestras
+        """
+        series = self.series.get((rig_id, algorithm))
+        if series is None:
+            return None
+        buffer = series.buffers[self.tiers[0][0]]
+        size = len(buffer)
+        if not size:
+            return None
+        
+        count = min(samples, size)
+        column = buffer.columns[metric]
+        # Posición siguiente a la muestra más nueva
+        end = buffer.head if size == buffer.capacity else size
+        if end >= count:
+            values = column[end - count:end]
+        else:
+            values = column[:end] + column[size - (count - end):]
+        return sum(values) / count
+    
+    def keys(self) -> List[Tuple[str, str]]:
+        """Combinaciones (rigId, algoritmo) registradas"""
+        return list(self.series)
+    
+    def save(self):
+        """
+        Persiste las muestras nuevas
+
+        Normalmente agrega un bloque al segmento; compacta (ver compact())
+        si cerró un bucket de `compact_tier`, se olvidaron rigs, aún no hay
+        archivo completo o el segmento ya pesa tanto como el archivo.
+        """
+        if not self.path:
+            return
+        
+        if (self._needs_compaction or not os.path.exists(self.path)
+                or self._segment_size() >= self._snapshot_size):
+            self.compact()
+            return
+        if not self._pending:
+            return
+        
+        header = {'gen': self._generation,
+                  'samples': [[rig_id, algorithm, timestamp] for rig_id, algorithm, timestamp, _ in self._pending]}
+        values = array('d')
+        for _, _, _, sample in self._pending:
+            values.extend(sample)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        header_bytes = json.dumps(header).encode('utf-8')
+        # Un solo write por bloque: un bloque cortado por una caída se descarta al cargar
+        with open(self.segment_path, 'ab') as f:
+            f.write(_HEADER_SIZE.pack(len(header_bytes)) + header_bytes + values.tobytes())
+        self._pending = []
+    
+    def _segment_size(self) -> int:
+        try:
+            return os.path.getsize(self.segment_path)
+        except OSError:
+            return 0
+    
+    def compact(self):
+        """
+        Reescribe el histórico completo de forma atómica y vacía el segmento
+        
+        Formato: longitud del encabezado (uint32) + encabezado JSON + columnas
+        binarias en el orden descrito por el encabezado.
+        """
+        if not self.path:
+            return
+        
+        generation = self._generation + 1
+        header = {'tiers': [list(tier) for tier in self.tiers], 'gen': generation, 'series': []}
+        blobs = []
+        for (rig_id, algorithm), series in self.series.items():
+            entry = {'rig': rig_id, 'algo': algorithm, 'buffers': {}, 'buckets': {}}
+            for name, buffer in series.buffers.items():
+                entry['buffers'][name] = {'head': buffer.head, 'count': len(buffer)}
+                blobs.append(buffer.timestamps)
+                blobs.extend(buffer.columns[metric] for metric in METRICS)
+            for name, bucket in series.buckets.items():
+                entry['buckets'][name] = [bucket.start, bucket.count, bucket.sums, bucket.last]
+            header['series'].append(entry)
+        
+        header_bytes = json.dumps(header).encode('utf-8')
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER_SIZE.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for blob in blobs:
+                if sys.byteorder == 'big':
+                    blob = array(blob.typecode, blob)
+                    blob.byteswap()
+                f.write(blob.tobytes())
+        os.replace(tmp_path, self.path)
+        # Si el proceso cae antes de vaciar el segmento, sus bloques llevan la
+        # generación anterior y load() los ignora
+        open(self.segment_path, 'wb').close()
+        
+        self._generation = generation
+        self._snapshot_size = os.path.getsize(self.path)
+        self._pending = []
+        self._needs_compaction = False
+    
+    def load(self):
+        """
+        Carga el histórico guardado (archivo completo + segmento)
+
+        Ignora el archivo completo si cambió la configuración de niveles.
+        """
+        self._load_snapshot()
+        self._replay_segment()
+        self._pending = []
+    
+    def _load_snapshot(self):
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        
+        try:
+            (header_size,) = _HEADER_SIZE.unpack_from(raw)
+            header = json.loads(raw[_HEADER_SIZE.size:_HEADER_SIZE.size + header_size])
+            self._generation = header.get('gen', 0)
+            self._snapshot_size = len(raw)
+            if [tuple(tier) for tier in header['tiers']] != list(self.tiers):
+                print("ℹ️  Niveles del histórico de hashrate cambiaron, comenzando desde cero")
+                self._needs_compaction = True
+                return
+            
+            offset = _HEADER_SIZE.size + header_size
+            for entry in header['series']:
+                series = _Series(self.tiers)
+                for name, _, _ in self.tiers:
+                    info = entry['buffers'][name]
+                    buffer = series.buffers[name]
+                    buffer.head = info['head']
+                    for column in [buffer.timestamps] + [buffer.columns[m] for m in METRICS]:
+                        size = column.itemsize * info['count']
+                        column.frombytes(raw[offset:offset + size])
+                        if sys.byteorder == 'big':
+                            column.byteswap()
+                        offset += size
+                for name, (start, count, sums, last) in entry['buckets'].items():
+                    bucket = _Bucket(start)
+                    bucket.count, bucket.sums, bucket.last = count, sums, last
+                    series.buckets[name] = bucket
+                self.series[(entry['rig'], entry['algo'])] = series
+        except Exception as e:
+            print(f"⚠️  Error al cargar histórico de hashrate: {e}")
+            self.series = {}
+            self._needs_compaction = True
+    
+    def _replay_segment(self):
+        """Aplica los bloques del segmento posteriores al archivo completo"""
+        try:
+            with open(self.segment_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return
+        
+        offset = 0
+        width = len(METRICS)
+        try:
+            while offset + _HEADER_SIZE.size <= len(raw):
+                (header_size,) = _HEADER_SIZE.unpack_from(raw, offset)
+                start = offset + _HEADER_SIZE.size
+                if start + header_size > len(raw):
+                    # Bloque incompleto (caída a mitad de la escritura)
+                    break
+                header = json.loads(raw[start:start + header_size])
+                samples = header['samples']
+                values = array('d')
+                size = values.itemsize * width * len(samples)
+                data = raw[start + header_size:start + header_size + size]
+                if len(data) < size:
+                    # Bloque incompleto (caída a mitad de la escritura)
+                    break
+                values.frombytes(data)
+                if sys.byteorder == 'big':
+                    values.byteswap()
+                offset = start + header_size + size
+                if header['gen'] != self._generation:
+                    continue
+                for i, (rig_id, algorithm, timestamp) in enumerate(samples):
+                    self._add(rig_id, algorithm, timestamp, tuple(values[i * width:(i + 1) * width]))
+        except Exception as e:
+            print(f"⚠️  Error al leer el segmento del histórico de hashrate: {e}")
@@ -4,32 +4,11 @@ Muestra hashrate, mineros activos y producción mensual
 """
 from datetime import datetime, timedelta
 from nicehash_client import NiceHashClient
+from models import Fleet
+from fleet_analytics import format_hashrate
 import json
 
 
-def format_hashrate(hashrate: float, unit: str = 'H/s') -> str:
-    """
-    Formatea el hashrate a una unidad legible
-    
-    Args:
-        hashrate: Valor del hashrate
-        unit: Unidad del hashrate
-        
-    Returns:
-        String formateado
-    """
-    if hashrate >= 1_000_000_000_000:
-        return f"{hashrate/1_000_000_000_000:.2f} TH/s"
-    elif hashrate >= 1_000_000_000:
-        return f"{hashrate/1_000_000_000:.2f} GH/s"
-    elif hashrate >= 1_000_000:
-        return f"{hashrate/1_000_000:.2f} MH/s"
-    elif hashrate >= 1_000:
-        return f"{hashrate/1_000:.2f} KH/s"
-    else:
-        return f"{hashrate:.2f} H/s"
-
-
 def print_separator(title: str = ""):
     """Imprime un separador visual"""
     if title:
@@ -48,9 +27,9 @@ def show_active_rigs(client: NiceHashClient):
         rigs_data = client.get_rigs()
         
         if 'miningRigs' in rigs_data:
-            rigs = rigs_data['miningRigs']
-            total_rigs = len(rigs)
-            active_rigs = sum(1 for rig in rigs if rig.get('minerStatus') == 'MINING')
+            fleet = Fleet.from_api(rigs_data)
+            total_rigs = len(fleet)
+            active_rigs = fleet.columns.active_count()
             
             print(f"\n📊 Total de Rigs: {total_rigs}")
             print(f"✅ Rigs Activos: {active_rigs}")
@@ -60,25 +39,16 @@ def show_active_rigs(client: NiceHashClient):
             print("Detalle de Rigs:")
             print("-" * 60)
             
-            for rig in rigs:
-                name = rig.get('name', 'Sin nombre')
-                status = rig.get('minerStatus', 'UNKNOWN')
-                status_icon = "✅" if status == "MINING" else "❌"
+            for rig in fleet:
+                status_icon = "✅" if rig.is_mining else "❌"
                 
-                print(f"\n{status_icon} {name}")
-                print(f"   Estado: {status}")
+                print(f"\n{status_icon} {rig.name}")
+                print(f"   Estado: {rig.status}")
                 
                 # Mostrar hashrate por dispositivo
-                if 'devices' in rig:
-                    for device in rig['devices']:
-                        device_name = device.get('name', 'Dispositivo')
-                        speeds = device.get('speeds', [])
-                        
-                        if speeds:
-                            for speed in speeds:
-                                algo = speed.get('algorithm', 'N/A')
-                                hashrate = float(speed.get('speed', 0))
-                                print(f"   └─ {device_name} ({algo}): {format_hashrate(hashrate)}")
+                for device in rig.devices:
+                    for algo, hashrate in device.speeds:
+                        print(f"   └─ {device.name} ({algo}): {format_hashrate(hashrate)}")
         else:
             print("⚠️  No se encontraron rigs")
             
@@ -0,0 +1,329 @@
+"""
+Instrumentación del cliente y del monitor
+Histogramas y contadores en memoria, exportables como texto de Prometheus
+(endpoint HTTP opcional) y como una línea JSON por ejecución. Desactivada por
+defecto (NICEHASH_METRICS=1 para activarla); desactivada, cada punto de
+medición cuesta una comprobación de un booleano
+"""
+import json
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+
+# Límites (segundos) de los buckets de latencia
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Interruptor global: los puntos de medición consultan `metrics.enabled`
+enabled = config.METRICS_ENABLED
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+def _escape_label(value) -> str:
+    """Escapa un valor de etiqueta según el formato de texto de Prometheus (\\, " y salto de línea)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Contador monotónico con etiquetas"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                    for key, value in sorted(self.values.items())]
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [dict(key, value=value) for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    """Histograma con buckets fijos (acumulables entre ejecuciones y procesos)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma, cantidad, máximo]
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0.0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            if value > series[3]:
+                series[3] = value
+
+    def _quantile(self, counts: List[int], total: int, maximum: float, q: float) -> float:
+        """Estimación del cuantil q por el límite superior de su bucket (o el máximo)"""
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[index], maximum) if index < len(self.buckets) else maximum
+        return maximum
+
+    def render(self) -> List[str]:
+        lines = []
+        inf = 'le="+Inf"'
+        with self._lock:
+            for key, (counts, total_sum, count, _) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, inf)} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total_sum:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [
+                dict(
+                    key,
+                    count=count,
+                    sum=round(total_sum, 6),
+                    max=round(maximum, 6),
+                    p50=self._quantile(counts, count, maximum, 0.5),
+                    p99=self._quantile(counts, count, maximum, 0.99),
+                )
+                for key, (counts, total_sum, count, maximum) in sorted(self.series.items())
+            ]
+
+
+class Registry:
+    """Conjunto de métricas del proceso más colectores de valores instantáneos"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self.collectors: List[Tuple[str, Tuple, Callable[[], Dict]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def register_collector(self, prefix: str, collect: Callable[[], Dict], **labels):
+        """
+        Registra una función que devuelve valores instantáneos (gauges)
+
+        Args:
+            prefix: Prefijo de los nombres (p. ej. "nicehash_daemon")
+            collect: Función que devuelve {nombre: valor numérico}
+            **labels: Etiquetas de la serie (p. ej. account="Granja A")
+        """
+        with self._lock:
+            self.collectors.append((prefix, _label_key(labels), collect))
+
+    def _collect(self) -> Dict[str, List[Tuple[Tuple, float]]]:
+        values: Dict[str, List[Tuple[Tuple, float]]] = {}
+        for prefix, key, collect in list(self.collectors):
+            try:
+                for name, value in collect().items():
+                    if isinstance(value, (int, float)):
+                        values.setdefault(f"{prefix}_{name}", []).append((key, value))
+            except Exception as e:
+                print(f"⚠️  Error al leer métricas de {prefix}: {e}")
+        return values
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for name, series in sorted(self._collect().items()):
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in series:
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        """Todas las métricas como diccionario (serializable a JSON)"""
+        data = {metric.name: metric.snapshot() for metric in list(self.metrics.values())}
+        for name, series in self._collect().items():
+            data[name] = [dict(key, value=value) for key, value in series]
+        return data
+
+
+registry = Registry()
+
+
+class _NullTimer:
+    """Temporizador vacío que se usa cuando la instrumentación está desactivada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+# Métricas del cliente de la API
+API_LATENCY = registry.histogram('nicehash_api_request_seconds', 'Latencia de cada intento de petición a la API')
+API_BYTES = registry.counter('nicehash_api_response_bytes_total', 'Bytes recibidos de la API')
+API_DECODE = registry.histogram('nicehash_api_decode_seconds', 'Tiempo de decodificación JSON de las respuestas')
+API_SIGN = registry.histogram('nicehash_api_sign_seconds', 'Tiempo de cálculo de la firma HMAC')
+API_RETRIES = registry.counter('nicehash_api_retries_total', 'Reintentos de peticiones a la API')
+API_THROTTLED = registry.counter('nicehash_api_throttled_seconds_total', 'Segundos esperando al limitador y al backoff')
+API_CACHE = registry.counter('nicehash_api_cache_total', 'Consultas a la caché de respuestas por resultado')
+
+# Métricas del monitor
+CHECK_PHASE = registry.histogram('nicehash_check_phase_seconds', 'Duración de cada fase de una verificación')
+TELEGRAM_SEND = registry.histogram('nicehash_telegram_send_seconds', 'Latencia de sendMessage de Telegram')
+
+
+def phase(name: str):
+    """
+    Mide una fase de la verificación (with metrics.phase('fetch'): ...)
+
+    Desactivada la instrumentación devuelve un contexto vacío compartido.
+    """
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(CHECK_PHASE, {'phase': name})
+
+
+def timer(histogram: Histogram, **labels):
+    """Mide el bloque en el histograma indicado (contexto vacío si está desactivada)"""
+    if not enabled:
+        return _NULL_TIMER
+    return _Timer(histogram, labels)
+
+
+def emit_json_line(run: str, path: Optional[str] = None) -> Optional[str]:
+    """
+    Escribe una línea JSON con todas las métricas de la ejecución
+
+    La línea va a stdout con el prefijo "METRICS " (fácil de filtrar en los
+    logs de GitHub Actions) y, si se indica, se agrega a `path`.
+
+    Args:
+        run: Modo de ejecución (check-once, send-report, daemon...)
+        path: Archivo JSONL donde agregar la línea (por defecto config.METRICS_FILE)
+
+    Returns:
+        La línea escrita, o None si la instrumentación está desactivada
+    """
+    if not enabled:
+        return None
+    line = json.dumps({'ts': int(time.time()), 'run': run, 'metrics': registry.snapshot()},
+                      ensure_ascii=False, default=str)
+    print(f"METRICS {line}")
+    path = path if path is not None else config.METRICS_FILE
+    if path:
+        try:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        except Exception as e:
+            print(f"⚠️  Error al guardar métricas: {e}")
+    return line
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: Optional[int] = None, host: Optional[str] = None) -> Optional[ThreadingHTTPServer]:
+    """
+    Publica /metrics (formato Prometheus) en un hilo en segundo plano
+
+    Args:
+        port: Puerto (por defecto config.METRICS_PORT; 0 o sin configurar = no se publica)
+        host: Interfaz donde escuchar (por defecto config.METRICS_HOST, solo local)
+
+    Returns:
+        El servidor, o None si la instrumentación o el puerto están desactivados
+    """
+    port = config.METRICS_PORT if port is None else port
+    host = host or config.METRICS_HOST
+    if not enabled or not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    print(f"📈 Métricas en http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,322 @@
+"""
+Modelos tipados para los payloads de la API de NiceHash
+Decodifica una sola vez (números en texto → float/Decimal, estados y
+algoritmos internados como códigos) y permite ver la flota en columnas
+para calcular agregados sin recorrer diccionarios
+"""
+import sys
+from array import array
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+
+
+class CodeTable:
+    """Tabla de internado: asigna un código entero estable a cada texto"""
+    
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = []
+        self.codes = {}
+        for name in names:
+            self.code(name)
+    
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            name = sys.intern(name)
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+    
+    def name(self, code: int) -> str:
+        return self.names[code]
+
+
+# Estados de minerStatus conocidos; los nuevos se agregan al vuelo
+STATUSES = CodeTable((
+    'UNKNOWN', 'MINING', 'OFFLINE', 'STOPPED', 'BENCHMARKING',
+    'ERROR', 'PENDING', 'DISABLED', 'TRANSFERRED',
+))
+STATUS_UNKNOWN = STATUSES.code('UNKNOWN')
+STATUS_MINING = STATUSES.code('MINING')
+STATUS_OFFLINE = STATUSES.code('OFFLINE')
+
+ALGORITHMS = CodeTable(('UNKNOWN',))
+
+
+def to_float(value) -> float:
+    """Convierte números o textos numéricos de la API; vacío/None → 0.0"""
+    if value is None or value == '':
+        return 0.0
+    return float(value)
+
+
+def to_decimal(value) -> Decimal:
+    """Convierte montos en BTC (texto como "0.00006099") sin perder precisión"""
+    if value is None or value == '':
+        return Decimal(0)
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return Decimal(0)
+
+
+@dataclass
+class AlgoStat:
+    """Una entrada de miningRigs[].stats[]"""
+    
+    __slots__ = (
+        'algorithm', 'algorithm_code', 'market', 'stats_time', 'time_connected',
+        'difficulty', 'speed_accepted', 'speed_rejected_r1', 'speed_rejected_r2',
+        'speed_rejected_r3', 'speed_rejected_r4', 'speed_rejected_r5',
+        'speed_rejected_total', 'unpaid_amount', 'profitability',
+    )
+    
+    algorithm: str
+    algorithm_code: int
+    market: str
+    stats_time: int
+    time_connected: float
+    difficulty: float
+    speed_accepted: float
+    speed_rejected_r1: float
+    speed_rejected_r2: float
+    speed_rejected_r3: float
+    speed_rejected_r4: float
+    speed_rejected_r5: float
+    speed_rejected_total: float
+    unpaid_amount: Decimal
+    profitability: float
+    
+    @classmethod
+    def from_api(cls, data: Dict) -> 'AlgoStat':
+        algorithm = (data.get('algorithm') or {}).get('enumName') or 'UNKNOWN'
+        code = ALGORITHMS.code(algorithm)
+        return cls(
+            ALGORITHMS.name(code),
+            code,
+            data.get('market') or '',
+            int(data.get('statsTime') or 0),
+            to_float(data.get('timeConnected')),
+            to_float(data.get('difficulty')),
+            to_float(data.get('speedAccepted')),
+            to_float(data.get('speedRejectedR1Target')),
+            to_float(data.get('speedRejectedR2Stale')),
+            to_float(data.get('speedRejectedR3Duplicate')),
+            to_float(data.get('speedRejectedR4NTime')),
+            to_float(data.get('speedRejectedR5Other')),
+            to_float(data.get('speedRejectedTotal')),
+            to_decimal(data.get('unpaidAmount')),
+            to_float(data.get('profitability')),
+        )
+
+
+@dataclass
+class Device:
+    """Dispositivo de un rig administrado (NiceHash Miner); speeds = ((algoritmo, H/s), ...)"""
+    
+    __slots__ = ('device_id', 'name', 'status', 'speeds')
+    
+    device_id: str
+    name: str
+    status: str
+    speeds: Tuple[Tuple[str, float], ...]
+    
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Device':
+        status = data.get('status')
+        if isinstance(status, dict):
+            status = status.get('enumName')
+        return cls(
+            data.get('id') or '',
+            data.get('name') or 'Dispositivo',
+            sys.intern(status or 'UNKNOWN'),
+            tuple(
+                (ALGORITHMS.name(ALGORITHMS.code(speed.get('algorithm') or 'UNKNOWN')),
+                 to_float(speed.get('speed')))
+                for speed in data.get('speeds') or ()
+            ),
+        )
+
+
+@dataclass
+class Rig:
+    """Un elemento de miningRigs[]"""
+    
+    __slots__ = (
+        'rig_id', 'name', 'status', 'status_code', 'status_time',
+        'unpaid_amount', 'profitability', 'stats', 'devices',
+    )
+    
+    rig_id: str
+    name: str
+    status: str
+    status_code: int
+    status_time: int
+    unpaid_amount: Decimal
+    profitability: float
+    stats: Tuple[AlgoStat, ...]
+    devices: Tuple[Device, ...]
+    
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Rig':
+        code = STATUSES.code(data.get('minerStatus') or 'UNKNOWN')
+        name = data.get('name') or 'Sin nombre'
+        return cls(
+            data.get('rigId') or name,
+            name,
+            STATUSES.name(code),
+            code,
+            int(data.get('statusTime') or 0),
+            to_decimal(data.get('unpaidAmount')),
+            to_float(data.get('profitability')),
+            tuple(AlgoStat.from_api(stat) for stat in data.get('stats') or ()),
+            tuple(Device.from_api(device) for device in data.get('devices') or ()),
+        )
+    
+    @property
+    def is_mining(self) -> bool:
+        return self.status_code == STATUS_MINING
+
+
+class FleetColumns:
+    """
+    Vista en columnas de una flota
+    
+    Por rig: código de estado. Por estadística (rig × algoritmo): índice del
+    rig, velocidad aceptada y rechazada, agrupadas por algoritmo de modo que
+    cada algoritmo es un slice contiguo y sus sumas se hacen en C con sum().
+    """
+    
+    def __init__(self, rigs: List[Rig]):
+        self.names = [rig.name for rig in rigs]
+        self.status = array('B', (rig.status_code for rig in rigs))
+        
+        rows_by_algo = {}
+        for index, rig in enumerate(rigs):
+            for stat in rig.stats:
+                rows_by_algo.setdefault(stat.algorithm, []).append((index, stat))
+        
+        self.stat_rig = array('I')
+        self.speed_accepted = array('d')
+        self.speed_rejected = array('d')
+        self.algo_slices = {}
+        
+        for algorithm, rows in rows_by_algo.items():
+            start = len(self.stat_rig)
+            self.stat_rig.extend(index for index, _ in rows)
+            self.speed_accepted.extend(stat.speed_accepted for _, stat in rows)
+            self.speed_rejected.extend(stat.speed_rejected_total for _, stat in rows)
+            self.algo_slices[algorithm] = (start, len(self.stat_rig))
+    
+    def count(self, status_code: int) -> int:
+        return self.status.count(status_code)
+    
+    def active_count(self) -> int:
+        return self.status.count(STATUS_MINING)
+    
+    def status_counts(self) -> Dict[str, int]:
+        """Cantidad de rigs por estado (solo estados presentes)"""
+        present = set(self.status)
+        return {STATUSES.name(code): self.status.count(code) for code in sorted(present)}
+    
+    def speed_by_algorithm(self) -> Dict[str, Tuple[float, float]]:
+        """Suma de (aceptada, rechazada) por algoritmo"""
+        return {
+            algorithm: (sum(self.speed_accepted[start:end]), sum(self.speed_rejected[start:end]))
+            for algorithm, (start, end) in self.algo_slices.items()
+        }
+
+
+class Fleet:
+    """Snapshot decodificado de get_rigs"""
+    
+    def __init__(self, rigs: List[Rig], total_rigs: int, unpaid_amount: Decimal,
+                 partial: bool = False, groups: Optional[List[Dict]] = None):
+        self.rigs = rigs
+        self.total_rigs = total_rigs
+        self.unpaid_amount = unpaid_amount
+        self.partial = partial
+        self.groups = groups or []
+        self._columns = None
+    
+    @classmethod
+    def from_api(cls, payload: Dict) -> 'Fleet':
+        """
+        Decodifica la respuesta de NiceHashClient.get_rigs
+        
+        Args:
+            payload: Diccionario con miningRigs, totalRigs, unpaidAmount...
+        """
+        rigs = [Rig.from_api(rig) for rig in payload.get('miningRigs') or ()]
+        return cls(
+            rigs,
+            int(payload.get('totalRigs') or len(rigs)),
+            to_decimal(payload.get('unpaidAmount')),
+            bool(payload.get('partial')),
+            payload.get('miningRigGroups'),
+        )
+    
+    def __len__(self) -> int:
+        return len(self.rigs)
+    
+    def __iter__(self):
+        return iter(self.rigs)
+    
+    @property
+    def columns(self) -> FleetColumns:
+        """Vista en columnas (se construye una vez, al primer uso)"""
+        if self._columns is None:
+            self._columns = FleetColumns(self.rigs)
+        return self._columns
+
+
+@dataclass
+class AlgoTotals:
+    """Una entrada de /mining/algo/stats (claves cortas a, sa, sr, up)"""
+    
+    __slots__ = ('algorithm', 'speed_accepted', 'speed_rejected', 'unpaid_amount')
+    
+    algorithm: str
+    speed_accepted: float
+    speed_rejected: float
+    unpaid_amount: Decimal
+    
+    @classmethod
+    def from_api(cls, data: Dict) -> 'AlgoTotals':
+        algorithm = data.get('a') or 'N/A'
+        if isinstance(algorithm, dict):
+            algorithm = algorithm.get('enumName') or 'N/A'
+        return cls(
+            sys.intern(str(algorithm)),
+            to_float(data.get('sa')),
+            to_float(data.get('sr')),
+            to_decimal(data.get('up')),
+        )
+    
+    @property
+    def rejection_rate(self) -> float:
+        """Porcentaje de rechazo sobre el total enviado"""
+        total = self.speed_accepted + self.speed_rejected
+        return self.speed_rejected / total * 100 if total > 0 else 0.0
+
+
+def decode_algo_stats(payload: Dict) -> List[AlgoTotals]:
+    """
+    Decodifica la respuesta de get_algo_stats ('algos' con claves cortas)
+    o la forma {'algorithms': {nombre: {speedAccepted, speedRejected, unpaid}}}
+    """
+    if 'algorithms' in payload:
+        return [
+            AlgoTotals(
+                sys.intern(name),
+                to_float(algo.get('speedAccepted')),
+                to_float(algo.get('speedRejected')),
+                to_decimal(algo.get('unpaid')),
+            )
+            for name, algo in (payload.get('algorithms') or {}).items()
+        ]
+    algos = payload.get('algos') or ()
+    if isinstance(algos, dict):
+        algos = algos.values()
+    return [AlgoTotals.from_api(algo) for algo in algos]
@@ -0,0 +1,405 @@
+"""
+Demonio asyncio del monitor de rigs
+Sustituye el bucle check_rigs() + time.sleep(60) por un planificador de
+ritmo fijo: las verificaciones no acumulan deriva, el reporte de estado
+reutiliza el snapshot de la verificación y los mensajes de Telegram salen
+por la cola de TelegramNotifier sin bloquear el ciclo
+"""
+import asyncio
+import functools
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from async_nicehash_client import AsyncNiceHashClient
+from telegram_bot import RigMonitor, get_paraguay_time
+import metrics
+import config
+
+# Intervalo del sondeo que mide el retraso del event loop (segundos)
+LAG_PROBE_INTERVAL = 0.5
+
+# Tiempo máximo para vaciar la cola de Telegram al detener el demonio (segundos)
+DRAIN_TIMEOUT = 15
+
+
+class FixedRateSchedule:
+    """
+    Planificador de ritmo fijo
+
+    El tick n vence en start + n * interval, independientemente de lo que haya
+    tardado el tick anterior. Si un tick se pasa de su intervalo, los ticks
+    vencidos mientras tanto se saltan (y se cuentan) en lugar de ejecutarse
+    en ráfaga.
+    """
+
+    def __init__(self, interval: float, start: float):
+        """
+        Args:
+            interval: Segundos entre ticks
+            start: Instante (reloj monotónico) del tick 0
+        """
+        self.interval = interval
+        self.start = start
+        self.index = 0
+        self.skipped = 0
+
+    @property
+    def deadline(self) -> float:
+        """Instante en que vence el próximo tick"""
+        return self.start + self.index * self.interval
+
+    def due(self, now: float) -> bool:
+        """Indica si el próximo tick ya venció"""
+        return now >= self.deadline
+
+    def advance(self, now: float) -> int:
+        """
+        Pasa al siguiente tick que aún no venció
+
+        Args:
+            now: Instante actual (reloj monotónico)
+
+        Returns:
+            Número de ticks saltados
+        """
+        next_index = max(self.index + 1, int((now - self.start) // self.interval) + 1)
+        skipped = next_index - self.index - 1
+        self.index = next_index
+        self.skipped += skipped
+        return skipped
+
+
+class TickStats:
+    """Duración de los ticks de una tarea periódica"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        self.max = max(self.max, duration)
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class MonitorDaemon:
+    """
+    Monitor de rigs de ejecución continua
+
+    Cada tick descarga los rigs una sola vez (páginas en paralelo) y el mismo
+    snapshot alimenta check_rigs() y, cuando toca, send_status_report(). El
+    reporte diario se envía a la hora local configurada, así que el demonio
+    reemplaza también a los workflows horario y diario de GitHub Actions.
+    Los mensajes se encolan en TelegramNotifier, cuyo hilo de envío los
+    entrega sin frenar las verificaciones.
+    """
+
+    def __init__(self, monitor: RigMonitor, check_interval: Optional[float] = None,
+                 report_interval: Optional[float] = None, daily_report_time: Optional[str] = None):
+        """
+        Inicializa el demonio
+
+        Args:
+            monitor: Monitor de rigs ya inicializado
+            check_interval: Segundos entre verificaciones (por defecto config.MONITOR_CHECK_INTERVAL)
+            report_interval: Segundos entre reportes de estado (por defecto config.MONITOR_REPORT_INTERVAL)
+            daily_report_time: Hora local "HH:MM" del reporte diario, o "" para desactivarlo
+        """
+        self.monitor = monitor
+        self.check_interval = check_interval or config.MONITOR_CHECK_INTERVAL
+        self.report_interval = report_interval or config.MONITOR_REPORT_INTERVAL
+        if daily_report_time is None:
+            daily_report_time = config.MONITOR_DAILY_REPORT_TIME
+        self.daily_report_time = daily_report_time
+
+        self.check_stats = TickStats()
+        self.report_stats = TickStats()
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.lag_samples = 0
+        self.fetch_errors = 0
+
+        self._checks: Optional[FixedRateSchedule] = None
+        self._reports: Optional[FixedRateSchedule] = None
+        self._next_daily: Optional[datetime] = None
+        self._stop: Optional[asyncio.Event] = None
+        # Un solo hilo para RigMonitor: el estado y los ficheros nunca se tocan en paralelo
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='monitor')
+
+    def stop(self):
+        """Pide al demonio que termine al acabar el tick en curso"""
+        if self._stop is not None:
+            self._stop.set()
+
+    def metrics(self) -> Dict:
+        """
+        Métricas del planificador
+
+        Returns:
+            Diccionario con ticks, ticks saltados, duración de tick, retraso del
+            event loop y estado de la cola de Telegram
+        """
+        notifier_stats = getattr(self.monitor.notifier, 'stats', None)
+        delivery = notifier_stats() if notifier_stats else {}
+        return {
+            'ticks': self.check_stats.count,
+            'skipped_ticks': self._checks.skipped if self._checks else 0,
+            'tick_last': self.check_stats.last,
+            'tick_avg': self.check_stats.avg,
+            'tick_max': self.check_stats.max,
+            'reports': self.report_stats.count,
+            'skipped_reports': self._reports.skipped if self._reports else 0,
+            'fetch_errors': self.fetch_errors,
+            'loop_lag_last': self.lag_last,
+            'loop_lag_avg': self.lag_total / self.lag_samples if self.lag_samples else 0.0,
+            'loop_lag_max': self.lag_max,
+            'queue_depth': delivery.get('queue_depth', 0),
+            'messages_sent': delivery.get('sent', 0),
+            'messages_failed': delivery.get('failed', 0),
+            'delivery_latency_max': delivery.get('latency_max', 0.0),
+        }
+
+    def summary(self) -> str:
+        """Resumen de una línea de las métricas"""
+        m = self.metrics()
+        return (f"{m['ticks']} ticks ({m['skipped_ticks']} saltados), "
+                f"tick {m['tick_last']:.2f}s (prom {m['tick_avg']:.2f}s, máx {m['tick_max']:.2f}s), "
+                f"lag del loop máx {m['loop_lag_max'] * 1000:.0f} ms, "
+                f"cola Telegram {m['queue_depth']} ({m['messages_sent']} enviados, "
+                f"{m['messages_failed']} fallidos)")
+
+    async def _call(self, func, *args, **kwargs):
+        """Ejecuta un método bloqueante de RigMonitor en su hilo dedicado"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def _compute_next_daily(self) -> Optional[datetime]:
+        """Próximo instante (hora de Paraguay) en que toca el reporte diario"""
+        if not self.daily_report_time:
+            return None
+        hour, minute = (int(part) for part in self.daily_report_time.split(':'))
+        now = get_paraguay_time()
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target
+
+    async def _probe_loop_lag(self):
+        """Mide cuánto se retrasa el event loop respecto a un sleep esperado"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lag_total += lag
+            self.lag_samples += 1
+
+    async def _wait_until(self, deadline: float) -> bool:
+        """
+        Duerme hasta el instante indicado o hasta que se pida detener
+
+        Returns:
+            True si se pidió detener el demonio
+        """
+        loop = asyncio.get_running_loop()
+        timeout = deadline - loop.time()
+        if timeout > 0:
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._stop.is_set()
+
+    async def _tick(self, api: AsyncNiceHashClient):
+        """Un ciclo: snapshot compartido → verificación → reporte y resumen diario si tocan"""
+        loop = asyncio.get_running_loop()
+
+        try:
+            rigs_data = await api.get_rigs()
+        except Exception as e:
+            self.fetch_errors += 1
+            await self._call(self.monitor.send_error, e)
+            rigs_data = None
+
+        if rigs_data is not None:
+            await self._call(self.monitor.check_rigs, rigs_data, send_report=False)
+
+            if self._reports.due(loop.time()):
+                started = loop.time()
+                await self._call(self.monitor.send_status_report, rigs_data)
+                self.report_stats.add(loop.time() - started)
+                self._reports.advance(loop.time())
+                print(f"⏱️  Demonio: {self.summary()}")
+                print(f"⏱️  API: {self.monitor.client.request_stats.summary()}")
+
+        if self._next_daily is not None and get_paraguay_time() >= self._next_daily:
+            await self._call(self.monitor.send_daily_report)
+            self._next_daily = self._compute_next_daily()
+
+    async def run(self, handle_signals: bool = True):
+        """
+        Ejecuta el demonio hasta recibir SIGINT/SIGTERM o stop()
+        
+        Args:
+            handle_signals: Si es False, las señales las gestiona quien lanza el demonio
+        """
+        loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        if handle_signals:
+            _install_signal_handlers(loop, self.stop)
+
+        notifier = self.monitor.notifier
+        lag_probe = asyncio.ensure_future(self._probe_loop_lag())
+        metrics.registry.register_collector('nicehash_daemon', self.metrics,
+                                            account=self.monitor.account_name)
+        api = AsyncNiceHashClient(self.monitor.client, close_client=False)
+
+        start = loop.time()
+        self._checks = FixedRateSchedule(self.check_interval, start)
+        self._reports = FixedRateSchedule(self.report_interval, start)
+        self._reports.index = 1  # el primer reporte llega tras un intervalo completo
+        self._next_daily = self._compute_next_daily()
+
+        start_message = "🤖 <b>Monitor de Rigs Iniciado</b>\n\n"
+        start_message += f"✅ El bot está activo y monitoreando tus rigs\n"
+        start_message += f"🕐 Inicio: {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}"
+        notifier.send_message(start_message)
+
+        print(f"⏱️  Intervalo de verificación: {self.check_interval:g} segundos")
+        print(f"📊 Reporte automático cada: {self.report_interval / 60:g} minutos")
+        if self._next_daily is not None:
+            print(f"📅 Reporte diario: {self.daily_report_time} (hora de Paraguay)")
+        print("\n🔄 Iniciando monitoreo... (Presiona Ctrl+C para detener)\n")
+        print("=" * 60)
+
+        try:
+            while not await self._wait_until(self._checks.deadline):
+                started = loop.time()
+                await self._tick(api)
+                self.check_stats.add(loop.time() - started)
+                skipped = self._checks.advance(loop.time())
+                if skipped:
+                    print(f"⚠️  El tick tardó {self.check_stats.last:.1f}s: "
+                          f"{skipped} verificación(es) saltada(s)")
+        finally:
+            print("\n\n⏹️  Deteniendo monitor...")
+            stop_message = "⏹️ <b>Monitor de Rigs Detenido</b>\n\n"
+            stop_message += f"🕐 Fin: {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}"
+            notifier.send_message(stop_message)
+            flush = getattr(notifier, 'flush', None)
+            if flush is not None and not await loop.run_in_executor(None, flush, DRAIN_TIMEOUT):
+                print(f"⚠️  {self.metrics()['queue_depth']} mensaje(s) de Telegram sin enviar")
+
+            lag_probe.cancel()
+            await asyncio.gather(lag_probe, return_exceptions=True)
+            await api.close()
+            self._executor.shutdown(wait=True)
+            if handle_signals:
+                _remove_signal_handlers(loop)
+            print(f"⏱️  Demonio: {self.summary()}")
+
+
+def _install_signal_handlers(loop: asyncio.AbstractEventLoop, callback):
+    """SIGINT/SIGTERM detienen el demonio de forma ordenada (si la plataforma lo permite)"""
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, callback)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C llega como KeyboardInterrupt y cancela run()
+            pass
+
+
+def _remove_signal_handlers(loop: asyncio.AbstractEventLoop):
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.remove_signal_handler(sig)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+
+async def _run_all(daemons: List[MonitorDaemon], on_report=None):
+    """Ejecuta varios demonios en el mismo event loop con una única gestión de señales"""
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+
+    def stop_all():
+        stopping.set()
+        for daemon in daemons:
+            daemon.stop()
+
+    _install_signal_handlers(loop, stop_all)
+    metrics_server = metrics.start_http_server()
+    tasks = [asyncio.ensure_future(daemon.run(handle_signals=False)) for daemon in daemons]
+
+    async def report_periodically():
+        schedule = FixedRateSchedule(daemons[0].report_interval, loop.time())
+        schedule.index = 1
+        while True:
+            timeout = schedule.deadline - loop.time()
+            try:
+                await asyncio.wait_for(stopping.wait(), max(0.0, timeout))
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await loop.run_in_executor(None, on_report)
+            except Exception as e:
+                print(f"⚠️  Error en el reporte agregado: {e}")
+            schedule.advance(loop.time())
+
+    reporter = asyncio.ensure_future(report_periodically()) if on_report else None
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        stop_all()
+        if reporter is not None:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        _remove_signal_handlers(loop)
+
+
+def run_daemons(monitors: List[RigMonitor], on_report=None, **kwargs) -> List[MonitorDaemon]:
+    """
+    Ejecuta un MonitorDaemon por monitor, todos en el mismo event loop
+
+    Args:
+        monitors: Monitores ya inicializados (por ejemplo, uno por cuenta)
+        on_report: Función opcional que se llama en cada intervalo de reporte
+            (por ejemplo, el reporte agregado de todas las cuentas)
+        **kwargs: Parámetros de MonitorDaemon (intervalos, hora del reporte diario)
+
+    Returns:
+        Los demonios ejecutados (con sus métricas)
+    """
+    daemons = [MonitorDaemon(monitor, **kwargs) for monitor in monitors]
+    try:
+        asyncio.run(_run_all(daemons, on_report))
+    except KeyboardInterrupt:
+        # Plataformas sin add_signal_handler: run() ya hizo la parada ordenada
+        pass
+    return daemons
+
+
+def run_daemon(monitor: RigMonitor, **kwargs) -> MonitorDaemon:
+    """
+    Ejecuta MonitorDaemon en un event loop nuevo
+
+    Args:
+        monitor: Monitor de rigs ya inicializado
+        **kwargs: Parámetros de MonitorDaemon (intervalos, hora del reporte diario)
+    """
+    return run_daemons([monitor], **kwargs)[0]
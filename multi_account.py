@@ -0,0 +1,314 @@
+"""
+Monitor de varias cuentas / organizaciones de NiceHash en un solo proceso
+Lee la lista de cuentas de un archivo JSON y las verifica en paralelo
+compartiendo un único pool de conexiones y un único limitador de peticiones;
+el estado y las estadísticas de cada cuenta se guardan por separado
+"""
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from nicehash_client import NiceHashClient
+from rate_limiter import AdaptiveRateLimiter, RequestStats
+from telegram_bot import RigMonitor, TelegramNotifier, get_paraguay_time
+import config
+
+# Prefijo para tomar un valor del entorno en lugar de escribirlo en el archivo
+ENV_PREFIX = 'env:'
+
+
+@dataclass
+class AccountConfig:
+    """Credenciales, chat de Telegram y directorio de datos de una cuenta"""
+    name: str
+    api_key: str
+    api_secret: str
+    org_id: str
+    telegram_chat_id: str
+    telegram_bot_token: str
+    data_dir: str
+    api_url: Optional[str] = None
+
+    @property
+    def credentials(self) -> Dict[str, str]:
+        return {
+            'api_key': self.api_key,
+            'api_secret': self.api_secret,
+            'org_id': self.org_id,
+            'api_url': self.api_url,
+        }
+
+
+def _resolve(value, field: str, account: str) -> Optional[str]:
+    """Sustituye las referencias "env:VARIABLE" por el valor de la variable de entorno"""
+    if isinstance(value, str) and value.startswith(ENV_PREFIX):
+        name = value[len(ENV_PREFIX):]
+        value = os.getenv(name)
+        if not value:
+            raise ValueError(f"La variable de entorno {name} ({account}.{field}) no está configurada")
+    return value
+
+
+def _slug(name: str) -> str:
+    """Nombre de cuenta apto para usar como nombre de directorio"""
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', name).strip('_').lower() or 'cuenta'
+
+
+def load_accounts(path: str) -> Dict:
+    """
+    Lee el archivo de cuentas
+
+    Formato (ver accounts.example.json):
+        {
+          "aggregate_chat_id": "env:TELEGRAM_CHAT_ID",
+          "accounts": [
+            {"name": "Granja A", "api_key": "env:NH_A_KEY", "api_secret": "env:NH_A_SECRET",
+             "org_id": "env:NH_A_ORG", "telegram_chat_id": "123456"}
+          ]
+        }
+
+    Cualquier valor puede ser "env:VARIABLE" para leerlo del entorno (así los
+    secretos quedan en el .env o en los secrets de GitHub). telegram_bot_token
+    es opcional (por defecto TELEGRAM_BOT_TOKEN) y data_dir también (por
+    defecto accounts/<nombre>).
+
+    Args:
+        path: Ruta del archivo JSON
+
+    Returns:
+        Diccionario con 'accounts' (lista de AccountConfig) y 'aggregate_chat_id'
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    accounts = []
+    seen = set()
+    for entry in raw.get('accounts', []):
+        name = entry.get('name')
+        if not name:
+            raise ValueError(f"Hay una cuenta sin 'name' en {path}")
+        if name in seen:
+            raise ValueError(f"La cuenta '{name}' está repetida en {path}")
+        seen.add(name)
+
+        values = {field: _resolve(entry.get(field), field, name) for field in (
+            'api_key', 'api_secret', 'org_id', 'api_url', 'telegram_chat_id', 'telegram_bot_token'
+        )}
+        for field in ('api_key', 'api_secret', 'org_id', 'telegram_chat_id'):
+            if not values[field]:
+                raise ValueError(f"Falta '{field}' en la cuenta '{name}'")
+
+        accounts.append(AccountConfig(
+            name=name,
+            api_key=values['api_key'],
+            api_secret=values['api_secret'],
+            org_id=values['org_id'],
+            api_url=values['api_url'],
+            telegram_chat_id=str(values['telegram_chat_id']),
+            telegram_bot_token=values['telegram_bot_token'] or config.TELEGRAM_BOT_TOKEN,
+            data_dir=entry.get('data_dir') or os.path.join(config.ACCOUNTS_DATA_DIR, _slug(name)),
+        ))
+
+    if not accounts:
+        raise ValueError(f"No hay cuentas configuradas en {path}")
+
+    return {
+        'accounts': accounts,
+        'aggregate_chat_id': _resolve(raw.get('aggregate_chat_id'), 'aggregate_chat_id', 'global'),
+    }
+
+
+class MultiAccountMonitor:
+    """
+    Un RigMonitor por cuenta, con sesión HTTP y limitador de peticiones comunes
+
+    Las verificaciones de todas las cuentas corren en paralelo (un hilo por
+    cuenta; las páginas de cada cuenta además se piden en paralelo), pero el
+    total de conexiones y de peticiones por segundo hacia la API lo acotan el
+    pool y el limitador compartidos.
+    """
+
+    def __init__(self, accounts: List[AccountConfig], aggregate_chat_id: Optional[str] = None,
+                 check_once: bool = False):
+        """
+        Inicializa los monitores de todas las cuentas
+
+        Args:
+            accounts: Cuentas leídas con load_accounts()
+            aggregate_chat_id: Chat donde enviar los totales de todas las cuentas (opcional)
+            check_once: Una sola verificación por proceso (ver RigMonitor)
+        """
+        self.session = NiceHashClient._create_session(config.HTTP_POOL_SIZE)
+        self.rate_limiter = AdaptiveRateLimiter(config.API_RATE_LIMIT, config.API_RATE_BURST)
+        self.monitors: Dict[str, RigMonitor] = {}
+
+        for account in accounts:
+            print(f"\n🏷️  Cuenta: {account.name} ({account.data_dir})")
+            client = NiceHashClient(
+                rate_limiter=self.rate_limiter,
+                credentials=account.credentials,
+                session=self.session
+            )
+            outbox_file = ""
+            if config.TELEGRAM_OUTBOX_FILE:
+                outbox_file = os.path.join(account.data_dir, config.TELEGRAM_OUTBOX_FILE)
+            notifier = TelegramNotifier(account.telegram_bot_token, account.telegram_chat_id, outbox_file)
+            self.monitors[account.name] = RigMonitor(notifier, client, account.name, account.data_dir,
+                                                      check_once=check_once)
+
+        self.aggregate_notifier = None
+        if aggregate_chat_id:
+            self.aggregate_notifier = TelegramNotifier(config.TELEGRAM_BOT_TOKEN, aggregate_chat_id)
+
+    def _for_each(self, method: str, *args, **kwargs):
+        """Llama al mismo método de RigMonitor en todas las cuentas a la vez"""
+        def call(monitor):
+            try:
+                getattr(monitor, method)(*args, **kwargs)
+            except Exception as e:
+                print(f"❌ [{monitor.account_name}] Error en {method}: {e}")
+
+        with ThreadPoolExecutor(max_workers=len(self.monitors), thread_name_prefix='account') as pool:
+            list(pool.map(call, self.monitors.values()))
+
+    def check_all(self, send_report: bool = True):
+        """Verifica todas las cuentas en paralelo y envía el reporte agregado"""
+        self._for_each('check_rigs', send_report=send_report)
+        if send_report:
+            self.send_aggregate_report()
+
+    def send_status_reports(self):
+        """Envía el reporte de estado de cada cuenta y el agregado"""
+        self._for_each('send_status_report')
+        self.send_aggregate_report()
+
+    def send_daily_reports(self):
+        """Envía el resumen diario de cada cuenta y el agregado del día anterior"""
+        self._for_each('send_daily_report')
+        self.send_aggregate_daily_report()
+
+    def aggregate_totals(self) -> Dict:
+        """
+        Totales de rigs de todas las cuentas según su última verificación
+
+        Returns:
+            Diccionario con total, active, offline, el número de cuentas con
+            datos y el detalle (total, activos, offline) por cuenta
+        """
+        by_account = {
+            name: monitor.last_counts
+            for name, monitor in self.monitors.items()
+            if monitor.last_counts is not None
+        }
+        return {
+            'accounts': len(self.monitors),
+            'reporting': len(by_account),
+            'total': sum(counts[0] for counts in by_account.values()),
+            'active': sum(counts[1] for counts in by_account.values()),
+            'offline': sum(counts[2] for counts in by_account.values()),
+            'by_account': by_account,
+        }
+
+    def aggregate_message(self) -> str:
+        """Mensaje de Telegram con los totales de todas las cuentas"""
+        totals = self.aggregate_totals()
+        message = f"🌐 <b>Reporte Global - {totals['reporting']}/{totals['accounts']} cuentas</b>\n\n"
+        message += f"🕐 <b>Hora:</b> {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+        message += f"📈 <b>Total de Rigs:</b> {totals['total']}\n"
+        message += f"✅ <b>Activos:</b> {totals['active']}\n"
+        message += f"❌ <b>Offline:</b> {totals['offline']}\n\n"
+        for name, (total, active, offline) in sorted(totals['by_account'].items()):
+            message += f"• {name}: {active}/{total} activos\n"
+        missing = sorted(set(self.monitors) - set(totals['by_account']))
+        for name in missing:
+            message += f"• {name}: sin datos\n"
+        return message
+
+    def send_aggregate_report(self):
+        """Imprime los totales globales y, si hay chat configurado, los envía a Telegram"""
+        totals = self.aggregate_totals()
+        print(f"\n🌐 Global: {totals['total']} rigs, {totals['active']} activos, "
+              f"{totals['offline']} offline ({totals['reporting']}/{totals['accounts']} cuentas)")
+        if self.aggregate_notifier is not None:
+            self.aggregate_notifier.send_message(self.aggregate_message())
+
+    def send_aggregate_daily_report(self):
+        """Suma los promedios del día anterior de todas las cuentas"""
+        yesterday = (get_paraguay_time() - timedelta(days=1)).strftime('%Y-%m-%d')
+        sums = {'total': 0.0, 'active': 0.0, 'offline': 0.0}
+        reporting = 0
+        for monitor in self.monitors.values():
+            try:
+                rollup = monitor.stats_store.daily_rollup(yesterday)
+            except Exception as e:
+                print(f"⚠️  [{monitor.account_name}] Error al leer estadísticas: {e}")
+                continue
+            if not rollup:
+                continue
+            reporting += 1
+            for key in sums:
+                sums[key] += rollup[key]['avg']
+
+        print(f"\n🌐 Global {yesterday}: {sums['total']:.0f} rigs, {sums['active']:.0f} activos "
+              f"(promedio, {reporting}/{len(self.monitors)} cuentas)")
+        if self.aggregate_notifier is not None and reporting:
+            message = f"🌐 <b>Resumen Diario Global - {reporting}/{len(self.monitors)} cuentas</b>\n\n"
+            message += f"📅 <b>Fecha:</b> {yesterday}\n\n"
+            message += f"📈 <b>Promedios del Día:</b>\n"
+            message += f"• Total de Rigs: {sums['total']:.0f}\n"
+            message += f"• Activos: {sums['active']:.0f}\n"
+            message += f"• Offline: {sums['offline']:.0f}"
+            self.aggregate_notifier.send_message(message)
+
+    def request_summary(self) -> str:
+        """Contadores de peticiones a la API sumados entre todas las cuentas"""
+        total = RequestStats()
+        for monitor in self.monitors.values():
+            total.add(**monitor.client.request_stats.as_dict())
+        return total.summary()
+
+    def close(self):
+        """Vacía las colas de Telegram y cierra el pool de conexiones compartido"""
+        notifiers = [monitor.notifier for monitor in self.monitors.values()]
+        if self.aggregate_notifier is not None:
+            notifiers.append(self.aggregate_notifier)
+        for notifier in notifiers:
+            notifier.close()
+        self.session.close()
+
+
+def run(path: str, check_once: bool = False, send_report: bool = False, daily_report: bool = False):
+    """
+    Punto de entrada del modo multi-cuenta (telegram_bot.py --accounts archivo.json)
+
+    Args:
+        path: Archivo de cuentas
+        check_once: Una verificación de todas las cuentas (GitHub Actions)
+        send_report: Solo el reporte de estado de cada cuenta y el global
+        daily_report: Solo el resumen diario de cada cuenta y el global
+    """
+    settings = load_accounts(path)
+    monitor = MultiAccountMonitor(settings['accounts'], settings['aggregate_chat_id'], check_once)
+    print(f"\n✓ {len(monitor.monitors)} cuentas cargadas desde {path}\n")
+
+    try:
+        if daily_report:
+            print("📊 Modo Reporte Diario: Enviando resumen del día\n")
+            monitor.send_daily_reports()
+        elif send_report:
+            print("📊 Modo Reporte: Enviando estado del pool\n")
+            monitor.send_status_reports()
+        elif check_once:
+            print("🔄 Modo GitHub Actions: Verificación única\n")
+            monitor.check_all()
+            print(f"⏱️  API: {monitor.request_summary()}")
+        else:
+            # Modo continuo: un demonio por cuenta en el mismo event loop
+            from monitor_daemon import run_daemons
+            run_daemons(list(monitor.monitors.values()), on_report=monitor.send_aggregate_report)
+    finally:
+        monitor.close()
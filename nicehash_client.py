@@ -7,73 +7,222 @@ import uuid
 import hmac
 import hashlib
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import config
+from rate_limiter import AdaptiveRateLimiter, RetryPolicy, RequestStats, parse_retry_after
+from response_cache import ResponseCache, default_cache
+from rig_stream import RigStream
+import metrics
 
+RIGS_ENDPOINT = '/main/api/v2/mining/rigs'
+RIG_DETAILS_ENDPOINT = '/main/api/v2/mining/rig2/'
 
-class NiceHashClient:
-    def __init__(self):
-        """Inicializa el cliente de NiceHash con las credenciales configuradas"""
-        config.validate_config()
-        self.api_key = config.API_KEY
-        self.api_secret = config.API_SECRET
-        self.org_id = config.ORG_ID
-        self.base_url = config.API_URL
-        
-    def _generate_signature(self, method: str, path: str, query: str = "", body: str = "") -> tuple:
+
+def endpoint_label(endpoint: str) -> str:
+    """
+    Nombre del endpoint para métricas, caché y presupuesto de reintentos
+    
+    Las rutas con el ID del rig se agrupan en una sola etiqueta para no crear
+    una serie de métricas (ni un presupuesto de reintentos) por rig.
+    """
+    if endpoint.startswith(RIG_DETAILS_ENDPOINT):
+        return RIG_DETAILS_ENDPOINT + '{rigId}'
+    return endpoint
+
+
+class RequestSigner:
+    """
+    Contexto de firma precalculado para unas credenciales
+    
+    El HMAC se crea una sola vez con el secreto y se copia en cada firma;
+    los campos fijos del mensaje (api_key y org_id con sus separadores) y los
+    headers que no cambian entre peticiones se arman en el constructor.
+    """
+    
+    def __init__(self, api_key: str, api_secret: str, org_id: str):
+        self._mac = hmac.new(api_secret.encode('latin-1'), digestmod=hashlib.sha256)
+        # Formato: API_KEY\x00timestamp\x00nonce\x00\x00org_id\x00\x00method\x00path\x00query[\x00body]
+        self._prefix = api_key.encode('latin-1') + b'\x00'
+        self._middle = b'\x00\x00' + org_id.encode('latin-1') + b'\x00\x00'
+        self._auth_prefix = f"{api_key}:"
+        self._header_template = {
+            'X-Organization-Id': org_id,
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+        }
+    
+    def sign(self, method: str, path: str, query: str = "", body: str = "",
+             timestamp: Optional[str] = None, nonce: Optional[str] = None) -> Tuple[str, str, str]:
         """
-        Genera la firma HMAC-SHA256 requerida para autenticar requests
+        Firma una petición
         
         Args:
             method: Método HTTP (GET, POST, etc.)
             path: Ruta del endpoint
             query: Query string (sin el ?)
             body: Cuerpo de la petición (si aplica)
+            timestamp: Milisegundos epoch como texto (por defecto el actual)
+            nonce: Nonce (por defecto un uuid4 nuevo)
             
         Returns:
             Tupla con (timestamp, nonce, signature)
         """
-        timestamp = str(int(time.time() * 1000))
-        nonce = str(uuid.uuid4())
-        
-        # Construir el input para la firma según la documentación de NiceHash
-        # Formato: API_KEY\x00timestamp\x00nonce\x00\x00org_id\x00\x00method\x00path\x00query\x00body
-        message = self.api_key.encode('latin-1')
-        message += b'\x00' + timestamp.encode('latin-1')
-        message += b'\x00' + nonce.encode('latin-1')
-        message += b'\x00'  # Empty field
-        message += b'\x00' + self.org_id.encode('latin-1')
-        message += b'\x00'  # Empty field
-        message += b'\x00' + method.encode('latin-1')
-        message += b'\x00' + path.encode('latin-1')
-        message += b'\x00' + query.encode('latin-1')
+        if timestamp is None:
+            timestamp = str(int(time.time() * 1000))
+        if nonce is None:
+            nonce = str(uuid.uuid4())
         
+        parts = [
+            self._prefix, timestamp.encode('latin-1'), b'\x00', nonce.encode('latin-1'), self._middle,
+            method.encode('latin-1'), b'\x00', path.encode('latin-1'), b'\x00', query.encode('latin-1'),
+        ]
         if body:
-            message += b'\x00' + body.encode('utf-8')
+            parts.append(b'\x00')
+            parts.append(body.encode('utf-8'))
+        
+        mac = self._mac.copy()
+        mac.update(b''.join(parts))
+        return timestamp, nonce, mac.hexdigest()
+    
+    def headers(self, method: str, path: str, query: str = "", body: str = "") -> Dict[str, str]:
+        """
+        Headers autenticados de una petición a partir de la plantilla
+        
+        El nonce (uuid4) se usa también como X-Request-Id.
+        
+        Returns:
+            Diccionario nuevo, que el llamador puede ampliar
+        """
+        timestamp, nonce, signature = self.sign(method, path, query, body)
+        headers = self._header_template.copy()
+        headers['X-Time'] = timestamp
+        headers['X-Nonce'] = nonce
+        headers['X-Request-Id'] = nonce
+        headers['X-Auth'] = self._auth_prefix + signature
+        return headers
+
+
+class NiceHashClient:
+    def __init__(self, pool_size: Optional[int] = None, timeout: Optional[Tuple[float, float]] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 credentials: Optional[Dict[str, str]] = None,
+                 session: Optional[requests.Session] = None):
+        """
+        Inicializa el cliente de NiceHash con las credenciales configuradas
+        
+        Args:
+            pool_size: Conexiones keep-alive máximas hacia la API (por defecto config.HTTP_POOL_SIZE)
+            timeout: Tupla (connect, read) en segundos (por defecto los valores de config)
+            rate_limiter: Limitador compartido (por defecto uno propio con los valores de config)
+            cache: Caché de respuestas (por defecto la caché compartida del proceso, ver config)
+            credentials: Diccionario con api_key, api_secret, org_id y opcionalmente api_url
+                (por defecto las credenciales del .env)
+            session: Sesión HTTP compartida con otros clientes (close() no la cierra)
+        """
+        if credentials is None:
+            config.validate_config()
+            credentials = {
+                'api_key': config.API_KEY,
+                'api_secret': config.API_SECRET,
+                'org_id': config.ORG_ID,
+            }
+        else:
+            for key in ('api_key', 'api_secret', 'org_id'):
+                if not credentials.get(key):
+                    raise ValueError(f"Falta '{key}' en las credenciales de la cuenta")
+        self.api_key = credentials['api_key']
+        self.api_secret = credentials['api_secret']
+        self.org_id = credentials['org_id']
+        self.signer = RequestSigner(self.api_key, self.api_secret, self.org_id)
+        self.base_url = credentials.get('api_url') or config.API_URL
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.timeout = timeout or (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
+        self._owns_session = session is None
+        self.session = session if session is not None else self._create_session(self.pool_size)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(config.API_RATE_LIMIT, config.API_RATE_BURST)
+        self.retry_policy = RetryPolicy(
+            config.API_MAX_RETRIES,
+            config.API_BACKOFF_BASE,
+            config.API_BACKOFF_MAX,
+            config.API_RETRY_BUDGET_RATIO
+        )
+        self.request_stats = RequestStats()
+        self.cache = cache if cache is not None else default_cache()
+    
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        """
+        Crea una sesión HTTP con pool de conexiones keep-alive
+        
+        Reutilizar la sesión evita un handshake TCP+TLS por cada petición
+        (por ejemplo, por cada página de get_rigs).
+        
+        Args:
+            pool_size: Número máximo de conexiones abiertas por host
+            
+        Returns:
+            Sesión de requests configurada
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def close(self):
+        """Cierra la sesión HTTP y libera las conexiones del pool (si no es compartida)"""
+        if self._owns_session:
+            self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
         
-        # Generar firma HMAC-SHA256
-        signature = hmac.new(
-            self.api_secret.encode('latin-1'),
-            message,
-            hashlib.sha256
-        ).hexdigest()
+    def _generate_signature(self, method: str, path: str, query: str = "", body: str = "") -> tuple:
+        """
+        Genera la firma HMAC-SHA256 requerida para autenticar requests
         
-        return timestamp, nonce, signature
+        Args:
+            method: Método HTTP (GET, POST, etc.)
+            path: Ruta del endpoint
+            query: Query string (sin el ?)
+            body: Cuerpo de la petición (si aplica)
+            
+        Returns:
+            Tupla con (timestamp, nonce, signature)
+        """
+        return self.signer.sign(method, path, query, body)
     
-    def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None) -> Dict:
+    def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                      stream: bool = False):
         """
         Realiza una petición autenticada a la API de NiceHash
         
+        Cada intento pasa por el limitador compartido. Las peticiones GET
+        (idempotentes) se reintentan con backoff exponencial ante errores de
+        conexión, 429 y 5xx, mientras quede presupuesto para el endpoint.
+        
+        Los GET de endpoints con TTL en la caché se sirven desde ella mientras
+        estén vigentes; al vencer se revalidan con ETag/Last-Modified si el
+        servidor los envió.
+        
         Args:
             method: Método HTTP
             endpoint: Endpoint de la API
             params: Parámetros de la petición
+            stream: Si es True devuelve la respuesta sin leer el cuerpo (sin caché)
             
         Returns:
-            Respuesta JSON de la API
+            Respuesta JSON de la API, o el objeto Response si stream es True
         """
         url = f"{self.base_url}{endpoint}"
+        label = endpoint_label(endpoint)
         
         # Construir query string si hay parámetros
         query_string = ""
@@ -81,51 +230,147 @@ class NiceHashClient:
             query_parts = [f"{k}={v}" for k, v in sorted(params.items())]
             query_string = "&".join(query_parts)
         
-        # Generar firma
-        timestamp, nonce, signature = self._generate_signature(
-            method, 
-            endpoint, 
-            query_string
-        )
+        # Consultar la caché de respuestas
+        cache_key = None
+        conditional_headers = {}
+        if method == 'GET' and not stream and self.cache is not None and self.cache.is_cacheable(label):
+            cache_key = f"{self.org_id}:{endpoint}?{query_string}"
+            cached = self.cache.lookup(cache_key)
+            if metrics.enabled:
+                result = 'miss' if cached is None else ('hit' if cached['fresh'] else 'stale')
+                metrics.API_CACHE.inc(endpoint=label, result=result)
+            if cached is not None:
+                if cached['fresh']:
+                    return cached['data']
+                if cached.get('etag'):
+                    conditional_headers['If-None-Match'] = cached['etag']
+                if cached.get('last_modified'):
+                    conditional_headers['If-Modified-Since'] = cached['last_modified']
         
-        # Preparar headers
-        headers = {
-            'X-Time': timestamp,
-            'X-Nonce': nonce,
-            'X-Organization-Id': self.org_id,
-            'X-Request-Id': str(uuid.uuid4()),
-            'X-Auth': f"{self.api_key}:{signature}",
-            'Content-Type': 'application/json',
-            'Accept': 'application/json'
-        }
+        idempotent = method == 'GET'
+        self.retry_policy.record_request(label)
+        attempt = 0
         
-        # Realizar petición
-        try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers, params=params)
-            else:
-                response = requests.request(method, url, headers=headers, params=params)
+        while True:
+            throttled = self.rate_limiter.acquire()
+            self.request_stats.add(throttled_seconds=throttled)
+            if metrics.enabled and throttled:
+                metrics.API_THROTTLED.inc(throttled, endpoint=label, reason='rate_limit')
+            
+            # Firmar (timestamp y nonce nuevos en cada intento) sobre la plantilla de headers
+            with metrics.timer(metrics.API_SIGN):
+                headers = self.signer.headers(method, endpoint, query_string)
+            if conditional_headers:
+                headers.update(conditional_headers)
             
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error en la petición: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"Respuesta del servidor: {e.response.text}")
-            raise
+            # Realizar petición (reutiliza las conexiones del pool)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=params,
+                    timeout=self.timeout,
+                    stream=stream
+                )
+                elapsed = time.perf_counter() - started
+                self.request_stats.add(requests=1, wire_seconds=elapsed)
+                if metrics.enabled:
+                    metrics.API_LATENCY.observe(elapsed, endpoint=label, status=str(response.status_code))
+                    size = response.headers.get('Content-Length') if stream else len(response.content)
+                    if size:
+                        metrics.API_BYTES.inc(int(size), endpoint=label)
+                
+                retry_after = None
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    self.rate_limiter.on_rate_limited(retry_after)
+                    self.request_stats.add(rate_limited=1)
+                elif response.status_code >= 500:
+                    self.request_stats.add(server_errors=1)
+                
+                if (response.status_code in RetryPolicy.RETRY_STATUS and idempotent
+                        and self.retry_policy.try_retry(label, attempt)):
+                    response.close()
+                    self._wait_before_retry(label, attempt, f"HTTP {response.status_code}", retry_after)
+                    attempt += 1
+                    continue
+                
+                if response.status_code == 304 and conditional_headers:
+                    self.rate_limiter.on_success()
+                    self.cache.mark_revalidated(cache_key)
+                    if metrics.enabled:
+                        metrics.API_CACHE.inc(endpoint=label, result='revalidated')
+                    return cached['data']
+                
+                response.raise_for_status()
+                self.rate_limiter.on_success()
+                if stream:
+                    return response
+                with metrics.timer(metrics.API_DECODE, endpoint=label):
+                    data = response.json()
+                
+                if cache_key is not None:
+                    self.cache.store(
+                        cache_key,
+                        label,
+                        data,
+                        response.headers.get('ETag'),
+                        response.headers.get('Last-Modified')
+                    )
+                return data
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                elapsed = time.perf_counter() - started
+                self.request_stats.add(requests=1, wire_seconds=elapsed)
+                if metrics.enabled:
+                    metrics.API_LATENCY.observe(elapsed, endpoint=label, status=type(e).__name__)
+                if idempotent and self.retry_policy.try_retry(label, attempt):
+                    self._wait_before_retry(label, attempt, type(e).__name__)
+                    attempt += 1
+                    continue
+                print(f"Error en la petición: {e}")
+                raise
+            except requests.exceptions.RequestException as e:
+                print(f"Error en la petición: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    print(f"Respuesta del servidor: {e.response.text}")
+                raise
     
-    def get_rigs(self, get_all_pages: bool = True) -> Dict:
+    def _wait_before_retry(self, endpoint: str, attempt: int, reason: str,
+                           retry_after: Optional[float] = None):
+        """Duerme el backoff (o Retry-After si es mayor) antes de reintentar"""
+        delay = max(retry_after or 0.0, self.retry_policy.backoff(attempt))
+        print(f"🔁 {endpoint}: {reason}, reintento {attempt + 1} en {delay:.1f}s")
+        self.request_stats.add(retries=1, throttled_seconds=delay)
+        if metrics.enabled:
+            metrics.API_RETRIES.inc(endpoint=endpoint, reason=reason)
+            metrics.API_THROTTLED.inc(delay, endpoint=endpoint, reason='backoff')
+        time.sleep(delay)
+    
+    def get_rigs(self, get_all_pages: bool = True, page_size: Optional[int] = None,
+                 max_workers: Optional[int] = None, allow_partial: bool = True) -> Dict:
         """
         Obtiene información de todos los rigs (mineros)
         
+        La primera página indica el total de páginas; el resto se descarga en
+        paralelo con un número acotado de hilos y se une en orden de página.
+        
         Args:
             get_all_pages: Si es True, obtiene todos los rigs de todas las páginas
+            page_size: Rigs por página (por defecto config.RIGS_PAGE_SIZE)
+            max_workers: Páginas descargadas en paralelo (por defecto config.RIGS_PAGE_WORKERS)
+            allow_partial: Si una página falla tras sus reintentos, devuelve el resto
+                marcando el resultado como parcial en lugar de lanzar la excepción
         
         Returns:
-            Diccionario con información de los rigs
+            Diccionario con información de los rigs. Si faltan páginas incluye
+            'partial': True y pagination['missingPages'] con los números de página
         """
+        size = page_size or config.RIGS_PAGE_SIZE
+        
         # Obtener primera página
-        result = self._make_request('GET', '/main/api/v2/mining/rigs')
+        result = self._make_request('GET', RIGS_ENDPOINT, {'page': 0, 'size': size})
         
         # Si no queremos todas las páginas o no hay paginación, retornar
         if not get_all_pages or 'pagination' not in result:
@@ -139,21 +384,112 @@ class NiceHashClient:
         if total_pages <= 1:
             return result
         
-        # Obtener el resto de páginas
+        # Obtener el resto de páginas en paralelo
+        pages = range(1, total_pages)
+        workers = max(1, min(max_workers or config.RIGS_PAGE_WORKERS, len(pages), self.pool_size))
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            page_results = list(executor.map(
+                lambda page: self._fetch_rigs_page(page, size, allow_partial),
+                pages
+            ))
+        
+        return self._merge_rig_pages(result, pages, page_results)
+    
+    @staticmethod
+    def _merge_rig_pages(result: Dict, pages: range, page_results: List[Optional[Dict]]) -> Dict:
+        """
+        Une las páginas descargadas a la primera, en orden de página
+        
+        Args:
+            result: Respuesta de la página 0 (se modifica y se retorna)
+            pages: Números de página descargados
+            page_results: Respuesta de cada página, o None si falló
+            
+        Returns:
+            Resultado con todos los rigs en 'miningRigs'
+        """
+        total_pages = result['pagination'].get('totalPageCount', 1)
         all_rigs = result.get('miningRigs', [])
+        missing_pages = []
         
-        for page in range(1, total_pages):
-            params = {'page': page, 'size': 25}
-            page_result = self._make_request('GET', '/main/api/v2/mining/rigs', params)
-            all_rigs.extend(page_result.get('miningRigs', []))
+        for page, page_result in zip(pages, page_results):
+            if page_result is None:
+                missing_pages.append(page)
+            else:
+                all_rigs.extend(page_result.get('miningRigs', []))
         
         # Actualizar el resultado con todos los rigs
         result['miningRigs'] = all_rigs
         result['pagination']['page'] = 0
         result['pagination']['size'] = len(all_rigs)
         
+        if missing_pages:
+            result['partial'] = True
+            result['pagination']['missingPages'] = missing_pages
+            print(f"⚠️  Resultado parcial: faltan las páginas {missing_pages} de {total_pages}")
+        
         return result
     
+    def _fetch_rigs_page(self, page: int, size: int, allow_partial: bool) -> Optional[Dict]:
+        """
+        Descarga una página de rigs (los reintentos los hace _make_request)
+        
+        Args:
+            page: Número de página
+            size: Rigs por página
+            allow_partial: Si es True devuelve None al agotar los reintentos
+            
+        Returns:
+            Respuesta de la página, o None si no se pudo obtener
+        """
+        try:
+            return self._make_request('GET', RIGS_ENDPOINT, {'page': page, 'size': size})
+        except requests.exceptions.RequestException:
+            if not allow_partial:
+                raise
+            return None
+    
+    def iter_rigs(self, fields: Optional[Sequence[str]] = ('rigId', 'name', 'minerStatus'),
+                  page_size: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Itera los rigs de todas las páginas sin cargar el payload completo
+        
+        Cada página se parsea en streaming y solo se materializan los campos
+        pedidos, así la memoria no crece con el tamaño de la flota y el primer
+        rig está disponible antes de terminar la descarga.
+        
+        Args:
+            fields: Campos de cada rig a conservar (None = rig completo)
+            page_size: Rigs por página (por defecto config.RIGS_PAGE_SIZE)
+            
+        Yields:
+            Un diccionario por rig con los campos pedidos
+        """
+        size = page_size or config.RIGS_PAGE_SIZE
+        page = 0
+        total_pages = 1
+        
+        while page < total_pages:
+            response = self._make_request('GET', RIGS_ENDPOINT, {'page': page, 'size': size}, stream=True)
+            with response:
+                rigs = RigStream(response.iter_content(chunk_size=1 << 16), fields)
+                yield from rigs
+            total_pages = rigs.meta.get('pagination', {}).get('totalPageCount', 1)
+            page += 1
+    
+    def get_rig_details(self, rig_id: str) -> Dict:
+        """
+        Obtiene el detalle de un rig (dispositivos, temperaturas, velocidades)
+    
+        Args:
+            rig_id: ID del rig
+    
+        Returns:
+            Diccionario con el detalle del rig
+        """
+        return self._make_request('GET', f"{RIG_DETAILS_ENDPOINT}{rig_id}")
+    
     def get_active_workers(self) -> Dict:
         """
         Obtiene información de los workers activos
@@ -238,3 +574,20 @@ class NiceHashClient:
             Diccionario con información de la cuenta (email, nombre, etc.)
         """
         return self._make_request('GET', '/main/api/v2/accounting/accounts2')
+    
+    def get_snapshot(self) -> Dict:
+        """
+        Obtiene rigs, estadísticas por algoritmo, balance no pagado y pagos
+        con peticiones concurrentes (ver AsyncNiceHashClient.get_snapshot)
+        
+        Returns:
+            Diccionario con las claves 'rigs', 'algo_stats', 'unpaid' y 'payouts'
+        """
+        import asyncio
+        from async_nicehash_client import AsyncNiceHashClient
+        
+        async def _snapshot():
+            async with AsyncNiceHashClient(self, close_client=False) as async_client:
+                return await async_client.get_snapshot()
+        
+        return asyncio.run(_snapshot())
@@ -0,0 +1,391 @@
+"""
+Correlación de caídas y anomalías de hashrate sobre el flujo de estados
+Agrupa las caídas de una ventana de tiempo por subred y grupo (fleet_index.py)
+para separar un corte de sitio, energía o pool de las fallas individuales, y
+sigue el hashrate aceptado de cada algoritmo con una media y varianza
+exponenciales (EWMA) para marcar las caídas con z-score. Cada check cuesta
+O(cambios + subredes afectadas + algoritmos), sin recorrer la flota
+"""
+import json
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from alert_rules import Alert
+from fleet_analytics import format_hashrate
+from fleet_index import FleetIndex, location_label
+from models import Fleet
+from rig_state import ChangeSet
+import config
+
+
+@dataclass
+class Outage:
+    """Corte que afecta a varios rigs de una subred, un grupo o la flota"""
+    scope: str
+    group: str
+    subnet: str
+    rigs: int
+    total: int
+    since: float
+    offline_before: int = 0
+
+    @property
+    def key(self) -> str:
+        return f"{self.scope}:{self.group}/{self.subnet}"
+
+    @property
+    def label(self) -> str:
+        if self.scope == 'fleet':
+            return 'toda la flota'
+        if self.scope == 'group':
+            return f"grupo {self.group or 'sin grupo'}"
+        return location_label(self.group, self.subnet)
+
+
+@dataclass
+class HashrateAnomaly:
+    """Hashrate aceptado de un algoritmo muy por debajo de su media reciente"""
+    algorithm: str
+    speed: float
+    mean: float
+    z: float
+
+    @property
+    def drop(self) -> float:
+        return (1 - self.speed / self.mean) * 100 if self.mean > 0 else 0.0
+
+
+@dataclass
+class OutageReport:
+    """Resultado de un check: cortes nuevos y terminados, fallas sueltas y anomalías"""
+    started: List[Outage]
+    ended: List[Outage]
+    individual: List[str]
+    anomalies: List[HashrateAnomaly]
+
+
+class OutageDetector:
+    """
+    Detector incremental de cortes y caídas de hashrate
+
+    Las caídas recientes se guardan en un diccionario ordenado por instante
+    (rig → (instante, grupo, subred)) con contadores por subred y grupo: cada
+    check agrega sus caídas, descuenta las recuperaciones y vence las que
+    salieron de la ventana por el frente. Un corte termina cuando los
+    contadores del índice muestran que su subred, grupo o flota recuperó los
+    rigs que perdió. El estado se guarda en `state_file` para
+    funcionar también con una ejecución por check.
+    """
+
+    def __init__(self, state_file: Optional[str] = None, window: Optional[float] = None,
+                 min_rigs: Optional[int] = None, percent: Optional[float] = None,
+                 alpha: Optional[float] = None, z_threshold: Optional[float] = None,
+                 min_drop: Optional[float] = None, warmup: Optional[int] = None):
+        """
+        Args:
+            state_file: Archivo JSON del estado (None = solo en memoria)
+            window: Segundos en los que las caídas se consideran simultáneas (por defecto config.ALERT_OUTAGE_WINDOW)
+            min_rigs: Caídas mínimas para hablar de un corte (por defecto config.ALERT_OUTAGE_MIN_RIGS)
+            percent: % mínimo de rigs del nodo caídos en la ventana (por defecto config.ALERT_OUTAGE_PERCENT)
+            alpha: Peso de cada lectura en la EWMA del hashrate (por defecto config.ALERT_HASHRATE_ALPHA)
+            z_threshold: z-score a partir del cual una caída es anómala (por defecto config.ALERT_HASHRATE_Z)
+            min_drop: Caída mínima (%) respecto de la media (por defecto config.ALERT_HASHRATE_MIN_DROP)
+            warmup: Lecturas antes de evaluar un algoritmo (por defecto config.ALERT_HASHRATE_WARMUP)
+        """
+        self.state_file = state_file
+        self.window = config.ALERT_OUTAGE_WINDOW if window is None else window
+        self.min_rigs = config.ALERT_OUTAGE_MIN_RIGS if min_rigs is None else min_rigs
+        self.percent = config.ALERT_OUTAGE_PERCENT if percent is None else percent
+        self.alpha = config.ALERT_HASHRATE_ALPHA if alpha is None else alpha
+        self.z_threshold = config.ALERT_HASHRATE_Z if z_threshold is None else z_threshold
+        self.min_drop = config.ALERT_HASHRATE_MIN_DROP if min_drop is None else min_drop
+        self.warmup = config.ALERT_HASHRATE_WARMUP if warmup is None else warmup
+        self.clear()
+        self.load()
+
+    def clear(self):
+        # rig → (instante, grupo, subred), en orden de llegada
+        self.recent: Dict[str, Tuple[float, str, str]] = {}
+        self.subnet_downs: Dict[Tuple[str, str], int] = {}
+        self.group_downs: Dict[str, int] = {}
+        self.active: Dict[str, Outage] = {}
+        # rig caído dentro de un corte → clave del corte más amplio que lo abarca
+        self.members: Dict[str, str] = {}
+        # algoritmo → [media, varianza, lecturas, checks seguidos en anomalía]
+        self.ewma: Dict[str, List[float]] = {}
+        self.anomalies: Dict[str, HashrateAnomaly] = {}
+
+    def load(self):
+        """Carga el estado de la ejecución anterior"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for name, when, group, subnet in data.get('recent', []):
+                self._add_down(name, when, group, subnet)
+            self.active = {key: Outage(**outage) for key, outage in data.get('active', {}).items()}
+            self.members = data.get('members', {})
+            self.ewma = data.get('ewma', {})
+        except Exception as e:
+            print(f"⚠️  Error al cargar el estado de cortes: {e}")
+            self.clear()
+
+    def save(self):
+        """Guarda el estado (reemplazo atómico)"""
+        if not self.state_file:
+            return
+        try:
+            data = {
+                'recent': [[name, when, group, subnet] for name, (when, group, subnet) in self.recent.items()],
+                'active': {key: outage.__dict__ for key, outage in self.active.items()},
+                'members': self.members,
+                'ewma': self.ewma,
+            }
+            tmp_path = f"{self.state_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            print(f"⚠️  Error al guardar el estado de cortes: {e}")
+
+    # --- Ventana de caídas -------------------------------------------------
+
+    def _add_down(self, name: str, when: float, group: str, subnet: str):
+        self._discard(name)
+        self.recent[name] = (when, group, subnet)
+        self.subnet_downs[(group, subnet)] = self.subnet_downs.get((group, subnet), 0) + 1
+        self.group_downs[group] = self.group_downs.get(group, 0) + 1
+
+    def _discard(self, name: str):
+        entry = self.recent.pop(name, None)
+        if entry is None:
+            return
+        _, group, subnet = entry
+        self.subnet_downs[(group, subnet)] -= 1
+        if not self.subnet_downs[(group, subnet)]:
+            del self.subnet_downs[(group, subnet)]
+        self.group_downs[group] -= 1
+        if not self.group_downs[group]:
+            del self.group_downs[group]
+
+    def _expire(self, now: float):
+        """Vence las caídas fuera de la ventana (las más viejas están al frente)"""
+        limit = now - self.window
+        while self.recent:
+            name = next(iter(self.recent))
+            if self.recent[name][0] > limit:
+                break
+            self._discard(name)
+
+    def _is_outage(self, downs: int, total: int) -> bool:
+        return total > 0 and downs >= self.min_rigs and downs / total * 100 >= self.percent
+
+    # --- Check ---------------------------------------------------------------
+
+    def _correlate(self, changes: ChangeSet, index: FleetIndex, now: float) -> Tuple[List[Outage], List[str]]:
+        """Registra las caídas del check y devuelve (cortes nuevos, caídas sueltas)"""
+        for name, _, _ in changes.recovered:
+            self._discard(name)
+        for name, _ in changes.removed:
+            self._discard(name)
+
+        touched = set()
+        downs = []
+        for name, _, _ in changes.down:
+            location = index.location(name)
+            if location is None:
+                continue
+            self._add_down(name, now, *location)
+            touched.add(location)
+            downs.append((name, location))
+
+        started = []
+
+        def start(outage: Outage, node):
+            if outage.key not in self.active:
+                outage.offline_before = max(0, node.offline - outage.rigs)
+                self.active[outage.key] = outage
+                started.append(outage)
+            else:
+                self.active[outage.key].rigs = max(self.active[outage.key].rigs, outage.rigs)
+
+        for group, subnet in touched:
+            node = index.subnet(subnet, group)
+            count = self.subnet_downs.get((group, subnet), 0)
+            if node is not None and subnet and self._is_outage(count, node.total):
+                start(Outage('subnet', group, subnet, count, node.total, now), node)
+
+        # Caídas en varias subredes del mismo grupo a la vez: corte del sitio
+        # (solo se recorren las subredes con caídas dentro de la ventana)
+        touched_groups = {group for group, _ in touched}
+        spread: Dict[str, int] = {}
+        if touched_groups:
+            for group, _ in self.subnet_downs:
+                if group in touched_groups:
+                    spread[group] = spread.get(group, 0) + 1
+        for group in touched_groups:
+            node = index.group(group)
+            count = self.group_downs.get(group, 0)
+            if group and node is not None and spread.get(group, 0) > 1 and self._is_outage(count, node.total):
+                start(Outage('group', group, '', count, node.total, now), node)
+
+        # Caídas repartidas en varias subredes de toda la flota: energía, pool o cuenta
+        fleet_downs = len(self.recent)
+        if touched and len(self.subnet_downs) > 1 and self._is_outage(fleet_downs, index.fleet.total):
+            start(Outage('fleet', '', '', fleet_downs, index.fleet.total, now), index.fleet)
+
+        # Rigs de cada corte: al empezar uno, todas las caídas de la ventana que
+        # abarca; mientras sigue, las nuevas caídas de su zona
+        pending = ((name, (group, subnet)) for name, (_, group, subnet) in self.recent.items()) \
+            if started else downs
+        for name, location in pending:
+            outage = self.covering(location)
+            if outage is not None:
+                self.members[name] = outage.key
+        individual = [name for name, _ in downs if name not in self.members]
+        return started, individual
+
+    def _end_outages(self, index: FleetIndex) -> List[Outage]:
+        """
+        Cortes terminados: los rigs offline de su subred, grupo o flota volvieron
+        a menos de `min_rigs` por encima de los que había antes del corte
+        (O(cortes activos))
+        """
+        ended = []
+        for key, outage in list(self.active.items()):
+            if outage.scope == 'subnet':
+                node = index.subnet(outage.subnet, outage.group)
+            elif outage.scope == 'group':
+                node = index.group(outage.group)
+            else:
+                node = index.fleet
+            if node is None or node.offline - outage.offline_before < self.min_rigs:
+                ended.append(self.active.pop(key))
+
+        if ended:
+            keys = {outage.key for outage in ended}
+            for name in [name for name, key in self.members.items() if key in keys]:
+                outage = self.covering(index.location(name))
+                if outage is not None:
+                    self.members[name] = outage.key
+                else:
+                    del self.members[name]
+        return ended
+
+    def _track_hashrate(self, speeds: Dict[str, float]) -> List[HashrateAnomaly]:
+        """
+        Actualiza la EWMA de cada algoritmo y devuelve las caídas anómalas
+
+        Las lecturas anómalas no entran en la media durante hasta `warmup`
+        checks seguidos (la alerta se mantiene mientras dura la caída); después
+        el nuevo nivel pasa a ser la referencia.
+        """
+        anomalies = []
+        for algorithm, speed in speeds.items():
+            state = self.ewma.get(algorithm)
+            if state is None:
+                # [media, varianza, lecturas, checks seguidos en anomalía]
+                self.ewma[algorithm] = [speed, 0.0, 1, 0]
+                continue
+            mean, variance, samples, held = state
+            deviation = speed - mean
+            std = math.sqrt(variance)
+            if samples >= self.warmup and std > 0 and mean > 0:
+                z = deviation / std
+                if z <= -self.z_threshold and -deviation / mean * 100 >= self.min_drop:
+                    anomalies.append(HashrateAnomaly(algorithm, speed, mean, z))
+                    if held < self.warmup:
+                        state[3] = held + 1
+                        continue
+            increment = self.alpha * deviation
+            state[0] = mean + increment
+            state[1] = (1 - self.alpha) * (variance + deviation * increment)
+            state[2] = samples + 1
+            state[3] = 0
+        anomalies.sort(key=lambda anomaly: anomaly.z)
+        self.anomalies = {anomaly.algorithm: anomaly for anomaly in anomalies}
+        return anomalies
+
+    def observe(self, fleet: Fleet, changes: ChangeSet, index: FleetIndex,
+                now: Optional[float] = None) -> OutageReport:
+        """
+        Procesa un check
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de estado de este check
+            index: Índice de la flota ya actualizado con este check
+            now: Instante del check (por defecto time.time())
+
+        Returns:
+            Cortes nuevos y terminados, caídas sueltas y anomalías de hashrate
+        """
+        now = time.time() if now is None else now
+        self._expire(now)
+        started, individual = self._correlate(changes, index, now)
+        ended = self._end_outages(index)
+        started = [outage for outage in started if outage.key in self.active]
+        # Un snapshot parcial no sirve para el hashrate total de la flota
+        anomalies = self._track_hashrate(index.fleet.speed) if not fleet.partial else list(self.anomalies.values())
+        self.save()
+        return OutageReport(started, ended, individual, anomalies)
+
+    # --- Alertas -------------------------------------------------------------
+
+    def covering(self, location: Optional[Tuple[str, str]]) -> Optional[Outage]:
+        """Corte activo más amplio que abarca una ubicación (grupo, subred)"""
+        if location is None:
+            return None
+        group, subnet = location
+        for key in ('fleet:/', f"group:{group}/", f"subnet:{group}/{subnet}"):
+            outage = self.active.get(key)
+            if outage is not None:
+                return outage
+        return None
+
+    def alerts(self, alerts: Iterable[Alert], index: FleetIndex) -> List[Alert]:
+        """
+        Reemplaza las alertas de los rigs que cayeron en un corte activo (y las
+        de sus subredes) por una sola alerta del corte y agrega las anomalías
+        de hashrate. Los rigs que ya estaban caídos antes del corte conservan
+        sus alertas.
+
+        Args:
+            alerts: Resultado de AlertEngine.evaluate
+            index: Índice de la flota
+
+        Returns:
+            Lista de alertas para AlertEngine.dispatch
+        """
+        result = []
+        labels = None
+        for alert in alerts:
+            if alert.rig in self.members:
+                continue
+            if self.active and alert.rule == 'subnet_offline':
+                if labels is None:
+                    labels = {f"subnet:{location_label(*location)}": location for location in index.subnets}
+                if self.covering(labels.get(alert.key)) is not None:
+                    continue
+            result.append(alert)
+
+        # Solo el corte más amplio de cada zona
+        for outage in self.active.values():
+            if self.covering((outage.group, outage.subnet)) is not outage:
+                continue
+            result.append(Alert(
+                f"outage:{outage.key}", f"outage_{outage.scope}", 'critical',
+                f"Corte en {outage.label}: {outage.rigs} de {outage.total} rigs cayeron juntos"
+            ))
+
+        for anomaly in self.anomalies.values():
+            result.append(Alert(
+                f"hashrate:{anomaly.algorithm}", 'hashrate_drop', 'warning',
+                f"{anomaly.algorithm}: hashrate aceptado {format_hashrate(anomaly.speed)}, "
+                f"{anomaly.drop:.0f}% bajo su media de {format_hashrate(anomaly.mean)} (z={anomaly.z:.1f})"
+            ))
+        return result
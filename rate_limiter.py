@@ -0,0 +1,184 @@
+"""
+Limitador de peticiones y política de reintentos para la API de NiceHash
+Token bucket adaptativo (se frena ante 429/Retry-After) compartido por todos los endpoints
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket compartido entre hilos
+    
+    Ante un 429 reduce la tasa a la mitad y respeta Retry-After; con cada
+    respuesta correcta recupera la tasa poco a poco hasta el máximo configurado.
+    """
+    
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.5):
+        """
+        Inicializa el limitador
+        
+        Args:
+            rate: Peticiones por segundo máximas
+            burst: Peticiones que se pueden hacer de golpe
+            min_rate: Tasa mínima tras frenar por 429
+        """
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self) -> float:
+        """
+        Espera hasta que haya un token disponible y lo consume
+        
+        Returns:
+            Segundos esperados
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._blocked_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+    
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """Registra un 429: reduce la tasa y bloquea hasta Retry-After si viene"""
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._updated = now
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+    
+    def on_success(self):
+        """Registra una respuesta correcta: recupera la tasa de forma aditiva"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class RetryPolicy:
+    """Backoff exponencial con jitter y presupuesto de reintentos por endpoint"""
+    
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float,
+                 budget_ratio: float, min_budget: int = 3):
+        """
+        Inicializa la política
+        
+        Args:
+            max_retries: Reintentos máximos por petición
+            base_delay: Espera base del backoff en segundos
+            max_delay: Espera máxima entre intentos
+            budget_ratio: Reintentos permitidos por cada petición del endpoint
+            min_budget: Reintentos siempre disponibles por endpoint
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+        self._requests = defaultdict(int)
+        self._retries = defaultdict(int)
+        self._lock = threading.Lock()
+    
+    def record_request(self, endpoint: str):
+        with self._lock:
+            self._requests[endpoint] += 1
+    
+    def try_retry(self, endpoint: str, attempt: int) -> bool:
+        """
+        Indica si se puede reintentar y, en ese caso, consume presupuesto
+        
+        Args:
+            endpoint: Endpoint de la API
+            attempt: Número de intento que acaba de fallar (0 = primero)
+        """
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            budget = self.min_budget + self.budget_ratio * self._requests[endpoint]
+            if self._retries[endpoint] >= budget:
+                return False
+            self._retries[endpoint] += 1
+            return True
+    
+    def backoff(self, attempt: int) -> float:
+        """Espera con jitter completo para el intento dado"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Convierte la cabecera Retry-After (segundos o fecha HTTP) a segundos
+    
+    Returns:
+        Segundos a esperar, o None si no viene o no se puede interpretar
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestStats:
+    """Contadores de peticiones: tiempo en red vs. tiempo esperando (limitador y backoff)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.server_errors = 0
+        self.wire_seconds = 0.0
+        self.throttled_seconds = 0.0
+    
+    def add(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+    
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'server_errors': self.server_errors,
+                'wire_seconds': round(self.wire_seconds, 3),
+                'throttled_seconds': round(self.throttled_seconds, 3),
+            }
+    
+    def summary(self) -> str:
+        stats = self.as_dict()
+        return (f"{stats['requests']} peticiones, {stats['retries']} reintentos, "
+                f"{stats['rate_limited']} x 429, {stats['wire_seconds']:.2f}s en red, "
+                f"{stats['throttled_seconds']:.2f}s esperando")
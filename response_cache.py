@@ -0,0 +1,188 @@
+"""
+Caché de respuestas para endpoints de NiceHash que cambian poco
+Nivel en memoria (LRU) + nivel en disco que sobrevive entre ejecuciones
+(en GitHub Actions se restaura con actions/cache igual que rig_states.json)
+"""
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config
+
+# Entradas sin validadores (ETag/Last-Modified) se descartan del disco al vencer;
+# las que sí tienen se conservan hasta este límite para poder revalidarlas
+MAX_STALE_AGE = 7 * 24 * 3600
+
+
+class ResponseCache:
+    """
+    Caché de respuestas JSON con TTL por endpoint
+    
+    Las entradas vencidas que tienen ETag o Last-Modified no se borran: el
+    cliente las revalida con If-None-Match/If-Modified-Since y un 304 las
+    renueva sin volver a descargar el cuerpo.
+    """
+    
+    def __init__(self, ttls: Dict[str, float], max_entries: int = 256, disk_path: Optional[str] = None):
+        """
+        Inicializa la caché
+        
+        Args:
+            ttls: Segundos de validez por endpoint; los endpoints ausentes no se cachean
+            max_entries: Entradas máximas del nivel en memoria
+            disk_path: Archivo JSON del nivel en disco (None para solo memoria)
+        """
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self._memory = OrderedDict()
+        self._disk = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._load_disk()
+    
+    def _load_disk(self):
+        if not self.disk_path:
+            return
+        try:
+            with open(self.disk_path, 'r', encoding='utf-8') as f:
+                self._disk = json.load(f)
+        except FileNotFoundError:
+            self._disk = {}
+        except Exception as e:
+            print(f"⚠️  Error al cargar caché de respuestas: {e}")
+            self._disk = {}
+    
+    def _save_disk(self):
+        """Escribe el nivel en disco de forma atómica (llamar con el lock tomado)"""
+        if not self.disk_path:
+            return
+        now = time.time()
+        self._disk = {
+            key: entry for key, entry in self._disk.items()
+            if now - entry['stored_at'] < self._ttl(entry['endpoint'])
+            or ((entry.get('etag') or entry.get('last_modified'))
+                and now - entry['stored_at'] < MAX_STALE_AGE)
+        }
+        try:
+            tmp_path = f"{self.disk_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._disk, f, ensure_ascii=False)
+            os.replace(tmp_path, self.disk_path)
+        except Exception as e:
+            print(f"⚠️  Error al guardar caché de respuestas: {e}")
+    
+    def _ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, 0)
+    
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self._ttl(endpoint) > 0
+    
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        Busca una entrada en memoria y luego en disco
+        
+        Args:
+            key: Organización + endpoint + query string
+            
+        Returns:
+            Entrada ({'data', 'stored_at', 'etag', 'last_modified', 'fresh'}) o None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._disk.get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+            else:
+                self._memory.move_to_end(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            fresh = time.time() - entry['stored_at'] < self._ttl(entry['endpoint'])
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return dict(entry, data=copy.deepcopy(entry['data']), fresh=fresh)
+    
+    def store(self, key: str, endpoint: str, data: Dict,
+              etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Guarda una respuesta nueva en ambos niveles"""
+        entry = {
+            'endpoint': endpoint,
+            'data': copy.deepcopy(data),
+            'stored_at': time.time(),
+            'etag': etag,
+            'last_modified': last_modified
+        }
+        with self._lock:
+            self._remember(key, entry)
+            self._disk[key] = entry
+            self._save_disk()
+    
+    def mark_revalidated(self, key: str):
+        """Renueva una entrada tras un 304 Not Modified"""
+        with self._lock:
+            entry = self._memory.get(key) or self._disk.get(key)
+            if entry is None:
+                return
+            entry['stored_at'] = time.time()
+            self.revalidated += 1
+            self._remember(key, entry)
+            self._disk[key] = entry
+            self._save_disk()
+    
+    def _remember(self, key: str, entry: Dict):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+    
+    def stats(self) -> Dict:
+        """Contadores de aciertos: cada hit es una petición a la API ahorrada"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidated': self.revalidated,
+                'memory_entries': len(self._memory),
+                'disk_entries': len(self._disk)
+            }
+    
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"{stats['hits']} aciertos (peticiones ahorradas), {stats['misses']} fallos, "
+                f"{stats['revalidated']} revalidadas con 304")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache() -> Optional[ResponseCache]:
+    """
+    Caché compartida por todos los clientes del proceso, según config
+    
+    Returns:
+        ResponseCache, o None si la caché está desactivada
+    """
+    global _default_cache
+    if not config.CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                config.CACHE_TTLS,
+                max_entries=config.CACHE_MAX_ENTRIES,
+                disk_path=config.CACHE_FILE or None
+            )
+        return _default_cache
@@ -0,0 +1,271 @@
+"""
+Detalle por rig (/main/api/v2/mining/rig2/{rigId}) para adjuntar a las alertas
+Solo se consulta el detalle de los rigs que cambiaron de estado o cuyo hashrate
+se desvía de su promedio reciente, con un pool de hilos acotado, un máximo de
+rigs por check, un tiempo máximo de espera y una caché con TTL por rig
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fleet_analytics import format_hashrate
+from hashrate_history import HashrateHistory
+from models import Fleet, Rig, STATUS_MINING, to_float
+from nicehash_client import NiceHashClient
+from rig_state import ChangeSet
+import config
+
+# Motivos de selección, en orden de prioridad (los primeros se consultan antes
+# cuando hay más candidatos que el máximo por check). 'alert' va primero porque
+# es el único detalle que se muestra en este check; el resto calienta la caché
+# (en memoria), así que solo sirve en el modo continuo
+REASONS = ('alert', 'down', 'changed', 'deviation', 'recovered')
+
+# Motivos con los que el detalle se muestra en el mismo check
+DISPLAYED_REASONS = ('alert',)
+
+# Dispositivos con problemas listados por rig en el resumen
+MAX_DEVICES = 3
+
+
+def _temperature(value) -> Optional[float]:
+    """Temperatura del dispositivo; la API codifica la de la VRAM en los 16 bits altos"""
+    value = to_float(value)
+    if value < 0:
+        return None
+    return value % 65536 if value >= 65536 else value
+
+
+def summarize_details(details: Dict, now: Optional[float] = None) -> str:
+    """
+    Resumen de una línea del detalle de un rig
+
+    Rigs administrados: dispositivos que no están minando (estado y
+    temperatura). Rigs no administrados (ASIC): hashrate y rechazo por
+    algoritmo según el propio rig.
+
+    Args:
+        details: Respuesta de get_rig_details
+        now: Instante actual (por defecto time.time())
+
+    Returns:
+        Texto para adjuntar a la alerta
+    """
+    devices = details.get('devices') or []
+    if devices:
+        problems = []
+        mining = 0
+        for device in devices:
+            status = device.get('status')
+            if isinstance(status, dict):
+                status = status.get('enumName')
+            status = status or 'UNKNOWN'
+            if status == 'MINING':
+                mining += 1
+                continue
+            text = f"{device.get('name') or 'Dispositivo'} {status}"
+            temperature = _temperature(device.get('temperature'))
+            if temperature:
+                text += f" {temperature:.0f}°C"
+            problems.append(text)
+        summary = f"{mining}/{len(devices)} dispositivos minando"
+        if problems:
+            summary += ": " + ", ".join(problems[:MAX_DEVICES])
+            if len(problems) > MAX_DEVICES:
+                summary += f" y {len(problems) - MAX_DEVICES} más"
+        return summary
+
+    parts = []
+    for stat in details.get('stats') or []:
+        algorithm = (stat.get('algorithm') or {}).get('enumName') or 'UNKNOWN'
+        accepted = to_float(stat.get('speedAccepted'))
+        rejected = to_float(stat.get('speedRejectedTotal'))
+        total = accepted + rejected
+        rate = rejected / total * 100 if total > 0 else 0.0
+        text = f"{algorithm} {format_hashrate(accepted)}, rechazo {rate:.1f}%"
+        stats_time = to_float(stat.get('statsTime'))
+        if stats_time:
+            minutes = max(0, (now or time.time()) - stats_time / 1000) / 60
+            text += f", último dato hace {minutes:.0f} min"
+        parts.append(text)
+    return "; ".join(parts) if parts else (details.get('minerStatus') or 'sin detalle')
+
+
+class RigDetailFetcher:
+    """
+    Descarga y cachea el detalle de los rigs relevantes en cada check
+
+    La caché guarda el detalle junto con el estado del rig al descargarlo: una
+    entrada vale mientras no venza su TTL y el rig siga en ese estado.
+    """
+
+    def __init__(self, client: NiceHashClient, max_workers: Optional[int] = None,
+                 ttl: Optional[float] = None, max_per_check: Optional[int] = None,
+                 deviation: Optional[float] = None, timeout: Optional[float] = None,
+                 reasons: Iterable[str] = REASONS):
+        """
+        Args:
+            client: Cliente de la cuenta
+            max_workers: Descargas en paralelo (por defecto config.RIG_DETAILS_WORKERS)
+            ttl: Segundos de validez de un detalle (por defecto config.RIG_DETAILS_TTL)
+            max_per_check: Descargas como máximo por check (por defecto config.RIG_DETAILS_MAX_PER_CHECK)
+            deviation: Desvío del hashrate (%) respecto del promedio reciente que
+                selecciona un rig (por defecto config.RIG_DETAILS_DEVIATION)
+            timeout: Segundos como máximo esperando descargas (por defecto config.RIG_DETAILS_TIMEOUT)
+            reasons: Motivos de selección habilitados (DISPLAYED_REASONS en
+                procesos de un solo check, donde la caché no sobrevive)
+        """
+        self.client = client
+        self.max_workers = max(1, min(max_workers or config.RIG_DETAILS_WORKERS, client.pool_size))
+        self.ttl = config.RIG_DETAILS_TTL if ttl is None else ttl
+        self.max_per_check = config.RIG_DETAILS_MAX_PER_CHECK if max_per_check is None else max_per_check
+        self.deviation = config.RIG_DETAILS_DEVIATION if deviation is None else deviation
+        self.timeout = config.RIG_DETAILS_TIMEOUT if timeout is None else timeout
+        self.reasons = frozenset(reasons)
+        self._cache: Dict[str, Tuple[float, str, Dict]] = {}
+        self._lock = threading.Lock()
+        self.last_stats: Dict[str, int] = {}
+
+    def _deviates(self, rig: Rig, history: HashrateHistory) -> bool:
+        """Algún algoritmo del rig se desvía más de `deviation`% de su promedio reciente"""
+        for stat in rig.stats:
+            baseline = history.recent_mean(rig.rig_id, stat.algorithm)
+            if baseline and abs(stat.speed_accepted - baseline) / baseline * 100 > self.deviation:
+                return True
+        return False
+
+    def select(self, fleet: Fleet, changes: Optional[ChangeSet] = None,
+               history: Optional[HashrateHistory] = None,
+               alerted: Iterable[str] = (), skip: Iterable[str] = ()) -> List[Tuple[Rig, str]]:
+        """
+        Rigs cuyo detalle interesa en este check, en orden de prioridad
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de estado de este check
+            history: Histórico de hashrate (sin el snapshot actual) para el desvío
+            alerted: Nombres de rigs con alertas notificadas en este check
+            skip: Nombres de rigs a no consultar (p. ej. los que están dentro
+                de un corte, cuya alerta individual no se envía)
+
+        Returns:
+            Lista de (rig, motivo)
+        """
+        reasons: Dict[str, str] = {}
+        if changes is not None:
+            for name, _, _ in changes.down:
+                reasons[name] = 'down'
+            for name, _, _ in changes.changed:
+                reasons.setdefault(name, 'changed')
+            for name, _, _ in changes.recovered:
+                reasons.setdefault(name, 'recovered')
+        for name in alerted:
+            reasons[name] = 'alert'
+
+        skip = set(skip)
+        selected = []
+        for rig in fleet:
+            if rig.name in skip:
+                continue
+            reason = reasons.get(rig.name)
+            if reason is None and history is not None and self.deviation > 0 \
+                    and 'deviation' in self.reasons and rig.status_code == STATUS_MINING \
+                    and self._deviates(rig, history):
+                reason = 'deviation'
+            if reason in self.reasons:
+                selected.append((rig, reason))
+
+        selected.sort(key=lambda item: (REASONS.index(item[1]), item[0].name))
+        return selected
+
+    def _cached(self, rig: Rig, now: float) -> Optional[Dict]:
+        entry = self._cache.get(rig.rig_id)
+        if entry is None:
+            return None
+        fetched_at, status, details = entry
+        if now - fetched_at >= self.ttl or status != rig.status:
+            return None
+        return details
+
+    def _download(self, rig: Rig) -> Dict:
+        details = self.client.get_rig_details(rig.rig_id)
+        with self._lock:
+            self._cache[rig.rig_id] = (time.time(), rig.status, details)
+        return details
+
+    def fetch(self, rigs: Iterable[Rig]) -> Dict[str, Dict]:
+        """
+        Detalle de los rigs pedidos (desde la caché o descargado)
+
+        Se descargan como máximo `max_per_check` rigs; los que no terminan
+        dentro de `timeout` se omiten en este check (su respuesta, si llega,
+        queda en la caché para el siguiente).
+
+        Returns:
+            {nombre del rig: detalle}
+        """
+        now = time.time()
+        result = {}
+        missing = []
+        with self._lock:
+            for key in [key for key, entry in self._cache.items() if now - entry[0] >= self.ttl]:
+                del self._cache[key]
+            for rig in rigs:
+                details = self._cached(rig, now)
+                if details is not None:
+                    result[rig.name] = details
+                else:
+                    missing.append(rig)
+
+        stats = {'cached': len(result), 'fetched': 0, 'skipped': max(0, len(missing) - self.max_per_check),
+                 'errors': 0, 'timeouts': 0}
+        missing = missing[:self.max_per_check]
+        if missing:
+            executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing)))
+            futures = {executor.submit(self._download, rig): rig for rig in missing}
+            done, pending = wait(futures, timeout=self.timeout)
+            executor.shutdown(wait=False, cancel_futures=True)
+
+            for future in done:
+                rig = futures[future]
+                try:
+                    result[rig.name] = future.result()
+                    stats['fetched'] += 1
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"⚠️  Error al obtener el detalle de {rig.name}: {e}")
+            stats['timeouts'] = len(pending)
+
+        self.last_stats = stats
+        return result
+
+    def collect(self, fleet: Fleet, changes: Optional[ChangeSet] = None,
+                history: Optional[HashrateHistory] = None,
+                alerted: Iterable[str] = (), skip: Iterable[str] = ()) -> Dict[str, str]:
+        """
+        Selecciona, descarga y resume el detalle de los rigs de este check
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de estado de este check
+            history: Histórico de hashrate (sin el snapshot actual) para el desvío
+            alerted: Nombres de rigs con alertas notificadas en este check
+            skip: Nombres de rigs a no consultar
+
+        Returns:
+            {nombre del rig: resumen de una línea}
+        """
+        selected = self.select(fleet, changes, history, alerted, skip)
+        if not selected:
+            self.last_stats = {}
+            return {}
+
+        details = self.fetch(rig for rig, _ in selected)
+        stats = self.last_stats
+        print(f"  🔎 Detalle de rigs: {len(details)}/{len(selected)} "
+              f"({stats['fetched']} descargados, {stats['cached']} en caché"
+              + (f", {stats['skipped']} sobre el máximo" if stats['skipped'] else "")
+              + (f", {stats['timeouts']} sin respuesta a tiempo" if stats['timeouts'] else "")
+              + ")")
+        return {name: summarize_details(data) for name, data in details.items()}
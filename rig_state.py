@@ -0,0 +1,225 @@
+"""
+Motor de estados de rigs basado en diferencias
+Calcula en una sola pasada qué rigs son nuevos, se cayeron, se recuperaron,
+desaparecieron o están oscilando, y persiste solo los cambios en un journal
+append-only que se compacta periódicamente en rig_states.json
+"""
+import json
+import os
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+MINING = 'MINING'
+
+
+class ChangeSet:
+    """Cambios detectados en un check"""
+    
+    def __init__(self, check: int):
+        self.check = check
+        self.new: List[Tuple[str, str]] = []
+        self.down: List[Tuple[str, str, str]] = []
+        self.recovered: List[Tuple[str, str, str]] = []
+        self.changed: List[Tuple[str, str, str]] = []
+        self.removed: List[Tuple[str, str]] = []
+        self.flapping: List[str] = []
+    
+    def __bool__(self) -> bool:
+        return bool(self.new or self.down or self.recovered or self.changed or self.removed)
+    
+    @property
+    def transitions(self) -> int:
+        """Cambios de estado de rigs conocidos (caídos + recuperados + otros)"""
+        return len(self.down) + len(self.recovered) + len(self.changed)
+
+
+class RigStateEngine:
+    """
+    Estado actual de cada rig con persistencia O(cambios)
+    
+    rig_states.json es la última foto compactada; rig_states.journal guarda
+    una línea por check con solo los cambios. Al cargar se aplica el journal
+    sobre la foto.
+    """
+    
+    def __init__(self, state_file: str, compact_every: int = 200,
+                 flap_window: int = 10, flap_threshold: int = 3):
+        """
+        Inicializa el motor y carga el estado persistido
+        
+        Args:
+            state_file: Foto compactada (acepta el formato anterior {nombre: estado})
+            compact_every: Líneas de journal antes de compactar
+            flap_window: Checks considerados para detectar oscilaciones
+            flap_threshold: Transiciones dentro de la ventana para marcar un rig como oscilante
+        """
+        self.state_file = state_file
+        self.journal_file = f"{os.path.splitext(state_file)[0]}.journal"
+        self.compact_every = compact_every
+        self.flap_window = flap_window
+        self.flap_threshold = flap_threshold
+        
+        self.check = 0
+        self.states: Dict[str, str] = {}
+        self.since: Dict[str, int] = {}
+        self.transitions: Dict[str, deque] = {}
+        self._journal_lines = 0
+        self.load()
+    
+    def load(self):
+        """Carga la foto y aplica el journal pendiente; si están dañados comienza desde cero"""
+        try:
+            self._load_snapshot()
+            self._load_journal()
+        except Exception as e:
+            print(f"⚠️  Error al cargar estados: {e}")
+            self.check = 0
+            self.states, self.since, self.transitions = {}, {}, {}
+    
+    def _load_snapshot(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        
+        if snapshot.get('version') == 2:
+            self.check = snapshot['check']
+            self.states = snapshot['states']
+            self.since = snapshot['since']
+            self.transitions = {name: deque(checks) for name, checks in snapshot['transitions'].items()}
+        else:
+            # Formato anterior: {nombre: estado}
+            self.states = dict(snapshot)
+            self.since = {name: 0 for name in self.states}
+    
+    def _load_journal(self):
+        try:
+            with open(self.journal_file, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._journal_lines += 1
+                    entry = json.loads(line)
+                    if entry['c'] > self.check:
+                        self._replay(entry)
+        except FileNotFoundError:
+            pass
+    
+    def _replay(self, entry: Dict):
+        check = entry['c']
+        for name, status in entry.get('set', {}).items():
+            if name in self.states:
+                self._note_transition(name, check)
+            self.states[name] = status
+            self.since[name] = check
+        for name in entry.get('del', ()):
+            self._forget(name)
+        self.check = check
+    
+    def _note_transition(self, name: str, check: int):
+        history = self.transitions.get(name)
+        if history is None:
+            history = self.transitions[name] = deque()
+        history.append(check)
+        while history and history[0] <= check - self.flap_window:
+            history.popleft()
+    
+    def _forget(self, name: str):
+        self.states.pop(name, None)
+        self.since.pop(name, None)
+        self.transitions.pop(name, None)
+    
+    def is_flapping(self, name: str) -> bool:
+        history = self.transitions.get(name)
+        if not history:
+            return False
+        recent = sum(1 for check in history if check > self.check - self.flap_window)
+        return recent >= self.flap_threshold
+    
+    def checks_in_state(self, name: str) -> int:
+        """Checks consecutivos que el rig lleva en su estado actual"""
+        return self.check - self.since.get(name, self.check)
+    
+    def apply(self, rigs: Iterable[Tuple[str, str]], complete: bool = True) -> ChangeSet:
+        """
+        Compara un snapshot con el estado guardado y registra los cambios
+        
+        Args:
+            rigs: Pares (nombre, estado) del snapshot actual
+            complete: False si el snapshot es parcial (faltan páginas); en ese
+                caso no se dan de baja los rigs ausentes
+            
+        Returns:
+            ChangeSet con los cambios de este check
+        """
+        self.check += 1
+        changes = ChangeSet(self.check)
+        updates = {}
+        seen = set()
+        
+        for name, status in rigs:
+            seen.add(name)
+            previous = self.states.get(name)
+            if previous == status:
+                continue
+            
+            updates[name] = status
+            if previous is None:
+                changes.new.append((name, status))
+            else:
+                self._note_transition(name, self.check)
+                if status == MINING:
+                    changes.recovered.append((name, previous, status))
+                elif previous == MINING:
+                    changes.down.append((name, previous, status))
+                else:
+                    changes.changed.append((name, previous, status))
+                if self.is_flapping(name):
+                    changes.flapping.append(name)
+            self.states[name] = status
+            self.since[name] = self.check
+        
+        # Rigs que ya no aparecen en la API
+        removed = []
+        if complete and len(seen) != len(self.states):
+            removed = [name for name in self.states if name not in seen]
+            for name in removed:
+                changes.removed.append((name, self.states[name]))
+                self._forget(name)
+        
+        self._append_journal(updates, removed)
+        return changes
+    
+    def _append_journal(self, updates: Dict[str, str], removed: List[str]):
+        entry = {'c': self.check}
+        if updates:
+            entry['set'] = updates
+        if removed:
+            entry['del'] = removed
+        
+        with open(self.journal_file, 'a') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        self._journal_lines += 1
+        
+        if self._journal_lines >= self.compact_every:
+            self.compact()
+    
+    def compact(self):
+        """Escribe la foto completa de forma atómica y vacía el journal"""
+        snapshot = {
+            'version': 2,
+            'check': self.check,
+            'states': self.states,
+            'since': self.since,
+            'transitions': {name: list(checks) for name, checks in self.transitions.items() if checks}
+        }
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+        
+        # La foto ya incluye todo lo del journal (las entradas con c <= check se ignoran al cargar)
+        open(self.journal_file, 'w').close()
+        self._journal_lines = 0
@@ -0,0 +1,167 @@
+"""
+Parser incremental (streaming) para el payload de miningRigs
+Entrega los rigs de a uno a medida que llegan los bytes, materializando
+solo los campos pedidos, sin construir el documento JSON completo
+"""
+import codecs
+import json
+import re
+from typing import Dict, Iterable, Iterator, Optional, Sequence
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DECODER = json.JSONDecoder()
+_DELIMITERS = frozenset(' \t\n\r,:]}')
+
+# Tamaño a partir del cual se descarta del buffer lo ya consumido
+_COMPACT_THRESHOLD = 1 << 16
+
+
+class _NeedMoreData(Exception):
+    """El buffer termina a mitad de un valor: hay que leer otro chunk"""
+
+
+class RigStream:
+    """
+    Itera los rigs de un documento JSON leyendo chunks de bytes
+    
+    Los valores que no están en la ruta hacia la lista (pagination,
+    totalRigs...) se guardan en `meta`. Después de iterar, `found` indica si
+    la lista existía en el documento.
+    """
+    
+    def __init__(self, chunks: Iterable[bytes], fields: Optional[Sequence[str]] = None,
+                 path: Sequence[str] = ('miningRigs',)):
+        """
+        Inicializa el parser
+        
+        Args:
+            chunks: Bytes del documento en trozos (p. ej. response.iter_content())
+            fields: Campos de cada rig a conservar (None = rig completo)
+            path: Claves desde la raíz hasta la lista de rigs
+        """
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self.fields = tuple(fields) if fields else None
+        self.path = tuple(path)
+        self.meta = {}
+        self.found = False
+    
+    def _read_more(self) -> bool:
+        """Agrega el siguiente chunk al buffer; False si ya no hay más datos"""
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                if self._pos > _COMPACT_THRESHOLD:
+                    self._buffer = self._buffer[self._pos:]
+                    self._pos = 0
+                self._buffer += text
+                return True
+        self._eof = True
+        self._buffer += self._decoder.decode(b'', final=True)
+        return False
+    
+    def _peek(self) -> str:
+        """Salta espacios y devuelve el siguiente carácter sin consumirlo"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                raise ValueError("JSON incompleto: el documento terminó antes de tiempo")
+    
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise ValueError(f"JSON inválido: se esperaba '{char}' en la posición {self._pos}")
+        self._pos += 1
+    
+    def _value(self):
+        """Decodifica el siguiente valor completo, leyendo más chunks si hace falta"""
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+                # Un número cortado ("0." o "12") se decodifica sin error: solo se
+                # acepta el valor si ya llegó el delimitador que lo sigue
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _DELIMITERS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_more()
+    
+    def _project(self, rig: Dict) -> Dict:
+        if self.fields is None:
+            return rig
+        return {field: rig.get(field) for field in self.fields}
+    
+    def __iter__(self) -> Iterator[Dict]:
+        return self._object(0)
+    
+    def _object(self, depth: int) -> Iterator[Dict]:
+        """Recorre un objeto buscando la clave path[depth]"""
+        self._expect('{')
+        while True:
+            char = self._peek()
+            if char == '}':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            
+            key = self._value()
+            self._expect(':')
+            
+            if key != self.path[depth]:
+                self.meta[key] = self._value()
+            elif depth + 1 < len(self.path):
+                if self._peek() == '{':
+                    yield from self._object(depth + 1)
+                else:
+                    self.meta[key] = self._value()
+            elif self._peek() == '[':
+                self.found = True
+                yield from self._array()
+            else:
+                self.meta[key] = self._value()
+    
+    def _array(self) -> Iterator[Dict]:
+        """Entrega los elementos de la lista de rigs de a uno"""
+        self._expect('[')
+        while True:
+            char = self._peek()
+            if char == ']':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            yield self._project(self._value())
+
+
+def iter_file_rigs(json_file: str, fields: Optional[Sequence[str]] = None,
+                   path: Sequence[str] = ('rigs', 'miningRigs'), chunk_size: int = 1 << 16) -> RigStream:
+    """
+    Crea un RigStream sobre un archivo exportado con export_stats.py
+    
+    Args:
+        json_file: Archivo JSON
+        fields: Campos de cada rig a conservar (None = rig completo)
+        path: Claves hasta la lista de rigs
+        chunk_size: Bytes leídos por vez
+    """
+    def chunks():
+        with open(json_file, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+    
+    return RigStream(chunks(), fields, path)
@@ -0,0 +1,513 @@
+"""
+Archivo histórico comprimido de snapshots de rigs (salida de get_rigs)
+Un archivo por día con un miembro gzip por snapshot más un índice binario de
+desplazamientos: cada snapshot se guarda como diferencia respecto del anterior
+(los rigs sin cambios no ocupan nada) y cada cierto número de snapshots se
+escribe uno completo (keyframe) para poder saltar a cualquier hora del día
+sin descomprimir el día entero
+"""
+import bisect
+import glob
+import json
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import config
+from rig_stream import RigStream
+
+# timestamp (segundos epoch), desplazamiento, longitud comprimida, es keyframe
+INDEX_RECORD = struct.Struct('<qQIB')
+
+# Claves reservadas de los parches (no aparecen en las respuestas de la API)
+_DELETED = '~del'
+_ITEMS = '~items'
+
+# Bytes comprimidos leídos por vez al recorrer un keyframe en streaming
+_READ_SIZE = 1 << 16
+
+
+def diff(old: Dict, new: Dict) -> Dict:
+    """
+    Calcula el parche que convierte `old` en `new`
+
+    Los diccionarios se comparan recursivamente y las listas de diccionarios
+    del mismo largo (p. ej. stats[] de un rig) elemento a elemento; cualquier
+    otro valor distinto se reemplaza entero.
+
+    Args:
+        old: Valor anterior
+        new: Valor nuevo
+
+    Returns:
+        Parche (vacío si son iguales)
+    """
+    patch = {}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+            continue
+        previous = old[key]
+        if previous == value:
+            continue
+        if isinstance(previous, dict) and isinstance(value, dict):
+            patch[key] = diff(previous, value)
+        elif (isinstance(previous, list) and isinstance(value, list) and len(previous) == len(value)
+              and all(isinstance(a, dict) and isinstance(b, dict) for a, b in zip(previous, value))):
+            patch[key] = {_ITEMS: {
+                str(index): diff(a, b)
+                for index, (a, b) in enumerate(zip(previous, value)) if a != b
+            }}
+        else:
+            patch[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        patch[_DELETED] = removed
+    return patch
+
+
+def apply_patch(target: Dict, patch: Dict) -> Dict:
+    """
+    Aplica un parche de diff() y devuelve un diccionario nuevo
+
+    No modifica `target`: los valores sin cambios se comparten con él.
+    """
+    result = dict(target)
+    for key, value in patch.items():
+        if key == _DELETED:
+            for removed in value:
+                result.pop(removed, None)
+            continue
+        current = result.get(key)
+        if isinstance(value, dict) and isinstance(current, dict):
+            result[key] = apply_patch(current, value)
+        elif isinstance(value, dict) and isinstance(current, list) and _ITEMS in value:
+            items = list(current)
+            for index, item_patch in value[_ITEMS].items():
+                items[int(index)] = apply_patch(items[int(index)], item_patch)
+            result[key] = items
+        else:
+            result[key] = value
+    return result
+
+
+def _rig_key(rig: Dict) -> str:
+    return str(rig.get('rigId') or rig.get('name'))
+
+
+def _local_date(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d')
+
+
+def parse_timestamp(value: str) -> int:
+    """
+    Convierte 'YYYY-MM-DD HH:MM[:SS]', ISO 8601 o segundos epoch a segundos epoch
+
+    Las fechas sin zona se interpretan en hora local, igual que el campo
+    timestamp de export_stats.py.
+    """
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value.replace(' ', 'T')).timestamp())
+
+
+class SnapshotArchive:
+    """
+    Snapshots de get_rigs en <directorio>/<YYYY-MM-DD>.snap.gz + .idx
+
+    Cada snapshot es un frame JSON comprimido como miembro gzip
+    independiente. Un keyframe guarda el snapshot completo
+    ({t, meta, miningRigs}); un delta guarda solo lo que cambió respecto del
+    frame anterior ({t, meta, changed, added, removed}). El primer frame de
+    cada día es siempre un keyframe, así los días se pueden borrar o copiar
+    por separado.
+    """
+
+    def __init__(self, directory: str, keyframe_interval: Optional[int] = None, compresslevel: int = 6):
+        """
+        Inicializa el archivo
+
+        Args:
+            directory: Carpeta del archivo (se crea si no existe)
+            keyframe_interval: Frames como máximo entre dos keyframes
+                (por defecto config.SNAPSHOT_KEYFRAME_INTERVAL)
+            compresslevel: Nivel de compresión gzip (1-9)
+        """
+        self.directory = directory
+        self.keyframe_interval = max(1, keyframe_interval or config.SNAPSHOT_KEYFRAME_INTERVAL)
+        self.compresslevel = compresslevel
+        # Último estado escrito: (día, frames en el índice, meta, rigs por id)
+        self._last = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _data_path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{date}.snap.gz")
+
+    def _index_path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{date}.idx")
+
+    def days(self) -> List[str]:
+        """Días con snapshots, en orden"""
+        return sorted(
+            name[:-4] for name in os.listdir(self.directory)
+            if name.endswith('.idx')
+        )
+
+    def frames(self, date: str) -> List[Tuple[int, int, int, bool]]:
+        """
+        Lee el índice de un día
+
+        Returns:
+            Lista de (timestamp, desplazamiento, longitud, es keyframe) en orden de escritura
+        """
+        try:
+            with open(self._index_path(date), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        # Ignorar un registro final incompleto (escritura interrumpida)
+        raw = raw[:len(raw) - len(raw) % INDEX_RECORD.size]
+        return [(ts, offset, length, bool(key)) for ts, offset, length, key in INDEX_RECORD.iter_unpack(raw)]
+
+    # --- Escritura --------------------------------------------------------
+
+    def append(self, payload: Dict, timestamp: Optional[float] = None) -> Dict:
+        """
+        Agrega un snapshot de get_rigs al día correspondiente
+
+        Args:
+            payload: Respuesta de get_rigs (con miningRigs)
+            timestamp: Segundos epoch del snapshot (por defecto ahora)
+
+        Returns:
+            Diccionario con date, keyframe, bytes (comprimidos), changed y rigs
+        """
+        ts = int(timestamp if timestamp is not None else datetime.now().timestamp())
+        date = _local_date(ts)
+        frames = self.frames(date)
+        if frames and ts < frames[-1][0]:
+            raise ValueError(f"El snapshot {ts} es anterior al último archivado del {date}")
+
+        meta = {key: value for key, value in payload.items() if key != 'miningRigs'}
+        rigs = {_rig_key(rig): rig for rig in payload.get('miningRigs', [])}
+
+        keyframe = not frames or self._frames_since_keyframe(frames) >= self.keyframe_interval
+        if keyframe:
+            frame = {'t': ts, 'meta': meta, 'miningRigs': list(rigs.values())}
+            changed = len(rigs)
+        else:
+            frame, changed = self._delta_frame(ts, self._state_at_end(date, frames), meta, rigs)
+
+        data = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)
+        raw = data.compress(json.dumps(frame, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        raw += data.flush()
+
+        with open(self._data_path(date), 'ab') as f:
+            offset = f.tell()
+            f.write(raw)
+        with open(self._index_path(date), 'ab') as f:
+            f.write(INDEX_RECORD.pack(ts, offset, len(raw), 1 if keyframe else 0))
+
+        self._last = (date, len(frames) + 1, meta, rigs)
+        return {'date': date, 'keyframe': keyframe, 'bytes': len(raw), 'changed': changed, 'rigs': len(rigs)}
+
+    @staticmethod
+    def _frames_since_keyframe(frames: List[Tuple[int, int, int, bool]]) -> int:
+        count = 0
+        for frame in reversed(frames):
+            if frame[3]:
+                return count + 1
+            count += 1
+        return count
+
+    def _state_at_end(self, date: str, frames: List[Tuple[int, int, int, bool]]) -> Tuple[Dict, Dict]:
+        """Estado (meta, rigs) tras el último frame del día; reutiliza el de la última escritura"""
+        if self._last is not None and self._last[0] == date and self._last[1] == len(frames):
+            return self._last[2], self._last[3]
+        return self._replay(date, frames, len(frames) - 1)
+
+    @staticmethod
+    def _delta_frame(ts: int, previous: Tuple[Dict, Dict], meta: Dict, rigs: Dict) -> Tuple[Dict, int]:
+        old_meta, old_rigs = previous
+        frame = {'t': ts}
+        meta_patch = diff(old_meta, meta)
+        if meta_patch:
+            frame['meta'] = meta_patch
+        changed = {}
+        added = []
+        for key, rig in rigs.items():
+            old = old_rigs.get(key)
+            if old is None:
+                added.append(rig)
+            elif old != rig:
+                changed[key] = diff(old, rig)
+        removed = [key for key in old_rigs if key not in rigs]
+        if changed:
+            frame['changed'] = changed
+        if added:
+            frame['added'] = added
+        if removed:
+            frame['removed'] = removed
+        return frame, len(changed) + len(added) + len(removed)
+
+    # --- Lectura ----------------------------------------------------------
+
+    def _read_frames(self, date: str, frames: List[Tuple[int, int, int, bool]],
+                     start: int, end: int) -> Iterator[Dict]:
+        """Descomprime los frames start..end (inclusive) de un día"""
+        with open(self._data_path(date), 'rb') as f:
+            for _, offset, length, _ in frames[start:end + 1]:
+                f.seek(offset)
+                yield json.loads(zlib.decompress(f.read(length), 31))
+
+    @staticmethod
+    def _keyframe_before(frames: List[Tuple[int, int, int, bool]], position: int) -> int:
+        while position > 0 and not frames[position][3]:
+            position -= 1
+        return position
+
+    def _replay(self, date: str, frames: List[Tuple[int, int, int, bool]], position: int) -> Tuple[Dict, Dict]:
+        """Reconstruye (meta, rigs) del frame `position` desde el keyframe anterior"""
+        meta, rigs = {}, {}
+        start = self._keyframe_before(frames, position)
+        for frame in self._read_frames(date, frames, start, position):
+            meta, rigs = self._apply_frame(frame, meta, rigs)
+        return meta, rigs
+
+    @staticmethod
+    def _apply_frame(frame: Dict, meta: Dict, rigs: Dict) -> Tuple[Dict, Dict]:
+        if 'miningRigs' in frame:
+            return frame['meta'], {_rig_key(rig): rig for rig in frame['miningRigs']}
+        if 'meta' in frame:
+            meta = apply_patch(meta, frame['meta'])
+        rigs = dict(rigs)
+        for key in frame.get('removed', ()):
+            rigs.pop(key, None)
+        for key, patch in frame.get('changed', {}).items():
+            rigs[key] = apply_patch(rigs[key], patch)
+        for rig in frame.get('added', ()):
+            rigs[_rig_key(rig)] = rig
+        return meta, rigs
+
+    def locate(self, timestamp: float) -> Optional[Tuple[str, int]]:
+        """
+        Busca el último snapshot tomado en o antes de `timestamp`
+
+        Returns:
+            Tupla (día, posición en el índice), o None si no hay ninguno anterior
+        """
+        date = _local_date(timestamp)
+        days = self.days()
+        for day in reversed(days[:bisect.bisect_right(days, date)]):
+            frames = self.frames(day)
+            position = bisect.bisect_right([frame[0] for frame in frames], timestamp) - 1
+            if position >= 0:
+                return day, position
+        return None
+
+    def snapshot_at(self, timestamp: float) -> Optional[Dict]:
+        """
+        Reconstruye el snapshot vigente en `timestamp`
+
+        Returns:
+            {'timestamp': segundos epoch, 'rigs': payload con la forma de get_rigs}, o None
+        """
+        found = self.locate(timestamp)
+        if found is None:
+            return None
+        date, position = found
+        frames = self.frames(date)
+        meta, rigs = self._replay(date, frames, position)
+        return {'timestamp': frames[position][0], 'rigs': dict(meta, miningRigs=list(rigs.values()))}
+
+    def iter_rigs(self, timestamp: float, fields: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """
+        Recorre los rigs del snapshot vigente en `timestamp`
+
+        Si ese snapshot es un keyframe se parsea en streaming mientras se
+        descomprime; si es un delta se reconstruye desde el keyframe anterior
+        (solo los frames de ese tramo, no el día entero).
+
+        Args:
+            timestamp: Segundos epoch
+            fields: Campos de cada rig a conservar (None = rig completo)
+        """
+        found = self.locate(timestamp)
+        if found is None:
+            return
+        date, position = found
+        frames = self.frames(date)
+        if frames[position][3]:
+            yield from RigStream(self._stream_frame(date, frames[position]), fields)
+            return
+        _, rigs = self._replay(date, frames, position)
+        for rig in rigs.values():
+            yield rig if fields is None else {field: rig.get(field) for field in fields}
+
+    def _stream_frame(self, date: str, frame: Tuple[int, int, int, bool]) -> Iterator[bytes]:
+        """Bytes descomprimidos de un frame, por trozos"""
+        _, offset, length, _ = frame
+        decompressor = zlib.decompressobj(31)
+        with open(self._data_path(date), 'rb') as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                raw = f.read(min(_READ_SIZE, remaining))
+                if not raw:
+                    break
+                remaining -= len(raw)
+                chunk = decompressor.decompress(raw)
+                if chunk:
+                    yield chunk
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    def iter_day(self, date: str) -> Iterator[Tuple[int, Dict]]:
+        """
+        Recorre todos los snapshots de un día en orden
+
+        Returns:
+            Iterador de (timestamp, payload con la forma de get_rigs)
+        """
+        frames = self.frames(date)
+        meta, rigs = {}, {}
+        for frame in self._read_frames(date, frames, 0, len(frames) - 1) if frames else ():
+            meta, rigs = self._apply_frame(frame, meta, rigs)
+            yield frame['t'], dict(meta, miningRigs=list(rigs.values()))
+
+    # --- Mantenimiento ----------------------------------------------------
+
+    def import_json(self, json_file: str) -> bool:
+        """
+        Importa una exportación de export_stats.py ({timestamp, rigs})
+
+        Args:
+            json_file: Archivo JSON exportado
+
+        Returns:
+            True si se archivó el snapshot
+        """
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rigs = data.get('rigs') or {}
+        if 'miningRigs' not in rigs or 'timestamp' not in data:
+            return False
+        self.append(rigs, parse_timestamp(data['timestamp']))
+        return True
+
+    def prune(self, keep_from: str) -> int:
+        """
+        Borra los días anteriores a una fecha
+
+        Args:
+            keep_from: Primer día a conservar (YYYY-MM-DD)
+
+        Returns:
+            Cantidad de días borrados
+        """
+        removed = 0
+        for date in self.days():
+            if date < keep_from:
+                for path in (self._data_path(date), self._index_path(date)):
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        self._last = None
+        return removed
+
+    def info(self) -> Dict:
+        """Días, snapshots, keyframes y bytes ocupados del archivo"""
+        days = self.days()
+        frames = [frame for date in days for frame in self.frames(date)]
+        size = sum(
+            os.path.getsize(path)
+            for date in days for path in (self._data_path(date), self._index_path(date))
+            if os.path.exists(path)
+        )
+        return {
+            'days': len(days),
+            'snapshots': len(frames),
+            'keyframes': sum(1 for frame in frames if frame[3]),
+            'bytes': size,
+            'first': frames[0][0] if frames else None,
+            'last': frames[-1][0] if frames else None,
+        }
+
+
+def import_exports(archive: SnapshotArchive, paths: Sequence[str]) -> int:
+    """
+    Importa exportaciones JSON en orden (archivos o carpetas con nicehash_stats_*.json)
+
+    Args:
+        archive: Archivo de destino
+        paths: Archivos JSON o carpetas
+
+    Returns:
+        Cantidad de snapshots importados
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, 'nicehash_stats_*.json')))
+        else:
+            files.extend(glob.glob(path) or [path])
+
+    imported = 0
+    # Los nombres de exportar_diario.ps1 (fecha_hora) ordenan cronológicamente
+    for json_file in sorted(files):
+        try:
+            if archive.import_json(json_file):
+                imported += 1
+                print(f"  ✓ {json_file}")
+            else:
+                print(f"  ⚠️  {json_file}: sin miningRigs, omitido")
+        except Exception as e:
+            print(f"  ⚠️  {json_file}: {e}")
+    return imported
+
+
+def main():
+    args = sys.argv[1:]
+    directory = config.SNAPSHOT_ARCHIVE_DIR
+    if '--archive' in args:
+        index = args.index('--archive')
+        directory = args[index + 1] if index + 1 < len(args) else directory
+        del args[index:index + 2]
+
+    command = args[0] if args else 'info'
+    archive = SnapshotArchive(directory)
+
+    if command == 'import':
+        imported = import_exports(archive, args[1:] or ['reportes'])
+        print(f"\n✅ Snapshots importados: {imported}")
+    elif command == 'show':
+        when = parse_timestamp(args[1]) if len(args) > 1 else int(datetime.now().timestamp())
+        snapshot = archive.snapshot_at(when)
+        if snapshot is None:
+            print(f"❌ No hay snapshots anteriores a {args[1] if len(args) > 1 else 'ahora'}")
+            return
+        rigs = snapshot['rigs']['miningRigs']
+        active = sum(1 for rig in rigs if rig.get('minerStatus') == 'MINING')
+        print(f"\n📅 Snapshot: {datetime.fromtimestamp(snapshot['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"🖥️  Rigs: {len(rigs)} total, {active} activos, {len(rigs) - active} offline")
+    elif command == 'prune':
+        days = int(args[1]) if len(args) > 1 else 30
+        keep_from = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        print(f"🧹 Días borrados: {archive.prune(keep_from)}")
+    else:
+        info = archive.info()
+        print(f"\n🗜️  Archivo {directory}/")
+        print(f"   Días: {info['days']}  Snapshots: {info['snapshots']}  Keyframes: {info['keyframes']}")
+        print(f"   Espacio utilizado: {info['bytes'] / 1024:.1f} KB")
+        if info['first'] is not None:
+            print(f"   Desde {datetime.fromtimestamp(info['first']):%Y-%m-%d %H:%M} "
+                  f"hasta {datetime.fromtimestamp(info['last']):%Y-%m-%d %H:%M}")
+
+
+if __name__ == "__main__":
+    main()
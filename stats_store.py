@@ -0,0 +1,206 @@
+"""
+Almacén binario de estadísticas de flota (total/activos/offline por check)
+Un archivo por día con registros de ancho fijo: agregar una lectura es O(1)
+y los resúmenes diarios/horarios se calculan sobre columnas array
+"""
+import bisect
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# timestamp (segundos epoch), total, activos, offline: 4 enteros de 64 bits
+RECORD = struct.Struct('<4q')
+COLUMNS = ('timestamp', 'total', 'active', 'offline')
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(values: array) -> Dict:
+    """
+    Resumen de una columna: promedio, mínimo, máximo y percentiles
+    
+    Args:
+        values: Columna de valores
+        
+    Returns:
+        Diccionario con avg, min, max, p50, p90 y p99
+    """
+    if not values:
+        return {'avg': 0.0, 'min': 0, 'max': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0}
+    ordered = sorted(values)
+    return {
+        'avg': sum(values) / len(values),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'p50': _percentile(ordered, 50),
+        'p90': _percentile(ordered, 90),
+        'p99': _percentile(ordered, 99)
+    }
+
+
+class StatsStore:
+    """Columnas de lecturas de flota guardadas en <directorio>/<YYYY-MM-DD>.bin"""
+    
+    def __init__(self, directory: str):
+        """
+        Inicializa el almacén
+        
+        Args:
+            directory: Carpeta donde se guarda un archivo binario por día
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    def _day_path(self, date: str) -> str:
+        return os.path.join(self.directory, f"{date}.bin")
+    
+    def append(self, date: str, timestamp: int, total: int, active: int, offline: int):
+        """
+        Agrega una lectura al archivo del día (append de 32 bytes)
+        
+        Args:
+            date: Día local de la lectura (YYYY-MM-DD)
+            timestamp: Segundos epoch de la lectura
+            total: Rigs totales
+            active: Rigs minando
+            offline: Rigs caídos
+        """
+        with open(self._day_path(date), 'ab') as f:
+            f.write(RECORD.pack(timestamp, total, active, offline))
+    
+    def days(self) -> List[str]:
+        """Días con datos, en orden"""
+        return sorted(
+            name[:-4] for name in os.listdir(self.directory)
+            if name.endswith('.bin')
+        )
+    
+    def read_day(self, date: str) -> Optional[Dict[str, array]]:
+        """
+        Lee un día completo como columnas
+        
+        Args:
+            date: Día (YYYY-MM-DD)
+            
+        Returns:
+            Diccionario columna → array, o None si no hay datos
+        """
+        try:
+            with open(self._day_path(date), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        
+        # Ignorar un registro final incompleto (escritura interrumpida)
+        raw = raw[:len(raw) - len(raw) % RECORD.size]
+        if not raw:
+            return None
+        
+        # Los registros son enteros contiguos: cada columna es un slice con paso
+        values = array('q')
+        values.frombytes(raw)
+        if sys.byteorder == 'big':
+            values.byteswap()
+        return {name: values[i::len(COLUMNS)] for i, name in enumerate(COLUMNS)}
+    
+    def daily_rollup(self, date: str) -> Optional[Dict]:
+        """
+        Resumen del día: cantidad de lecturas y avg/min/max/percentiles por columna
+        
+        Returns:
+            {'checks': n, 'total': {...}, 'active': {...}, 'offline': {...}} o None
+        """
+        columns = self.read_day(date)
+        if columns is None:
+            return None
+        return {
+            'checks': len(columns['timestamp']),
+            **{name: summarize(columns[name]) for name in COLUMNS[1:]}
+        }
+    
+    def hourly_rollup(self, date: str, tz=None) -> Dict[int, Dict]:
+        """
+        Resumen por hora del día
+        
+        Args:
+            date: Día (YYYY-MM-DD)
+            tz: Zona horaria para agrupar las horas (por defecto la local)
+            
+        Returns:
+            Diccionario hora (0-23) → resumen con el formato de daily_rollup
+        """
+        columns = self.read_day(date)
+        if columns is None:
+            return {}
+        
+        # Las lecturas están ordenadas por tiempo: cada hora es un slice por bisect
+        timestamps = columns['timestamp']
+        day_start = datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=tz)
+        hours = {}
+        
+        for hour in range(24):
+            start = bisect.bisect_left(timestamps, (day_start + timedelta(hours=hour)).timestamp())
+            end = bisect.bisect_left(timestamps, (day_start + timedelta(hours=hour + 1)).timestamp())
+            if start < end:
+                hours[hour] = {
+                    'checks': end - start,
+                    **{name: summarize(columns[name][start:end]) for name in COLUMNS[1:]}
+                }
+        return hours
+    
+    def prune(self, keep_from: str) -> int:
+        """
+        Borra los días anteriores a una fecha
+        
+        Args:
+            keep_from: Primer día a conservar (YYYY-MM-DD)
+            
+        Returns:
+            Cantidad de días borrados
+        """
+        removed = 0
+        for date in self.days():
+            if date < keep_from:
+                os.remove(self._day_path(date))
+                removed += 1
+        return removed
+    
+    def import_json(self, json_file: str, tz=None) -> int:
+        """
+        Importa el formato anterior (daily_stats.json) y lo renombra a .migrated
+        
+        Args:
+            json_file: Archivo con {fecha: [{timestamp, total, active, offline}, ...]}
+            tz: Zona horaria de los timestamps 'YYYY-MM-DD HH:MM'
+            
+        Returns:
+            Cantidad de lecturas importadas
+        """
+        try:
+            with open(json_file, 'r') as f:
+                stats = json.load(f)
+        except FileNotFoundError:
+            return 0
+        
+        imported = 0
+        for date, readings in sorted(stats.items()):
+            for reading in readings:
+                moment = datetime.strptime(reading['timestamp'], '%Y-%m-%d %H:%M').replace(tzinfo=tz)
+                self.append(date, int(moment.timestamp()),
+                            reading['total'], reading['active'], reading['offline'])
+                imported += 1
+        
+        os.replace(json_file, f"{json_file}.migrated")
+        return imported
@@ -2,12 +2,34 @@
 Bot de Telegram para monitorear rigs de NiceHash
 Envía notificaciones cuando los rigs cambian de estado (activo/caído)
 """
+import os
 import time
-import json
+import threading
 import requests
 from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 from nicehash_client import NiceHashClient
+from rate_limiter import parse_retry_after
+from telegram_outbox import Outbox, SEPARATOR, split_message
+from stats_store import StatsStore
+from hashrate_history import HashrateHistory
+from models import Fleet
+from rig_state import RigStateEngine, ChangeSet
+from alert_rules import Alert, AlertEngine
+from rig_details import DISPLAYED_REASONS, REASONS, RigDetailFetcher
+from fleet_index import FleetIndex, SubnetChange, location_label
+from outage_detector import OutageDetector, OutageReport
+from uptime_ledger import UptimeLedger, format_duration
+import metrics
 from config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, ACCOUNT_NAME
+import config
+
+# Subredes listadas como máximo en consola y en los reportes
+SUBNET_LINES = 10
+
+# Rigs con mejor y peor uptime en el reporte diario
+UPTIME_LINES = 5
 
 # Zona horaria de Paraguay (GMT-3)
 PARAGUAY_TZ = timezone(timedelta(hours=-3))
@@ -18,271 +40,696 @@ def get_paraguay_time():
 
 
 class TelegramNotifier:
-    """Clase para enviar notificaciones a Telegram"""
+    """
+    Clase para enviar notificaciones a Telegram
+    
+    send_message() solo encola el mensaje: un hilo en segundo plano lo envía
+    por una sesión keep-alive, agrupando los mensajes que se acumulan en un
+    único sendMessage (hasta 4096 caracteres), respetando el intervalo mínimo
+    entre envíos al chat y el retry_after de las respuestas 429. Los mensajes
+    no entregados quedan en la cola en disco y se envían en la siguiente
+    ejecución.
+    """
     
-    def __init__(self, bot_token: str, chat_id: str):
+    def __init__(self, bot_token: str, chat_id: str, outbox_file: Optional[str] = None,
+                 min_interval: Optional[float] = None):
         """
         Inicializa el notificador de Telegram
         
         Args:
             bot_token: Token del bot de Telegram
             chat_id: ID del chat donde enviar mensajes
+            outbox_file: Fichero de mensajes pendientes (por defecto config.TELEGRAM_OUTBOX_FILE; "" = sin persistir)
+            min_interval: Segundos mínimos entre envíos al chat (por defecto config.TELEGRAM_MIN_INTERVAL)
         """
         self.bot_token = bot_token
         self.chat_id = chat_id
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
+        self.base_url = f"{config.TELEGRAM_API_URL}/bot{bot_token}"
+        self.min_interval = config.TELEGRAM_MIN_INTERVAL if min_interval is None else min_interval
+        self.timeout = (config.HTTP_CONNECT_TIMEOUT, config.TELEGRAM_READ_TIMEOUT)
+        
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        
+        if outbox_file is None:
+            outbox_file = config.TELEGRAM_OUTBOX_FILE
+        self.outbox = Outbox(outbox_file or None, max_age=config.TELEGRAM_OUTBOX_MAX_AGE)
+        
+        self.sent = 0
+        self.requests = 0
+        self.failed = 0
+        self.rate_limited = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_total = 0.0
+        
+        self._next_send = 0.0
+        self._unbatch = 0
+        self._closing = threading.Event()
+        self._worker = None
+        self._lock = threading.Lock()
+        
+        if len(self.outbox):
+            self._start_worker()
+    
+    def _start_worker(self):
+        """Arranca el hilo de envío si no está corriendo"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._closing.clear()
+                self._worker = threading.Thread(target=self._run, name='telegram', daemon=True)
+                self._worker.start()
     
     def send_message(self, message: str) -> bool:
         """
-        Envía un mensaje a Telegram
+        Encola un mensaje para Telegram (no bloquea)
         
         Args:
             message: Texto del mensaje
             
         Returns:
-            True si se envió correctamente, False en caso contrario
+            True si el mensaje quedó encolado
         """
         try:
-            url = f"{self.base_url}/sendMessage"
-            data = {
-                "chat_id": self.chat_id,
-                "text": message,
-                "parse_mode": "HTML"
-            }
-            response = requests.post(url, json=data)
-            response.raise_for_status()
+            self.outbox.put(message)
+            self._start_worker()
             return True
         except Exception as e:
-            print(f"❌ Error al enviar mensaje a Telegram: {e}")
+            print(f"❌ Error al encolar mensaje de Telegram: {e}")
             return False
+    
+    def deliver(self, message: str) -> bool:
+        """
+        Envía un mensaje en el momento, sin pasar por la cola
+        
+        Args:
+            message: Texto del mensaje
+            
+        Returns:
+            True si se envió correctamente, False en caso contrario
+        """
+        for part in split_message(message):
+            while True:
+                status, retry_after = self._post(part)
+                if status == 'ok':
+                    break
+                if status == 'retry' and retry_after is not None and retry_after <= 60:
+                    time.sleep(retry_after)
+                    continue
+                return False
+        return True
+    
+    def _post(self, text: str):
+        """
+        Hace un sendMessage
+        
+        Returns:
+            Tupla (resultado, espera): 'ok', 'retry' (429, 5xx o error de red; espera
+            es el retry_after si Telegram lo indicó) o 'rejected' (error permanente)
+        """
+        self.requests += 1
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/sendMessage",
+                json={"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"},
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            if metrics.enabled:
+                metrics.TELEGRAM_SEND.observe(time.perf_counter() - started, status=type(e).__name__)
+            print(f"⚠️  Error de red al enviar mensaje a Telegram: {e}")
+            return 'retry', None
+        if metrics.enabled:
+            metrics.TELEGRAM_SEND.observe(time.perf_counter() - started, status=str(response.status_code))
+        
+        if response.status_code == 429:
+            self.rate_limited += 1
+            try:
+                retry_after = float(response.json().get('parameters', {}).get('retry_after', 1))
+            except ValueError:
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) or 1.0
+            print(f"⏳ Telegram pide esperar {retry_after:.0f}s (429)")
+            return 'retry', retry_after
+        if response.status_code >= 500:
+            print(f"⚠️  Telegram respondió {response.status_code}, se reintentará")
+            return 'retry', None
+        if response.status_code >= 400:
+            print(f"❌ Error al enviar mensaje a Telegram: {response.status_code} {response.text[:200]}")
+            return 'rejected', None
+        return 'ok', None
+    
+    def _run(self):
+        """Hilo de envío: toma lotes de la cola y los entrega respetando los límites"""
+        failures = 0
+        while True:
+            batch = self.outbox.next_batch(max_messages=1 if self._unbatch else None, timeout=1.0)
+            if not batch:
+                if self._closing.is_set():
+                    return
+                continue
+            
+            # Intervalo mínimo entre mensajes al mismo chat
+            wait = self._next_send - time.monotonic()
+            if wait > 0 and self._closing.wait(wait):
+                return
+            
+            status, retry_after = self._post(SEPARATOR.join(text for _, _, text in batch))
+            self._next_send = time.monotonic() + self.min_interval
+            
+            if status == 'ok':
+                failures = 0
+                self.outbox.ack(seq for seq, _, _ in batch)
+                self._unbatch = max(0, self._unbatch - 1)
+                now = time.time()
+                for _, ts, _ in batch:
+                    latency = now - ts
+                    self.latency_last = latency
+                    self.latency_max = max(self.latency_max, latency)
+                    self.latency_total += latency
+                self.sent += len(batch)
+            elif status == 'rejected':
+                if len(batch) > 1:
+                    # Algún mensaje del lote es inválido: reenviarlos de a uno
+                    self._unbatch = len(batch)
+                else:
+                    self.outbox.ack([batch[0][0]])
+                    self._unbatch = max(0, self._unbatch - 1)
+                    self.failed += 1
+            else:
+                failures += 1
+                delay = retry_after if retry_after is not None else min(60.0, 2.0 ** failures)
+                if self._closing.wait(delay):
+                    return
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que se entreguen los mensajes encolados
+        
+        Args:
+            timeout: Segundos máximos de espera
+            
+        Returns:
+            True si la cola quedó vacía
+        """
+        if not len(self.outbox):
+            return True
+        self._start_worker()
+        return self.outbox.wait_empty(timeout)
+    
+    def close(self, timeout: Optional[float] = None):
+        """
+        Vacía la cola (hasta `timeout` segundos) y detiene el hilo de envío
+        
+        Lo que no se haya podido entregar queda en el fichero de pendientes.
+        """
+        if timeout is None:
+            timeout = config.TELEGRAM_FLUSH_TIMEOUT
+        if not self.flush(timeout):
+            print(f"⚠️  {len(self.outbox)} mensaje(s) de Telegram quedan pendientes para la próxima ejecución")
+        self._closing.set()
+        self.outbox.wake()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+        self.session.close()
+    
+    def stats(self) -> Dict:
+        """
+        Métricas de entrega
+        
+        Returns:
+            Diccionario con profundidad de la cola, mensajes entregados, envíos
+            (un envío puede agrupar varios mensajes), fallos, 429 y latencia
+            desde que se encoló cada mensaje hasta que se entregó
+        """
+        return {
+            'queue_depth': len(self.outbox),
+            'sent': self.sent,
+            'requests': self.requests,
+            'failed': self.failed,
+            'dropped': self.outbox.dropped,
+            'rate_limited': self.rate_limited,
+            'latency_last': self.latency_last,
+            'latency_avg': self.latency_total / self.sent if self.sent else 0.0,
+            'latency_max': self.latency_max,
+        }
+    
+    def summary(self) -> str:
+        """Resumen de una línea de las métricas de entrega"""
+        s = self.stats()
+        return (f"{s['sent']} mensajes en {s['requests']} envíos, {s['queue_depth']} en cola, "
+                f"{s['failed']} fallidos, {s['rate_limited']} x 429, "
+                f"latencia prom {s['latency_avg']:.1f}s (máx {s['latency_max']:.1f}s)")
 
 
 class RigMonitor:
     """Clase para monitorear el estado de los rigs"""
     
-    def __init__(self, notifier: TelegramNotifier):
+    def __init__(self, notifier: TelegramNotifier, client: Optional[NiceHashClient] = None,
+                 account_name: Optional[str] = None, data_dir: Optional[str] = None,
+                 check_once: bool = False):
         """
         Inicializa el monitor de rigs
         
         Args:
             notifier: Instancia de TelegramNotifier
+            client: Cliente de la cuenta a monitorear (por defecto el de las credenciales del .env)
+            account_name: Nombre de la cuenta en los mensajes (por defecto config.ACCOUNT_NAME)
+            data_dir: Directorio de estados y estadísticas (por defecto el directorio actual)
+            check_once: El proceso hace una sola verificación (--check-once): solo
+                se descarga el detalle que se muestra, porque la caché no sobrevive
         """
-        self.client = NiceHashClient()
+        self.client = client or NiceHashClient()
         self.notifier = notifier
-        self.previous_states = {}
-        self.state_file = "rig_states.json"
-        self.stats_file = "daily_stats.json"
+        self.account_name = account_name or ACCOUNT_NAME
+        self.data_dir = data_dir or ""
+        if self.data_dir:
+            os.makedirs(self.data_dir, exist_ok=True)
+        self.state_file = os.path.join(self.data_dir, "rig_states.json")
+        self.stats_file = os.path.join(self.data_dir, "daily_stats.json")
+        self.stats_store = StatsStore(os.path.join(self.data_dir, "daily_stats"))
+        self.hashrate_history = HashrateHistory(os.path.join(self.data_dir, "hashrate_history.bin"))
+        self.alert_engine = AlertEngine(state_file=os.path.join(self.data_dir, "alert_state.json"))
+        self.rig_details = (RigDetailFetcher(self.client, reasons=DISPLAYED_REASONS if check_once else REASONS)
+                            if config.RIG_DETAILS_ENABLED else None)
+        self.fleet_index = FleetIndex()
+        self._indexed_payload = None
+        self.outage_detector = (OutageDetector(os.path.join(self.data_dir, "outage_state.json"))
+                                if config.ALERT_OUTAGES else None)
+        self.uptime_ledger = UptimeLedger(os.path.join(self.data_dir, "uptime_ledger"))
+        self.last_counts = None
         self.load_states()
+        self.migrate_stats()
+    
+    @property
+    def previous_states(self):
+        """Último estado conocido de cada rig (nombre → minerStatus)"""
+        return self.state_engine.states
     
     def load_states(self):
-        """Carga los estados previos desde archivo"""
-        try:
-            with open(self.state_file, 'r') as f:
-                self.previous_states = json.load(f)
-            print(f"✓ Estados previos cargados: {len(self.previous_states)} rigs")
-        except FileNotFoundError:
+        """Carga los estados previos (foto compactada + journal de cambios)"""
+        self.state_engine = RigStateEngine(self.state_file)
+        if self.state_engine.states:
+            print(f"✓ Estados previos cargados: {len(self.state_engine.states)} rigs")
+        else:
             print("ℹ️  No se encontró archivo de estados previos, comenzando desde cero")
-            self.previous_states = {}
+    
+    def update_states(self, fleet: Fleet):
+        """
+        Aplica el snapshot al motor de estados e imprime los cambios
+        
+        Args:
+            fleet: Snapshot decodificado
+            
+        Returns:
+            ChangeSet con rigs nuevos, caídos, recuperados, eliminados y oscilantes
+        """
+        changes = self.state_engine.apply(
+            ((rig.name, rig.status) for rig in fleet),
+            complete=not fleet.partial
+        )
+        
+        for name, status in changes.new:
+            print(f"  📋 {name}: {status} (nuevo)")
+        for name, previous, status in changes.recovered:
+            print(f"  ✅ {name}: {previous} → {status}")
+        for name, previous, status in changes.down + changes.changed:
+            print(f"  🔴 {name}: {previous} → {status}")
+        for name, previous in changes.removed:
+            print(f"  🗑️  {name}: ya no aparece en la API (último estado {previous})")
+        if changes.flapping:
+            print(f"  🔁 Rigs oscilando: {', '.join(changes.flapping)}")
+        
+        return changes
+    
+    def process_alerts(self, fleet: Fleet, changes: ChangeSet):
+        """
+        Evalúa las reglas de alerta y notifica las nuevas y las resueltas
+        
+        El mensaje de alertas se encola antes de consultar nada más. Después
+        se descarga el detalle por dispositivo (ver rig_details.py) de los
+        rigs que cambiaron, se desvían de su hashrate habitual o tienen
+        alertas en este check, y el de estos últimos se envía en un mensaje
+        de seguimiento.
+        
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de este check
+        """
+        try:
+            with metrics.phase('alerts'):
+                alerts = self.alert_engine.evaluate(fleet, changes, self.state_engine, self.fleet_index)
+                if self.outage_detector is not None:
+                    # Las alertas de rigs dentro de un corte se reemplazan por la del corte
+                    alerts = self.outage_detector.alerts(alerts, self.fleet_index)
+                fired, resolved = self.alert_engine.dispatch(alerts)
+            
+            message = AlertEngine.format_message(self.account_name, fired, resolved)
+            if message:
+                self.notifier.send_message(message)
+                print(f"  🚨 Alertas: {len(fired)} nuevas, {len(resolved)} resueltas, "
+                      f"{len(self.alert_engine.active)} activas")
+        except Exception as e:
+            print(f"⚠️  Error al evaluar alertas: {e}")
+            return
+        
+        if self.rig_details is not None:
+            with metrics.phase('rig_details'):
+                details = self.collect_rig_details(fleet, changes, fired)
+            message = AlertEngine.format_details(self.account_name, fired, details)
+            if message:
+                self.notifier.send_message(message)
+    
+    def collect_rig_details(self, fleet: Fleet, changes: ChangeSet, fired: List[Alert]) -> Dict[str, str]:
+        """
+        Resumen del detalle de los rigs relevantes; sin detalle si la consulta falla
+        
+        Solo cuentan como alertados los rigs que entran en el mensaje, y se
+        omiten los que están dentro de un corte.
+        """
+        try:
+            alerted = [alert.rig for alert in AlertEngine.shown(fired) if alert.rig]
+            skip = self.outage_detector.members if self.outage_detector is not None else ()
+            return self.rig_details.collect(fleet, changes, self.hashrate_history, alerted, skip)
+        except Exception as e:
+            print(f"⚠️  Error al obtener el detalle de los rigs: {e}")
+            return {}
+    
+    def update_fleet_index(self, fleet: Fleet, changes: ChangeSet, rigs_data: dict) -> List[SubnetChange]:
+        """
+        Aplica el check al índice grupo → subred → rig e imprime las subredes que cambiaron
+        
+        Returns:
+            Subredes cuya cantidad de rigs activos cambió en este check
+        """
+        try:
+            subnet_changes = self.fleet_index.update(fleet, changes)
+            self._indexed_payload = rigs_data
+        except Exception as e:
+            print(f"⚠️  Error al actualizar el índice de la flota: {e}")
+            self.fleet_index.clear()
+            self._indexed_payload = None
+            return []
+        
+        for change in subnet_changes[:SUBNET_LINES]:
+            if change.delta < 0:
+                print(f"  📉 Subred {change.label}: perdió {-change.delta} rigs ({change.active}/{change.total} activos)")
+            else:
+                print(f"  📈 Subred {change.label}: recuperó {change.delta} rigs ({change.active}/{change.total} activos)")
+        return subnet_changes
+    
+    def detect_outages(self, fleet: Fleet, changes: ChangeSet) -> Optional[OutageReport]:
+        """
+        Correlaciona las caídas del check por subred y grupo y sigue el hashrate
+        por algoritmo (ver outage_detector.py)
+        
+        Returns:
+            OutageReport del check, o None si el detector está desactivado o falla
+        """
+        if self.outage_detector is None:
+            return None
+        try:
+            report = self.outage_detector.observe(fleet, changes, self.fleet_index)
         except Exception as e:
-            print(f"⚠️  Error al cargar estados: {e}")
-            self.previous_states = {}
+            print(f"⚠️  Error al correlacionar caídas: {e}")
+            return None
+        
+        for outage in report.started:
+            print(f"  ⚡ Corte en {outage.label}: {outage.rigs} de {outage.total} rigs cayeron juntos")
+        for outage in report.ended:
+            print(f"  🔌 Fin del corte en {outage.label}")
+        if report.started and report.individual:
+            print(f"  🔴 Fallas individuales fuera de cortes: {len(report.individual)}")
+        for anomaly in report.anomalies:
+            print(f"  📉 {anomaly.algorithm}: hashrate {anomaly.drop:.0f}% bajo su media (z={anomaly.z:.1f})")
+        return report
+    
+    def format_outages(self) -> str:
+        """Sección del reporte con los cortes activos (solo el más amplio de cada zona)"""
+        detector = self.outage_detector
+        if detector is None or not detector.active:
+            return ""
+        section = f"\n\n⚡ <b>Cortes activos:</b>"
+        for outage in detector.active.values():
+            if detector.covering((outage.group, outage.subnet)) is outage:
+                since = datetime.fromtimestamp(outage.since, PARAGUAY_TZ).strftime('%H:%M')
+                section += f"\n• {outage.label}: {outage.rigs} de {outage.total} rigs desde las {since}"
+        return section
+    
+    def format_subnets(self, subnet_changes: Optional[List[SubnetChange]] = None,
+                       index: Optional[FleetIndex] = None) -> str:
+        """
+        Sección del reporte con las subredes que perdieron rigs en este check y
+        las que tienen más rigs sin minar (lecturas O(1) del índice)
+        
+        Args:
+            subnet_changes: Cambios por subred de este check
+            index: Índice a consultar (por defecto el del monitor)
+        """
+        index = index or self.fleet_index
+        sections = []
+        losses = [change for change in subnet_changes or () if change.delta < 0]
+        if losses:
+            section = f"📉 <b>Caídas por subred:</b>"
+            for change in losses[:SUBNET_LINES]:
+                section += f"\n• {change.label} perdió {-change.delta} rigs ({change.active}/{change.total} activos)"
+            sections.append(section)
+        
+        worst = index.worst_subnets(SUBNET_LINES)
+        if worst and len(index.subnets) > 1:
+            section = f"🌐 <b>Subredes con rigs offline:</b>"
+            for group, subnet, node in worst:
+                section += f"\n• {location_label(group, subnet)}: {node.offline} de {node.total}"
+            sections.append(section)
+        return "".join("\n\n" + section for section in sections)
     
-    def save_states(self):
-        """Guarda los estados actuales a archivo"""
+    def migrate_stats(self):
+        """Convierte el daily_stats.json anterior al almacén binario, si existe"""
         try:
-            with open(self.state_file, 'w') as f:
-                json.dump(self.previous_states, f, indent=2)
+            imported = self.stats_store.import_json(self.stats_file, PARAGUAY_TZ)
+            if imported:
+                print(f"✓ Estadísticas migradas a {self.stats_store.directory}/: {imported} lecturas")
         except Exception as e:
-            print(f"⚠️  Error al guardar estados: {e}")
+            print(f"⚠️  Error al migrar estadísticas: {e}")
     
     def save_hourly_stats(self, total, active, offline):
         """Guarda estadísticas horarias para el reporte diario"""
         try:
-            current_date = get_paraguay_time().strftime('%Y-%m-%d')
-            current_hour = get_paraguay_time().strftime('%Y-%m-%d %H:%M')
-            
-            # Cargar estadísticas existentes
-            stats = {}
-            try:
-                with open(self.stats_file, 'r') as f:
-                    stats = json.load(f)
-            except FileNotFoundError:
-                pass
-            
-            # Inicializar día si no existe
-            if current_date not in stats:
-                stats[current_date] = []
-            
-            # Agregar datos de esta hora
-            stats[current_date].append({
-                'timestamp': current_hour,
-                'total': total,
-                'active': active,
-                'offline': offline
-            })
-            
-            # Guardar
-            with open(self.stats_file, 'w') as f:
-                json.dump(stats, f, indent=2)
-            
+            now = get_paraguay_time()
+            self.stats_store.append(
+                now.strftime('%Y-%m-%d'),
+                int(now.timestamp()),
+                total,
+                active,
+                offline
+            )
         except Exception as e:
             print(f"⚠️  Error al guardar estadísticas: {e}")
     
+    def save_hashrate_history(self, fleet: Fleet):
+        """Registra las métricas de miningRigs[].stats[] en el histórico de hashrate"""
+        try:
+            self.hashrate_history.record(fleet, time.time())
+            self.hashrate_history.save()
+        except Exception as e:
+            print(f"⚠️  Error al guardar histórico de hashrate: {e}")
+    
+    def record_uptime(self, fleet: Fleet, changes: ChangeSet):
+        """Registra las transiciones del check en el registro de uptime"""
+        try:
+            self.uptime_ledger.observe(fleet, changes)
+        except Exception as e:
+            print(f"⚠️  Error al registrar el uptime: {e}")
+    
+    def format_uptime(self, start: float, end: float) -> str:
+        """
+        Sección del reporte diario con los rigs de mejor y peor uptime del rango
+        
+        Args:
+            start: Inicio del rango (segundos epoch)
+            end: Fin del rango (segundos epoch)
+        """
+        stats = self.uptime_ledger.fleet_stats(start, end)
+        if not stats:
+            return ""
+        average = sum(item.uptime for item in stats) / len(stats)
+        perfect = sum(1 for item in stats if not item.down)
+        leaders, laggards = self.uptime_ledger.ranking(start, end, UPTIME_LINES)
+        
+        message = f"\n\n⏱️ <b>Uptime por rig:</b> {average:.1f}% promedio, {perfect} de {len(stats)} sin caídas"
+        if leaders and perfect < len(stats):
+            message += f"\n🏆 <b>Mejores:</b>"
+            for item in leaders:
+                message += f"\n• {item.name}: {item.uptime:.1f}%"
+        if laggards:
+            message += f"\n🐢 <b>Peores:</b>"
+            for item in laggards:
+                message += (f"\n• {item.name}: {item.uptime:.1f}% ({format_duration(item.down)} caído, "
+                            f"{item.failures} caídas, MTTR {format_duration(item.mttr)})")
+        return message
+    
     def send_daily_report(self):
         """Envía el reporte diario con promedios del día anterior"""
         try:
             yesterday = (get_paraguay_time() - timedelta(days=1)).strftime('%Y-%m-%d')
             
-            # Cargar estadísticas
-            try:
-                with open(self.stats_file, 'r') as f:
-                    stats = json.load(f)
-            except FileNotFoundError:
-                print("⚠️  No hay estadísticas para generar reporte diario")
-                return
+            rollup = self.stats_store.daily_rollup(yesterday)
             
-            if yesterday not in stats:
+            if not rollup:
                 print(f"⚠️  No hay datos para {yesterday}")
                 return
             
-            day_stats = stats[yesterday]
-            
-            if not day_stats:
-                print(f"⚠️  No hay datos para {yesterday}")
-                return
-            
-            # Calcular promedios
-            total_checks = len(day_stats)
-            avg_total = sum(s['total'] for s in day_stats) / total_checks
-            avg_active = sum(s['active'] for s in day_stats) / total_checks
-            avg_offline = sum(s['offline'] for s in day_stats) / total_checks
+            total_checks = rollup['checks']
+            active = rollup['active']
             
             # Preparar mensaje
-            message = f"📊 <b>Resumen Diario - {ACCOUNT_NAME}</b>\n\n"
+            message = f"📊 <b>Resumen Diario - {self.account_name}</b>\n\n"
             message += f"📅 <b>Fecha:</b> {yesterday}\n"
             message += f"🕐 <b>Generado:</b> {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
             message += f"📈 <b>Promedios del Día:</b>\n"
-            message += f"• Total de Rigs: {avg_total:.0f}\n"
-            message += f"• Activos: {avg_active:.0f} (promedio)\n"
-            message += f"• Offline: {avg_offline:.0f} (promedio)\n\n"
+            message += f"• Total de Rigs: {rollup['total']['avg']:.0f}\n"
+            message += f"• Activos: {active['avg']:.0f} (promedio)\n"
+            message += f"• Offline: {rollup['offline']['avg']:.0f} (promedio)\n"
+            message += f"• Activos mín/máx: {active['min']} / {active['max']}\n\n"
             message += f"📋 <b>Lecturas:</b> {total_checks} checks durante el día"
             
+            day_start = datetime.strptime(yesterday, '%Y-%m-%d').replace(tzinfo=PARAGUAY_TZ).timestamp()
+            message += self.format_uptime(day_start, day_start + 86400)
+            
             self.notifier.send_message(message)
             print("✓ Reporte diario enviado")
             
             # Limpiar datos antiguos (mantener solo últimos 7 días)
             cutoff_date = (get_paraguay_time() - timedelta(days=7)).strftime('%Y-%m-%d')
-            stats = {k: v for k, v in stats.items() if k >= cutoff_date}
-            
-            with open(self.stats_file, 'w') as f:
-                json.dump(stats, f, indent=2)
+            self.stats_store.prune(cutoff_date)
+            self.uptime_ledger.compact(time.time() - config.UPTIME_LEDGER_DAYS * 86400)
             
         except Exception as e:
             print(f"❌ Error al enviar reporte diario: {e}")
     
-    def check_rigs(self):
-        """Verifica el estado de todos los rigs y envía notificaciones si hay cambios"""
+    def check_rigs(self, rigs_data: dict = None, send_report: bool = True):
+        """
+        Verifica el estado de todos los rigs y envía notificaciones si hay cambios
+        
+        Args:
+            rigs_data: Respuesta de get_rigs ya descargada (por defecto se consulta la API)
+            send_report: Si es True, envía el reporte de estado a Telegram
+        """
         try:
             print(f"\n[{get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}] Verificando rigs...")
             
-            rigs_data = self.client.get_rigs()
+            if rigs_data is None:
+                with metrics.phase('fetch'):
+                    rigs_data = self.client.get_rigs()
             
             if 'miningRigs' not in rigs_data:
                 print("⚠️  No se encontraron rigs")
                 return
             
-            rigs = rigs_data['miningRigs']
-            current_time = get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')
+            with metrics.phase('decode'):
+                fleet = Fleet.from_api(rigs_data)
+                current_time = get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')
+                
+                # Contadores (columna de estados)
+                active_count = fleet.columns.active_count()
+                offline_count = len(fleet) - active_count
+                self.last_counts = (len(fleet), active_count, offline_count)
+            
+            # Comparar con el estado previo y guardar solo los cambios
+            with metrics.phase('states'):
+                changes = self.update_states(fleet)
             
-            # Contadores
-            active_count = 0
-            offline_count = 0
+            # Índice grupo → subred → rig (contadores por subred sin recorrer la flota)
+            with metrics.phase('index'):
+                subnet_changes = self.update_fleet_index(fleet, changes, rigs_data)
             
-            # Listas para rigs que cambiaron
-            rigs_caidos = []
-            rigs_recuperados = []
+            # Caídas simultáneas por subred/grupo y anomalías de hashrate
+            with metrics.phase('outages'):
+                self.detect_outages(fleet, changes)
             
-            for rig in rigs:
-                rig_name = rig.get('name', 'Sin nombre')
-                rig_status = rig.get('minerStatus', 'UNKNOWN')
-                
-                # Contar estados
-                if rig_status == 'MINING':
-                    active_count += 1
-                else:
-                    offline_count += 1
-                
-                # Verificar cambios de estado
-                previous_status = self.previous_states.get(rig_name)
-                
-                if previous_status is None:
-                    # Primera vez que vemos este rig
-                    self.previous_states[rig_name] = rig_status
-                    print(f"  📋 {rig_name}: {rig_status} (nuevo)")
-                    
-                elif previous_status != rig_status:
-                    # El estado cambió
-                    self.previous_states[rig_name] = rig_status
-                    
-                    if rig_status == 'MINING':
-                        # Rig volvió a estar activo
-                        rigs_recuperados.append(rig_name)
-                        print(f"  ✅ {rig_name}: {previous_status} → {rig_status}")
-                    else:
-                        # Rig se cayó
-                        rigs_caidos.append(rig_name)
-                        print(f"  🔴 {rig_name}: {previous_status} → {rig_status}")
-            
-            # Guardar estados actualizados
-            self.save_states()
+            # Reglas de alerta (offline prolongado, rechazo, caída de la flota)
+            # con el detalle de los rigs afectados
+            self.process_alerts(fleet, changes)
             
             # Guardar estadísticas horarias
-            self.save_hourly_stats(len(rigs), active_count, offline_count)
+            with metrics.phase('hourly_stats'):
+                self.save_hourly_stats(len(fleet), active_count, offline_count)
+            
+            # Guardar hashrate por rig y algoritmo
+            with metrics.phase('hashrate_history'):
+                self.save_hashrate_history(fleet)
+            
+            # Intervalos de estado por rig (uptime, MTBF/MTTR)
+            with metrics.phase('uptime'):
+                self.record_uptime(fleet, changes)
             
             # Resumen
-            print(f"  ✓ Total: {len(rigs)} rigs")
+            print(f"  ✓ Total: {len(fleet)} rigs")
             print(f"  ✅ Activos: {active_count}")
             print(f"  ❌ Offline: {offline_count}")
             
             # Enviar mensaje siempre (cada hora)
-            message = f"📊 <b>Reporte de Estado - {ACCOUNT_NAME}</b>\n\n"
-            message += f"🕐 <b>Hora:</b> {current_time}\n\n"
-            message += f"📈 <b>Estado Actual:</b>\n"
-            message += f"• Total: {len(rigs)}\n"
-            message += f"• Activos: {active_count}\n"
-            message += f"• Offline: {offline_count}"
-            
-            self.notifier.send_message(message)
+            if send_report:
+                message = f"📊 <b>Reporte de Estado - {self.account_name}</b>\n\n"
+                message += f"🕐 <b>Hora:</b> {current_time}\n\n"
+                message += f"📈 <b>Estado Actual:</b>\n"
+                message += f"• Total: {len(fleet)}\n"
+                message += f"• Activos: {active_count}\n"
+                message += f"• Offline: {offline_count}"
+                message += self.format_outages()
+                message += self.format_subnets(subnet_changes)
+                
+                with metrics.phase('notify'):
+                    self.notifier.send_message(message)
             
-            if rigs_caidos or rigs_recuperados:
-                print(f"  🔔 Cambios detectados: {len(rigs_caidos) + len(rigs_recuperados)}")
+            if changes.transitions or changes.removed:
+                print(f"  🔔 Cambios detectados: {changes.transitions + len(changes.removed)}")
             else:
                 print(f"  ℹ️  Sin cambios detectados")
                 
         except Exception as e:
-            print(f"❌ Error al verificar rigs: {e}")
-            error_message = f"🚨 <b>Error en el Monitor</b>\n\n"
-            error_message += f"⚠️ Error: {str(e)}\n"
-            error_message += f"🕐 Hora: {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}"
-            self.notifier.send_message(error_message)
-    
-    def send_status_report(self):
-        """Envía un reporte del estado actual de todos los rigs"""
+            self.send_error(e)
+    
+    def send_error(self, error: Exception):
+        """Informa por Telegram de un error durante la verificación"""
+        print(f"❌ Error al verificar rigs: {error}")
+        error_message = f"🚨 <b>Error en el Monitor</b>\n\n"
+        error_message += f"⚠️ Error: {str(error)}\n"
+        error_message += f"🕐 Hora: {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}"
+        self.notifier.send_message(error_message)
+    
+    def send_status_report(self, rigs_data: dict = None):
+        """
+        Envía un reporte del estado actual de todos los rigs
+        
+        Args:
+            rigs_data: Respuesta de get_rigs ya descargada (por defecto se consulta la API)
+        """
         try:
-            rigs_data = self.client.get_rigs()
+            if rigs_data is None:
+                rigs_data = self.client.get_rigs()
             
             if 'miningRigs' not in rigs_data:
                 return
             
-            rigs = rigs_data['miningRigs']
-            active_rigs = [r for r in rigs if r.get('minerStatus') == 'MINING']
-            offline_rigs = [r for r in rigs if r.get('minerStatus') != 'MINING']
+            fleet = Fleet.from_api(rigs_data)
+            active_count = fleet.columns.active_count()
+            self.last_counts = (len(fleet), active_count, len(fleet) - active_count)
             
-            message = f"📊 <b>Reporte de Estado - {ACCOUNT_NAME}</b>\n\n"
+            message = f"📊 <b>Reporte de Estado - {self.account_name}</b>\n\n"
             message += f"🕐 <b>Hora:</b> {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            message += f"📈 <b>Total de Rigs:</b> {len(rigs)}\n"
-            message += f"✅ <b>Activos:</b> {len(active_rigs)}\n"
-            message += f"❌ <b>Offline:</b> {len(offline_rigs)}\n"
+            message += f"📈 <b>Total de Rigs:</b> {len(fleet)}\n"
+            message += f"✅ <b>Activos:</b> {active_count}\n"
+            message += f"❌ <b>Offline:</b> {len(fleet) - active_count}"
+            
+            # El índice del monitor ya está al día si check_rigs procesó este
+            # mismo snapshot; si no, se arma uno aparte para no desfasarlo
+            index = self.fleet_index
+            if self._indexed_payload is not rigs_data:
+                index = FleetIndex()
+                index.build(fleet)
+            message += self.format_subnets(index=index)
             
             self.notifier.send_message(message)
             print("✓ Reporte de estado enviado")
@@ -300,14 +747,33 @@ def main():
     send_report = '--send-report' in sys.argv
     daily_report = '--daily-report' in sys.argv
     
+    # Modo multi-cuenta: --accounts archivo.json (o NICEHASH_ACCOUNTS_FILE)
+    accounts_file = config.ACCOUNTS_FILE
+    if '--accounts' in sys.argv:
+        index = sys.argv.index('--accounts')
+        accounts_file = sys.argv[index + 1] if index + 1 < len(sys.argv) else 'accounts.json'
+    
+    run_mode = ('daily-report' if daily_report else 'send-report' if send_report
+                else 'check-once' if check_once else 'daemon')
+    
     print("\n╔" + "═" * 58 + "╗")
     print("║" + " " * 10 + "NICEHASH RIG MONITOR - TELEGRAM" + " " * 17 + "║")
     print("╚" + "═" * 58 + "╝\n")
     
+    if accounts_file:
+        import multi_account
+        try:
+            multi_account.run(accounts_file, check_once, send_report, daily_report)
+        except Exception as e:
+            print(f"\n❌ Error fatal: {e}")
+        metrics.emit_json_line(f"{run_mode}:accounts")
+        return
+    
+    notifier = None
     try:
         # Inicializar notificador y monitor
         notifier = TelegramNotifier(TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID)
-        monitor = RigMonitor(notifier)
+        monitor = RigMonitor(notifier, check_once=check_once)
         
         print("✓ Monitor inicializado correctamente")
         print(f"✓ Bot de Telegram configurado")
@@ -331,39 +797,15 @@ def main():
             # Modo GitHub Actions: una sola verificación
             print("🔄 Modo GitHub Actions: Verificación única\n")
             monitor.check_rigs()
+            print(f"⏱️  API: {monitor.client.request_stats.summary()}")
             print("\n✓ Verificación completada")
             return
         
-        # Modo continuo: monitoreo permanente
-        # Enviar mensaje de inicio
-        start_message = "🤖 <b>Monitor de Rigs Iniciado</b>\n\n"
-        start_message += f"✅ El bot está activo y monitoreando tus rigs\n"
-        start_message += f"🕐 Inicio: {get_paraguay_time().strftime('%Y-%m-%d %H:%M:%S')}"
-        notifier.send_message(start_message)
-        
-        # Configuración
-        CHECK_INTERVAL = 60  # Segundos entre verificaciones (1 minuto)
-        REPORT_INTERVAL = 3600  # Segundos entre reportes (1 hora)
-        
-        print(f"⏱️  Intervalo de verificación: {CHECK_INTERVAL} segundos")
-        print(f"📊 Reporte automático cada: {REPORT_INTERVAL // 60} minutos")
-        print("\n🔄 Iniciando monitoreo... (Presiona Ctrl+C para detener)\n")
-        print("=" * 60)
+        # Modo continuo: demonio asyncio de ritmo fijo (verificación, reporte
+        # horario y resumen diario en un solo proceso)
+        from monitor_daemon import run_daemon
+        run_daemon(monitor)
         
-        last_report_time = time.time()
-        
-        while True:
-            # Verificar rigs
-            monitor.check_rigs()
-            
-            # Enviar reporte periódico
-            if time.time() - last_report_time >= REPORT_INTERVAL:
-                monitor.send_status_report()
-                last_report_time = time.time()
-            
-            # Esperar antes de la siguiente verificación
-            time.sleep(CHECK_INTERVAL)
-            
     except KeyboardInterrupt:
         print("\n\n⏹️  Monitor detenido por el usuario")
         try:
@@ -380,6 +822,12 @@ def main():
             notifier.send_message(error_message)
         except:
             pass
+    finally:
+        # Entregar lo que quede en la cola de Telegram antes de salir
+        if notifier is not None:
+            notifier.close()
+            print(f"📨 Telegram: {notifier.summary()}")
+        metrics.emit_json_line(run_mode)
 
 
 if __name__ == "__main__":
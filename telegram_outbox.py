@@ -0,0 +1,211 @@
+"""
+Cola de salida de mensajes de Telegram
+Guarda los mensajes pendientes en orden (y en disco, para no perderlos si el
+proceso termina) y los agrupa en lotes que respetan el límite de 4096
+caracteres de sendMessage
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+
+# Longitud máxima del texto de sendMessage
+TELEGRAM_MAX_LENGTH = 4096
+
+# Separador entre mensajes agrupados en un mismo envío
+SEPARATOR = "\n\n"
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_LENGTH) -> List[str]:
+    """
+    Divide un mensaje largo en partes de como máximo `limit` caracteres
+
+    Corta por saltos de línea para no partir etiquetas HTML; una línea que
+    por sí sola supera el límite se corta a la fuerza.
+
+    Args:
+        text: Texto del mensaje
+        limit: Longitud máxima de cada parte
+
+    Returns:
+        Lista de partes (una sola si el mensaje ya cabe)
+    """
+    if len(text) <= limit:
+        return [text]
+
+    parts = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if current:
+                parts.append(current)
+                current = ""
+            parts.append(line[:limit])
+            line = line[limit:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > limit:
+            parts.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+class Outbox:
+    """
+    Cola FIFO de mensajes pendientes, segura entre hilos
+
+    Cada entrada es (número de secuencia, instante de encolado, texto). Los
+    productores llaman a put(); el worker de envío toma lotes con next_batch()
+    y, solo cuando el envío se confirma, los retira por número con ack(). Así
+    un desborde de la cola mientras un lote está en vuelo no hace que ack()
+    retire mensajes que no se enviaron. Si se indica un fichero, la cola
+    se reescribe en él (JSONL, reemplazo atómico) en cada cambio y se recarga
+    al crearla.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_size: int = 500, max_age: float = 86400):
+        """
+        Args:
+            path: Fichero JSONL donde persistir los pendientes (None = solo en memoria)
+            max_size: Mensajes pendientes como máximo; al superarlo se descartan los más antiguos
+            max_age: Segundos tras los cuales un mensaje recargado de disco ya no se envía
+        """
+        self.path = path
+        self.max_size = max_size
+        self.max_age = max_age
+        self.dropped = 0
+        self._entries = deque()
+        self._next_seq = 0
+        self._cond = threading.Condition()
+        self._load()
+
+    def _load(self):
+        """Recupera los mensajes que quedaron sin enviar en la ejecución anterior"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        cutoff = time.time() - self.max_age
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = json.loads(line)
+                    if entry['t'] >= cutoff:
+                        self._append(entry['t'], entry['text'])
+                    else:
+                        self.dropped += 1
+            if self._entries:
+                print(f"✓ Mensajes de Telegram pendientes recuperados: {len(self._entries)}")
+        except Exception as e:
+            print(f"⚠️  Error al leer la cola de Telegram {self.path}: {e}")
+
+    def _persist(self):
+        """Reescribe el fichero con los pendientes (se llama con el lock tomado)"""
+        if not self.path:
+            return
+        try:
+            if not self._entries:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for _, ts, text in self._entries:
+                    f.write(json.dumps({'t': ts, 'text': text}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️  Error al guardar la cola de Telegram: {e}")
+
+    def _append(self, ts: float, text: str):
+        self._entries.append((self._next_seq, ts, text))
+        self._next_seq += 1
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._entries)
+
+    def put(self, text: str):
+        """Encola un mensaje (dividido en partes si supera el límite de Telegram)"""
+        now = time.time()
+        with self._cond:
+            for part in split_message(text):
+                self._append(now, part)
+            while len(self._entries) > self.max_size:
+                self._entries.popleft()
+                self.dropped += 1
+            self._persist()
+            self._cond.notify_all()
+
+    def next_batch(self, max_messages: Optional[int] = None,
+                   timeout: Optional[float] = None) -> List[Tuple[int, float, str]]:
+        """
+        Devuelve los primeros mensajes pendientes que caben en un solo envío
+
+        No los retira de la cola: hay que confirmar con ack() (con sus números
+        de secuencia) tras enviarlos.
+
+        Args:
+            max_messages: Mensajes por lote como máximo (None = los que quepan)
+            timeout: Segundos a esperar si la cola está vacía
+
+        Returns:
+            Lista de (número de secuencia, instante de encolado, texto); vacía
+            si venció el timeout
+        """
+        with self._cond:
+            if not self._entries:
+                self._cond.wait(timeout)
+            batch = []
+            length = 0
+            for seq, ts, text in self._entries:
+                extra = len(text) + (len(SEPARATOR) if batch else 0)
+                if batch and (length + extra > TELEGRAM_MAX_LENGTH
+                              or (max_messages and len(batch) >= max_messages)):
+                    break
+                batch.append((seq, ts, text))
+                length += extra
+            return batch
+
+    def ack(self, seqs: Iterable[int]):
+        """
+        Retira de la cola los mensajes entregados o descartados
+
+        Los que ya salieron de la cola por desborde se ignoran.
+
+        Args:
+            seqs: Números de secuencia devueltos por next_batch()
+        """
+        seqs = set(seqs)
+        with self._cond:
+            # Un lote es un prefijo de la cola y el desborde solo quita del frente
+            while self._entries and self._entries[0][0] in seqs:
+                self._entries.popleft()
+            self._persist()
+            self._cond.notify_all()
+
+    def wait_empty(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que la cola se vacíe
+
+        Returns:
+            True si quedó vacía antes del timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._entries:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def wake(self):
+        """Despierta al worker que espera en next_batch()"""
+        with self._cond:
+            self._cond.notify_all()
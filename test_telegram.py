@@ -91,7 +91,7 @@ def test_telegram_config():
         test_message += "✅ Si recibes este mensaje, tu bot de Telegram está correctamente configurado!\n\n"
         test_message += "🎉 Ya puedes usar el monitor de rigs con Telegram"
         
-        success = notifier.send_message(test_message)
+        success = notifier.deliver(test_message)
         
         if success:
             print("  ✓ Mensaje enviado correctamente")
@@ -0,0 +1,514 @@
+"""
+Registro de disponibilidad (uptime) por rig
+Cada check agrega al journal solo las transiciones (rig, instante, arriba /
+caído / fuera de la API) y un latido. En memoria cada rig guarda sus
+intervalos en columnas array con sumas prefijas, así uptime %, MTBF y MTTR de
+cualquier rango se responden con bisect en O(log n); las caídas cerradas
+forman un índice ordenado por fin con un árbol de mínimos de inicio para
+responder "quién estuvo caído entre T1 y T2" en O((k + 1) log n)
+"""
+import math
+import os
+import struct
+import sys
+import time
+from bisect import bisect_left, bisect_right
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import Fleet, STATUS_MINING
+from rig_state import ChangeSet, MINING
+
+# instante (segundos epoch), número de rig, estado
+RECORD = struct.Struct('<dIB')
+
+# Número de rig reservado para los latidos (un registro por check)
+HEARTBEAT = 0xFFFFFFFF
+
+# Estados de un intervalo; GONE (el rig no aparece en la API) no cuenta para el uptime
+DOWN, UP, GONE = 0, 1, 2
+
+
+@dataclass
+class UptimeStats:
+    """Disponibilidad de un rig en un rango"""
+    name: str
+    up: float
+    down: float
+    failures: int
+
+    @property
+    def observed(self) -> float:
+        return self.up + self.down
+
+    @property
+    def uptime(self) -> float:
+        """% del tiempo observado en que el rig estuvo minando"""
+        return self.up / self.observed * 100 if self.observed > 0 else 0.0
+
+    @property
+    def mtbf(self) -> Optional[float]:
+        """Tiempo medio minando entre caídas (segundos)"""
+        return self.up / self.failures if self.failures else None
+
+    @property
+    def mttr(self) -> Optional[float]:
+        """Tiempo medio caído por caída (segundos)"""
+        return self.down / self.failures if self.failures else None
+
+
+class RigIntervals:
+    """
+    Intervalos contiguos de un rig: el i-ésimo va de starts[i] a starts[i + 1]
+    (el último sigue abierto). up_before/down_before acumulan los segundos de
+    los intervalos anteriores y failures las caídas hasta el i-ésimo inclusive.
+    """
+
+    __slots__ = ('starts', 'states', 'up_before', 'down_before', 'failures')
+
+    def __init__(self):
+        self.starts = array('d')
+        self.states = array('B')
+        self.up_before = array('d')
+        self.down_before = array('d')
+        self.failures = array('I')
+
+    @property
+    def state(self) -> Optional[int]:
+        return self.states[-1] if self.states else None
+
+    def append(self, start: float, state: int):
+        up = down = 0.0
+        failures = 0
+        if self.starts:
+            length = start - self.starts[-1]
+            previous = self.states[-1]
+            up = self.up_before[-1] + (length if previous == UP else 0.0)
+            down = self.down_before[-1] + (length if previous == DOWN else 0.0)
+            failures = self.failures[-1] + (state == DOWN and previous == UP)
+        self.starts.append(start)
+        self.states.append(state)
+        self.up_before.append(up)
+        self.down_before.append(down)
+        self.failures.append(failures)
+
+    def totals(self, when: float, now: float) -> Tuple[float, float, int]:
+        """(segundos arriba, segundos caído, caídas) acumulados hasta `when` (O(log n))"""
+        when = min(when, now)
+        i = bisect_right(self.starts, when) - 1
+        if i < 0:
+            return 0.0, 0.0, 0
+        partial = when - self.starts[i]
+        state = self.states[i]
+        return (self.up_before[i] + (partial if state == UP else 0.0),
+                self.down_before[i] + (partial if state == DOWN else 0.0),
+                self.failures[i])
+
+
+class DownIndex:
+    """
+    Caídas cerradas ordenadas por fin, con un árbol de segmentos del inicio
+    mínimo: las que terminan después de T1 son un sufijo (bisect) y dentro de
+    él se bajan solo las ramas con algún inicio anterior a T2.
+    """
+
+    def __init__(self):
+        self.ends = array('d')
+        self.starts = array('d')
+        self.owners = array('I')
+        self._size = 1
+        self._tree = array('d', [math.inf, math.inf])
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def _rebuild(self):
+        size = 1
+        while size < len(self.ends):
+            size *= 2
+        tree = array('d', [math.inf]) * (2 * size)
+        tree[size:size + len(self.starts)] = self.starts
+        for node in range(size - 1, 0, -1):
+            tree[node] = min(tree[2 * node], tree[2 * node + 1])
+        self._size = size
+        self._tree = tree
+
+    def append(self, start: float, end: float, owner: int):
+        if self.ends and end < self.ends[-1]:
+            # Fuera de orden (no ocurre con instantes monótonos): insertar y rearmar
+            position = bisect_right(self.ends, end)
+            self.ends.insert(position, end)
+            self.starts.insert(position, start)
+            self.owners.insert(position, owner)
+            self._rebuild()
+            return
+        self.ends.append(end)
+        self.starts.append(start)
+        self.owners.append(owner)
+        if len(self.ends) > self._size:
+            self._rebuild()
+            return
+        node = self._size + len(self.ends) - 1
+        tree = self._tree
+        tree[node] = start
+        node //= 2
+        while node and start < tree[node]:
+            tree[node] = start
+            node //= 2
+
+    def _collect(self, node: int, lo: int, hi: int, first: int, limit: float, out: List[int]):
+        if hi <= first or self._tree[node] > limit:
+            return
+        if hi - lo == 1:
+            out.append(lo)
+            return
+        mid = (lo + hi) // 2
+        self._collect(2 * node, lo, mid, first, limit, out)
+        self._collect(2 * node + 1, mid, hi, first, limit, out)
+
+    def overlapping(self, start: float, end: float) -> List[int]:
+        """Posiciones de las caídas que se solapan con [start, end]"""
+        first = bisect_left(self.ends, start)
+        positions: List[int] = []
+        if first < len(self.ends):
+            self._collect(1, 0, self._size, first, end, positions)
+        return positions
+
+
+class UptimeLedger:
+    """
+    Intervalos de estado por rig guardados en <directorio>/journal.bin
+    (registros de 13 bytes) y rigs.txt (un nombre por línea; la línea es el
+    número de rig del journal)
+
+    Los instantes son monótonos: una transición se ubica en su statusTime,
+    acotado entre el check anterior y el actual. Entre dos checks se asume que
+    el rig siguió en el último estado visto.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Args:
+            directory: Carpeta del registro (None = solo en memoria)
+        """
+        self.directory = directory
+        self.clear()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.load()
+
+    def clear(self):
+        self.names: List[str] = []
+        self.numbers: Dict[str, int] = {}
+        self.rigs: List[RigIntervals] = []
+        self.down_index = DownIndex()
+        # rig → inicio de su caída abierta, en orden de inicio
+        self.open_downs: Dict[int, float] = {}
+        self.first_check: Optional[float] = None
+        self.last_check: Optional[float] = None
+        self._last_time = -math.inf
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, 'journal.bin')
+
+    @property
+    def names_path(self) -> str:
+        return os.path.join(self.directory, 'rigs.txt')
+
+    # --- Carga y escritura -------------------------------------------------
+
+    def load(self):
+        """Reconstruye los intervalos a partir del journal"""
+        try:
+            if os.path.exists(self.names_path):
+                with open(self.names_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        self._register(line.rstrip('\n'))
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb') as f:
+                    raw = f.read()
+                # Un registro incompleto al final (escritura cortada) se descarta
+                raw = raw[:len(raw) - len(raw) % RECORD.size]
+                for when, number, state in RECORD.iter_unpack(raw):
+                    if number == HEARTBEAT:
+                        self._heartbeat(when)
+                    elif number < len(self.rigs):
+                        self._apply(number, when, state)
+        except Exception as e:
+            print(f"⚠️  Error al cargar el registro de uptime: {e}")
+            self.clear()
+
+    def _write(self, records: List[Tuple[float, int, int]], new_names: List[str]):
+        if not self.directory:
+            return
+        try:
+            if new_names:
+                with open(self.names_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(f"{name}\n" for name in new_names))
+            with open(self.journal_path, 'ab') as f:
+                f.write(b''.join(RECORD.pack(*record) for record in records))
+        except Exception as e:
+            print(f"⚠️  Error al guardar el registro de uptime: {e}")
+
+    def compact(self, keep_from: float) -> int:
+        """
+        Reescribe el journal sin lo anterior a `keep_from` (cada rig conserva
+        su estado en ese instante)
+
+        Returns:
+            Registros descartados
+        """
+        records = []
+        dropped = 0
+        for number, rig in enumerate(self.rigs):
+            first = bisect_right(rig.starts, keep_from)
+            if first > 0:
+                dropped += first - 1
+                records.append((max(rig.starts[first - 1], keep_from), number, rig.states[first - 1]))
+            records.extend((rig.starts[i], number, rig.states[i]) for i in range(first, len(rig.starts)))
+        if not dropped:
+            return 0
+        if self.last_check is not None:
+            records.append((self.last_check, HEARTBEAT, 0))
+        records.sort(key=lambda record: (record[0], record[1] == HEARTBEAT))
+
+        if self.directory:
+            tmp_path = f"{self.journal_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(b''.join(RECORD.pack(*record) for record in records))
+            os.replace(tmp_path, self.journal_path)
+        names = list(self.names)
+        self.clear()
+        for name in names:
+            self._register(name)
+        self.load_records(records)
+        return dropped
+
+    def load_records(self, records: Iterable[Tuple[float, int, int]]):
+        """Aplica registros ya leídos (mismo formato que el journal)"""
+        for when, number, state in records:
+            if number == HEARTBEAT:
+                self._heartbeat(when)
+            else:
+                self._apply(number, when, state)
+
+    # --- Registro ------------------------------------------------------------
+
+    def _register(self, name: str) -> int:
+        number = self.numbers.get(name)
+        if number is None:
+            number = self.numbers[name] = len(self.names)
+            self.names.append(sys.intern(name))
+            self.rigs.append(RigIntervals())
+        return number
+
+    def _heartbeat(self, when: float):
+        when = max(when, self._last_time)
+        self._last_time = when
+        if self.first_check is None:
+            self.first_check = when
+        self.last_check = when
+
+    def _apply(self, number: int, when: float, state: int) -> bool:
+        """Agrega una transición; False si el rig ya estaba en ese estado"""
+        rig = self.rigs[number]
+        if rig.state == state:
+            return False
+        when = max(when, self._last_time)
+        self._last_time = when
+        if rig.state == DOWN:
+            self.down_index.append(self.open_downs.pop(number), when, number)
+        if state == DOWN:
+            self.open_downs[number] = when
+        rig.append(when, state)
+        return True
+
+    def observe(self, fleet: Fleet, changes: Optional[ChangeSet] = None,
+                now: Optional[float] = None) -> int:
+        """
+        Registra un check: en el primero, el estado de toda la flota (desde su
+        statusTime); después, solo las transiciones del ChangeSet
+
+        Args:
+            fleet: Snapshot decodificado
+            changes: Cambios de estado de este check
+            now: Instante del check (por defecto time.time())
+
+        Returns:
+            Transiciones registradas
+        """
+        now = time.time() if now is None else now
+        previous_check = self.last_check
+        transitions: Dict[str, int] = {}
+        if previous_check is None or not self.names:
+            transitions = {rig.name: UP if rig.status_code == STATUS_MINING else DOWN for rig in fleet}
+            previous_check = None
+        elif changes is not None:
+            for name, status in changes.new:
+                transitions[name] = UP if status == MINING else DOWN
+            for name, _, status in changes.down + changes.recovered + changes.changed:
+                transitions[name] = UP if status == MINING else DOWN
+            for name, _ in changes.removed:
+                transitions[name] = GONE
+
+        pending = []
+        if transitions:
+            # statusTime de la API, acotado entre el check anterior y el actual
+            status_times = {rig.name: rig.status_time for rig in fleet if rig.name in transitions}
+            lower = previous_check if previous_check is not None else -math.inf
+            for name, state in transitions.items():
+                when = status_times.get(name, 0) / 1000
+                when = min(max(when, lower), now) if when > 0 else now
+                pending.append((when, name, state))
+            pending.sort()
+
+        records = []
+        new_names = []
+        for when, name, state in pending:
+            if name not in self.numbers:
+                new_names.append(name)
+            number = self._register(name)
+            if self._apply(number, when, state):
+                records.append((self.rigs[number].starts[-1], number, state))
+        self._heartbeat(now)
+        records.append((self.last_check, HEARTBEAT, 0))
+        self._write(records, new_names)
+        return len(records) - 1
+
+    # --- Consultas -----------------------------------------------------------
+
+    def stats(self, name: str, start: Optional[float] = None,
+              end: Optional[float] = None) -> Optional[UptimeStats]:
+        """
+        Uptime, tiempo caído y caídas de un rig en [start, end] (O(log n))
+
+        Args:
+            name: Nombre del rig
+            start: Inicio del rango (por defecto, todo el registro)
+            end: Fin del rango (por defecto, el último check)
+        """
+        number = self.numbers.get(name)
+        if number is None or self.last_check is None:
+            return None
+        rig = self.rigs[number]
+        now = self.last_check
+        start = -math.inf if start is None else start
+        end = now if end is None else end
+        up_end, down_end, failures_end = rig.totals(end, now)
+        up_start, down_start, failures_start = rig.totals(start, now) if start > -math.inf else (0.0, 0.0, 0)
+        return UptimeStats(name, max(0.0, up_end - up_start), max(0.0, down_end - down_start),
+                           failures_end - failures_start)
+
+    def fleet_stats(self, start: Optional[float] = None, end: Optional[float] = None) -> List[UptimeStats]:
+        """Estadísticas de cada rig observado en el rango (O(rigs · log n))"""
+        result = []
+        for name in self.names:
+            stats = self.stats(name, start, end)
+            if stats is not None and stats.observed > 0:
+                result.append(stats)
+        return result
+
+    def down_between(self, start: float, end: float) -> List[Tuple[str, float, float]]:
+        """
+        Caídas que se solapan con [start, end], recortadas al rango
+
+        Returns:
+            Lista de (rig, desde, hasta) ordenada por inicio
+        """
+        index = self.down_index
+        result = []
+        for position in index.overlapping(start, end):
+            result.append((self.names[index.owners[position]], max(index.starts[position], start),
+                           min(index.ends[position], end)))
+        # Caídas abiertas: en orden de inicio, hasta la primera posterior al rango
+        if self.last_check is not None and self.last_check >= start:
+            for number, since in self.open_downs.items():
+                if since > end:
+                    break
+                result.append((self.names[number], max(since, start), min(self.last_check, end)))
+        result.sort(key=lambda item: (item[1], item[0]))
+        return result
+
+    def ranking(self, start: Optional[float] = None, end: Optional[float] = None,
+                limit: int = 5) -> Tuple[List[UptimeStats], List[UptimeStats]]:
+        """
+        Rigs con mejor y peor uptime del rango
+
+        Returns:
+            Tupla (mejores, peores), cada una con hasta `limit` rigs
+        """
+        stats = self.fleet_stats(start, end)
+        stats.sort(key=lambda item: (-item.uptime, item.failures, item.name))
+        leaders = stats[:limit]
+        laggards = sorted((item for item in stats if item.down > 0),
+                          key=lambda item: (item.uptime, -item.failures, item.name))[:limit]
+        return leaders, laggards
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """Duración legible ('3.5 h', '12 min', '2.1 d')"""
+    if seconds is None:
+        return 'N/A'
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f} d"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 60:.0f} min"
+
+
+def main():
+    args = sys.argv[1:]
+    directory = 'uptime_ledger'
+    if '--ledger' in args:
+        index = args.index('--ledger')
+        directory = args[index + 1] if index + 1 < len(args) else directory
+        del args[index:index + 2]
+
+    from snapshot_archive import parse_timestamp
+    ledger = UptimeLedger(directory)
+    command = args[0] if args else 'info'
+
+    if command == 'rig' and len(args) > 1:
+        days = float(args[2]) if len(args) > 2 else 30
+        stats = ledger.stats(args[1], time.time() - days * 86400)
+        if stats is None:
+            print(f"❌ {args[1]} no está en el registro")
+            return
+        print(f"\n⏱️  {stats.name} (últimos {days:g} días)")
+        print(f"   Uptime: {stats.uptime:.2f}%  Caído: {format_duration(stats.down)}  Caídas: {stats.failures}")
+        print(f"   MTBF: {format_duration(stats.mtbf)}  MTTR: {format_duration(stats.mttr)}")
+    elif command == 'down' and len(args) > 2:
+        start, end = parse_timestamp(args[1]), parse_timestamp(args[2])
+        downs = ledger.down_between(start, end)
+        print(f"\n🔴 Caídas entre {args[1]} y {args[2]}: {len(downs)}")
+        for name, since, until in downs:
+            print(f"   {name}: {datetime.fromtimestamp(since):%Y-%m-%d %H:%M} → "
+                  f"{datetime.fromtimestamp(until):%Y-%m-%d %H:%M} ({format_duration(until - since)})")
+    elif command == 'ranking':
+        days = float(args[1]) if len(args) > 1 else 1
+        leaders, laggards = ledger.ranking(time.time() - days * 86400)
+        print(f"\n🏆 Mejor uptime (últimos {days:g} días)")
+        for stats in leaders:
+            print(f"   {stats.name}: {stats.uptime:.2f}%")
+        print("🐢 Peor uptime")
+        for stats in laggards:
+            print(f"   {stats.name}: {stats.uptime:.2f}% ({format_duration(stats.down)} caído, {stats.failures} caídas)")
+    else:
+        print(f"\n⏱️  Registro de uptime {directory}/")
+        print(f"   Rigs: {len(ledger)}  Caídas cerradas: {len(ledger.down_index)}  "
+              f"Caídos ahora: {len(ledger.open_downs)}")
+        if ledger.first_check is not None:
+            print(f"   Desde {datetime.fromtimestamp(ledger.first_check):%Y-%m-%d %H:%M} "
+                  f"hasta {datetime.fromtimestamp(ledger.last_check):%Y-%m-%d %H:%M}")
+        print("\nUso: python uptime_ledger.py [info | rig NOMBRE [días] | down DESDE HASTA | ranking [días]] "
+              "[--ledger carpeta]")
+
+
+if __name__ == "__main__":
+    main()